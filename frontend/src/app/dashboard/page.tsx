@@ -81,6 +81,7 @@ export default function DashboardPage() {
       case 'running':
         return 'text-blue-400'
       case 'queued':
+      case 'submitting':
         return 'text-yellow-400'
       case 'failed':
         return 'text-red-400'
@@ -96,6 +97,7 @@ export default function DashboardPage() {
       case 'running':
         return '⟳'
       case 'queued':
+      case 'submitting':
         return '⋯'
       case 'failed':
         return '✗'
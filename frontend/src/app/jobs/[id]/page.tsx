@@ -37,7 +37,7 @@ export default function JobPage() {
 
     // Poll for updates every 5 seconds if job is not done
     const interval = setInterval(() => {
-      if (job?.status === 'queued' || job?.status === 'running') {
+      if (job?.status === 'queued' || job?.status === 'submitting' || job?.status === 'running') {
         fetchJob()
       }
     }, 5000)
@@ -48,6 +48,7 @@ export default function JobPage() {
   const getStatusInfo = (status: string) => {
     switch (status) {
       case 'queued':
+      case 'submitting':
         return {
           color: 'text-yellow-400',
           bg: 'bg-yellow-400/10',
@@ -156,20 +157,20 @@ export default function JobPage() {
           </div>
 
           {/* Progress indicator for queued/running */}
-          {(job.status === 'queued' || job.status === 'running') && (
+          {(job.status === 'queued' || job.status === 'submitting' || job.status === 'running') && (
             <div className="mt-4">
               <div className="w-full bg-background-dark rounded-full h-2 overflow-hidden">
                 <div
                   className="h-full bg-gradient-cinematic animate-pulse"
                   style={{
-                    width: job.status === 'queued' ? '30%' : '70%',
+                    width: job.status === 'running' ? '70%' : '30%',
                   }}
                 />
               </div>
               <p className="text-xs text-gray-400 mt-2">
-                {job.status === 'queued'
-                  ? 'Waiting for available GPU...'
-                  : 'Generating video frames...'}
+                {job.status === 'running'
+                  ? 'Generating video frames...'
+                  : 'Waiting for available GPU...'}
               </p>
             </div>
           )}
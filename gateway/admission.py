@@ -0,0 +1,248 @@
+"""
+In-memory admission control for job submissions.
+
+Per-user active-job counters (queued and running) and per-user token
+buckets make the admission decision O(1) without touching the database.
+Admission only caps how many jobs a user may have waiting; the plan's
+concurrent-job limit is applied by the scheduler when it releases jobs to
+RunPod, so a large batch queues instead of being refused. Single jobs take a
+token from the plan's jobs-per-minute bucket; a batch takes one token from a
+separate batches-per-minute bucket, so batch throughput is bounded by
+batches per minute x batch size and by the queued-jobs limit. Counters move
+on job creation and on terminal transitions, and a periodic reconcile resets
+them from the database, which also corrects drift between gateway processes
+(each process only sees its own submissions).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import db_client
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class QueueLimitError(Exception):
+    """Raised when a user already has the maximum number of queued and running jobs"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"Maximum {limit} queued jobs allowed")
+
+
+class RateLimitError(Exception):
+    """Raised when a user has used up their submissions for now"""
+
+    def __init__(self, per_minute: int, retry_after: float, unit: str = "job submissions"):
+        self.per_minute = per_minute
+        self.retry_after = retry_after
+        super().__init__(f"Maximum {per_minute} {unit} per minute allowed")
+
+
+class PlanLimits(NamedTuple):
+    max_concurrent_jobs: int
+    jobs_per_minute: int
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at per_minute / 60 tokens a second"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, per_minute: int, now: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def give_back(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate else 60.0
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """Per-user queued-job counters and submission rate limits, by plan"""
+
+    def __init__(
+        self,
+        default_limits: PlanLimits,
+        max_queued_jobs: int = 50,
+        batches_per_minute: int = 2,
+        reconcile_interval: float = 60.0,
+    ):
+        self.default_limits = default_limits
+        self.max_queued_jobs = max_queued_jobs
+        self.batches_per_minute = batches_per_minute
+        self.reconcile_interval = reconcile_interval
+        self._plan_limits: Dict[str, PlanLimits] = {}
+        self._active: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._batch_buckets: Dict[str, TokenBucket] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.admitted = 0
+        self.rejected_queue = 0
+        self.rejected_rate = 0
+        self.reconciles = 0
+        self.corrections = 0
+
+    def set_plan_limits(self, plan_limits: Dict[str, PlanLimits]) -> None:
+        self._plan_limits = dict(plan_limits)
+
+    def limits_for(self, plan: Optional[str]) -> PlanLimits:
+        return self._plan_limits.get(plan, self.default_limits)
+
+    def active_jobs(self, user_id: str) -> int:
+        return self._active.get(user_id, 0)
+
+    def admit(self, user_id: str, plan: Optional[str], jobs: int = 1, batch: bool = False) -> int:
+        """
+        Reserve queue slots and one submission token for user_id.
+
+        A single job takes a token from the plan's jobs-per-minute bucket. A
+        batch takes one token from the batches-per-minute bucket and as many
+        of its jobs as the queued-jobs limit leaves room for.
+
+        Returns:
+            Number of jobs admitted (1..jobs)
+
+        Raises:
+            QueueLimitError: If the user already has max_queued_jobs active jobs
+            RateLimitError: If the user's submission bucket is empty
+        """
+        limits = self.limits_for(plan)
+
+        available = self.max_queued_jobs - self._active.get(user_id, 0)
+        if available <= 0:
+            self.rejected_queue += 1
+            raise QueueLimitError(self.max_queued_jobs)
+
+        now = time.monotonic()
+        if batch:
+            per_minute, unit, buckets = self.batches_per_minute, "batch submissions", self._batch_buckets
+        else:
+            per_minute, unit, buckets = limits.jobs_per_minute, "job submissions", self._buckets
+        bucket = buckets.get(user_id)
+        if bucket is None or bucket.capacity != per_minute:
+            bucket = buckets[user_id] = TokenBucket(per_minute, now)
+
+        if not bucket.try_take(now):
+            self.rejected_rate += 1
+            raise RateLimitError(per_minute, bucket.retry_after(), unit)
+
+        admitted = min(jobs, available)
+        self._active[user_id] = self._active.get(user_id, 0) + admitted
+        self.admitted += admitted
+        return admitted
+
+    def cancel(self, user_id: str, jobs: int = 1, batch: bool = False) -> None:
+        """Undo admit() for a submission that never created its jobs"""
+        self.release(user_id, jobs)
+        bucket = (self._batch_buckets if batch else self._buckets).get(user_id)
+        if bucket is not None:
+            bucket.give_back()
+
+    def release(self, user_id: str, jobs: int = 1) -> None:
+        """Jobs of user_id left queued/running"""
+        active = self._active.get(user_id, 0) - jobs
+        if active > 0:
+            self._active[user_id] = active
+        else:
+            self._active.pop(user_id, None)
+
+    def sync(self, active_counts: Dict[str, int]) -> None:
+        """Replace the counters with authoritative counts and drop idle buckets"""
+        for user_id in set(self._active) | set(active_counts):
+            if self._active.get(user_id, 0) != active_counts.get(user_id, 0):
+                self.corrections += 1
+        self._active = {user_id: count for user_id, count in active_counts.items() if count > 0}
+
+        now = time.monotonic()
+        for buckets in (self._buckets, self._batch_buckets):
+            for user_id in [user_id for user_id, bucket in buckets.items() if bucket.is_full(now)]:
+                del buckets[user_id]
+
+    async def reconcile(self) -> None:
+        """Reload plan limits and active-job counts from the database"""
+        plans = await db_client.get_plan_limits()
+        self.set_plan_limits({
+            name: PlanLimits(limits["maxConcurrentJobs"], limits["jobsPerMinute"])
+            for name, limits in plans.items()
+        })
+        self.sync(await db_client.count_active_jobs_by_user())
+        self.reconciles += 1
+
+    async def start(self) -> None:
+        """
+        Load state from the database, then reconcile every reconcile_interval.
+
+        If the first reconcile fails (e.g. the Plan table has not been
+        migrated yet) the gateway still starts, admitting on the default
+        limits until a later reconcile succeeds.
+        """
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.error(f"Admission reconcile failed, using default limits: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Admission reconcile failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "rejectedQueue": self.rejected_queue,
+            "rejectedRate": self.rejected_rate,
+            "activeUsers": len(self._active),
+            "activeJobs": sum(self._active.values()),
+            "trackedBuckets": len(self._buckets) + len(self._batch_buckets),
+            "reconciles": self.reconciles,
+            "corrections": self.corrections,
+        }
+
+
+# Singleton instance
+admission = AdmissionController(
+    default_limits=PlanLimits(
+        max_concurrent_jobs=settings.max_concurrent_jobs_per_user,
+        jobs_per_minute=settings.max_jobs_per_minute_per_user,
+    ),
+    max_queued_jobs=settings.max_queued_jobs_per_user,
+    batches_per_minute=settings.max_job_batches_per_minute_per_user,
+    reconcile_interval=settings.admission_reconcile_interval_seconds,
+)
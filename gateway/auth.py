@@ -1,83 +1,214 @@
 import jwt
 import httpx
+import time
+import asyncio
+import logging
+import hashlib
+from collections import OrderedDict
 from typing import Optional
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from functools import lru_cache
 from config import get_settings
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 settings = get_settings()
 
 
 class JWKSCache:
-    """Cache JWKS keys to avoid fetching on every request"""
+    """
+    Cache JWKS keys to avoid fetching on every request.
+
+    Refreshes are single-flight: one shared task fetches the JWKS and every
+    other caller awaits it. Once keys are loaded, stale keys keep being served
+    while the refresh runs in the background.
+    """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache_duration: float = 300,  # 5 minutes
+        min_refresh_interval: float = 30,
+    ):
         self._keys = None
         self._last_fetch = 0
-        self._cache_duration = 300  # 5 minutes
+        self._cache_duration = cache_duration
+        self._min_refresh_interval = min_refresh_interval
+        self._last_forced_refresh = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
 
     async def get_keys(self):
-        import time
-        current_time = time.time()
+        """Return parsed public keys by kid, refreshing in the background when stale"""
+        if self._keys is None:
+            # Nothing to serve yet, so the first callers must wait for the fetch
+            return await self._refresh()
 
-        if self._keys is None or (current_time - self._last_fetch) > self._cache_duration:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(settings.clerk_jwks_url)
-                response.raise_for_status()
-                jwks_data = response.json()
-                self._keys = {key['kid']: key for key in jwks_data['keys']}
-                self._last_fetch = current_time
+        if (time.time() - self._last_fetch) > self._cache_duration:
+            self._start_refresh()
 
         return self._keys
 
+    async def get_key(self, kid: Optional[str]):
+        """
+        Return the public key for kid, or None if it is unknown.
 
-jwks_cache = JWKSCache()
+        An unknown kid usually means Clerk rotated its signing keys, so it
+        forces a refresh, rate limited to one per min_refresh_interval.
+        """
+        keys = await self.get_keys()
+        if kid in keys:
+            return keys[kid]
 
+        current_time = time.time()
+        if (current_time - self._last_forced_refresh) < self._min_refresh_interval:
+            return None
+
+        self._last_forced_refresh = current_time
+        keys = await self._refresh()
+        return keys.get(kid)
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start the shared refresh task unless one is already in flight"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._run_refresh())
+        return self._refresh_task
+
+    async def _refresh(self):
+        # Shield so a cancelled caller does not cancel the fetch others await
+        return await asyncio.shield(self._start_refresh())
+
+    async def _run_refresh(self):
+        try:
+            jwks_data = await self._fetch_jwks()
+            self._keys = self._parse_keys(jwks_data)
+            self._last_fetch = time.time()
+            return self._keys
+        except Exception as e:
+            if self._keys is None:
+                raise
+            # Back off so a JWKS outage does not start a fetch per request
+            self._last_fetch = time.time() - self._cache_duration + self._min_refresh_interval
+            logger.warning(f"JWKS refresh failed, serving stale keys: {str(e)}")
+            return self._keys
+
+    async def _fetch_jwks(self) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(settings.clerk_jwks_url)
+            response.raise_for_status()
+            return response.json()
+
+    @staticmethod
+    def _parse_keys(jwks_data: dict) -> dict:
+        """Convert each JWK to a ready-to-use RSA public key once per fetch"""
+        return {
+            key['kid']: jwt.algorithms.RSAAlgorithm.from_jwk(key)
+            for key in jwks_data['keys']
+        }
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token claims, keyed by token hash, valid until exp"""
+
+    def __init__(self, max_size: int = 1024):
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return cached claims if the token was verified before and has not expired"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return payload
 
-async def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
+    def put(self, token: str, payload: dict) -> None:
+        """Cache verified claims; tokens without exp are never cached"""
+        expires_at = payload.get('exp')
+        if self._max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+
+        key = self._key(token)
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+jwks_cache = JWKSCache(
+    cache_duration=settings.jwks_cache_duration_seconds,
+    min_refresh_interval=settings.jwks_min_refresh_interval_seconds,
+)
+token_cache = VerifiedTokenCache(max_size=settings.auth_token_cache_size)
+
+
+def decode_token(token: str, public_key) -> dict:
+    """Verify token signature and claims against a parsed public key"""
+    return jwt.decode(
+        token,
+        public_key,
+        algorithms=['RS256'],
+        audience=None,  # Clerk doesn't use aud claim by default
+        issuer=settings.clerk_issuer,
+        options={
+            "verify_signature": True,
+            "verify_exp": True,
+            "verify_iss": True,
+        }
+    )
+
+
+async def verify_token(token: str) -> dict:
     """
-    Verify Clerk JWT token and return the payload.
+    Verify a raw Clerk JWT and return the payload.
 
     Raises:
         HTTPException: If token is invalid or expired
     """
-    token = credentials.credentials
+    # Polling clients resend the same session token; skip RS256 verify on repeats
+    cached_payload = token_cache.get(token)
+    if cached_payload is not None:
+        return cached_payload
 
     try:
-        # Get JWKS keys
-        keys = await jwks_cache.get_keys()
-
         # Decode header to get kid
         unverified_header = jwt.get_unverified_header(token)
         kid = unverified_header.get('kid')
 
-        if kid not in keys:
-            raise HTTPException(status_code=401, detail="Invalid token: unknown key ID")
-
-        # Get the public key
-        jwk = keys[kid]
+        # Get the public key, forcing a JWKS refresh if the kid is new
+        public_key = await jwks_cache.get_key(kid)
 
-        # Convert JWK to PEM
-        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+        if public_key is None:
+            raise HTTPException(status_code=401, detail="Invalid token: unknown key ID")
 
         # Verify and decode token
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=['RS256'],
-            audience=None,  # Clerk doesn't use aud claim by default
-            issuer=settings.clerk_issuer,
-            options={
-                "verify_signature": True,
-                "verify_exp": True,
-                "verify_iss": True,
-            }
-        )
+        payload = decode_token(token, public_key)
+
+        token_cache.put(token, payload)
 
         return payload
 
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError as e:
@@ -86,6 +217,16 @@ async def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Securit
         raise HTTPException(status_code=401, detail=f"Authentication failed: {str(e)}")
 
 
+async def verify_clerk_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
+    """
+    Verify Clerk JWT token from the Authorization header and return the payload.
+
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    return await verify_token(credentials.credentials)
+
+
 def get_user_id_from_token(payload: dict) -> str:
     """Extract Clerk user ID from JWT payload"""
     user_id = payload.get('sub')
@@ -0,0 +1,25 @@
+"""Shared setup for gateway benchmarks: import path and placeholder settings"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ISSUER = "https://bench.clerk.accounts.dev"
+
+# Placeholder values so config.Settings loads without a real .env
+for name, value in {
+    "CLERK_JWKS_URL": f"{ISSUER}/.well-known/jwks.json",
+    "CLERK_ISSUER": ISSUER,
+    "CONVEX_URL": "https://bench.convex.cloud",
+    "CONVEX_ADMIN_KEY": "bench",
+    "RUNPOD_ENDPOINT_ID": "bench",
+    "RUNPOD_API_KEY": "bench",
+    "R2_ACCOUNT_ID": "bench",
+    "R2_BUCKET": "bench",
+    "R2_ACCESS_KEY_ID": "bench",
+    "R2_SECRET_ACCESS_KEY": "bench",
+    "R2_PUBLIC_DOMAIN": "https://pub-bench.r2.dev",
+    "R2_ENDPOINT_URL": "https://bench.r2.cloudflarestorage.com",
+    "WEBHOOK_RUNPOD_SECRET": "bench",
+}.items():
+    os.environ.setdefault(name, value)
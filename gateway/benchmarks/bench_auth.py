@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for Clerk token verification cost per request.
+
+Compares the old path (JWK -> RSA key conversion plus full RS256 verify on
+every request) with the cached path (parsed keys plus verified-claims LRU).
+
+Usage:
+    python benchmarks/bench_auth.py [iterations]
+"""
+import sys
+import time
+import json
+import asyncio
+
+import _common  # noqa: F401  (sets import path and settings)
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+
+
+def make_token_and_jwk():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk["kid"] = "bench-kid"
+
+    token = jwt.encode(
+        {"sub": "user_bench", "iss": auth.settings.clerk_issuer, "exp": int(time.time()) + 3600},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "bench-kid"},
+    )
+    return token, jwk
+
+
+def bench_uncached(token: str, jwk: dict, iterations: int) -> float:
+    """Old behaviour: rebuild the key and verify the signature every call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+        auth.decode_token(token, public_key)
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_cached(token: str, jwk: dict, iterations: int) -> float:
+    """New behaviour: parsed keys in JWKSCache plus verified-claims LRU"""
+    auth.jwks_cache._keys = auth.JWKSCache._parse_keys({"keys": [jwk]})
+    auth.jwks_cache._last_fetch = time.time()
+    auth.token_cache.clear()
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await auth.verify_clerk_token(credentials)
+        return (time.perf_counter() - start) / iterations
+
+    return asyncio.run(run())
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    token, jwk = make_token_and_jwk()
+
+    uncached = bench_uncached(token, jwk, iterations)
+    cached = bench_cached(token, jwk, iterations)
+
+    print(f"iterations:           {iterations}")
+    print(f"uncached verify:      {uncached * 1e6:9.1f} us/request")
+    print(f"cached verify:        {cached * 1e6:9.1f} us/request")
+    print(f"speedup:              {uncached / cached:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark RunPodClient throughput against a local stub server.
+
+Compares a fresh httpx.AsyncClient per call (the old behaviour) with the
+app-lifetime pooled client. A TLS endpoint widens the gap further; the stub
+is plain HTTP so the numbers only show TCP setup and client construction.
+
+Usage:
+    python benchmarks/bench_http_clients.py [requests] [concurrency]
+"""
+import sys
+import time
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _common  # noqa: F401  (sets import path and settings)
+
+import httpx
+
+from runpod_client import RunPodClient
+
+
+class StubRunPodHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"id": self.path.rsplit("/", 1)[-1], "status": "IN_PROGRESS"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRunPodHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def per_call_client_status(client: RunPodClient, job_id: str):
+    """Old behaviour: open and tear down a client for every call"""
+    url = f"{client.api_url}/{client.endpoint_id}/status/{job_id}"
+    async with httpx.AsyncClient(timeout=10.0) as http:
+        response = await http.get(url, headers={"Authorization": f"Bearer {client.api_key}"})
+        response.raise_for_status()
+        return response.json()
+
+
+async def run(call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await call(f"job-{i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    server = start_stub_server()
+    client = RunPodClient()
+    client.api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    per_call = await run(lambda job_id: per_call_client_status(client, job_id), total, concurrency)
+
+    await client.start()
+    pooled = await run(client.get_job_status, total, concurrency)
+    await client.close()
+
+    server.shutdown()
+
+    print(f"requests:             {total} (concurrency {concurrency})")
+    print(f"client per call:      {per_call:9.0f} req/s")
+    print(f"pooled client:        {pooled:9.0f} req/s")
+    print(f"speedup:              {pooled / per_call:9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for presigning R2 get_object URLs.
+
+Compares boto3's generate_presigned_url with the pure-Python SigV4Presigner,
+and reports the one-off cost of importing boto3 and building a client.
+
+Usage:
+    python benchmarks/bench_presign.py [iterations]
+"""
+import sys
+import time
+
+import _common  # noqa: F401  (sets import path and settings)
+
+from config import get_settings
+from sigv4 import SigV4Presigner
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    settings = get_settings()
+
+    start = time.perf_counter()
+    import boto3
+    from botocore.config import Config
+    client = boto3.client(
+        's3',
+        endpoint_url=settings.r2_endpoint_url,
+        aws_access_key_id=settings.r2_access_key_id,
+        aws_secret_access_key=settings.r2_secret_access_key,
+        config=Config(signature_version='s3v4'),
+        region_name='auto',
+    )
+    boto3_startup = time.perf_counter() - start
+
+    presigner = SigV4Presigner(
+        endpoint_url=settings.r2_endpoint_url,
+        access_key_id=settings.r2_access_key_id,
+        secret_access_key=settings.r2_secret_access_key,
+    )
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': settings.r2_bucket, 'Key': f"outputs/{i}.mp4"},
+            ExpiresIn=86400,
+        )
+    boto3_cost = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        presigner.presign_get_object(settings.r2_bucket, f"outputs/{i}.mp4", expires_in=86400)
+    sigv4_cost = (time.perf_counter() - start) / iterations
+
+    print(f"iterations:           {iterations}")
+    print(f"boto3 import+client:  {boto3_startup * 1e3:9.1f} ms (one-off per process)")
+    print(f"boto3 presign:        {boto3_cost * 1e6:9.1f} us/url")
+    print(f"SigV4Presigner:       {sigv4_cost * 1e6:9.1f} us/url")
+    print(f"speedup:              {boto3_cost / sigv4_cost:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
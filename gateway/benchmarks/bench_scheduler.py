@@ -0,0 +1,91 @@
+"""
+Simulation of the job scheduler under a bursty mixed-plan workload.
+
+One studio account dumps a burst of jobs while starter and creator users
+keep submitting at a steady rate. Each submission "runs" for its GPU time
+(60 s per 5 s of video, scaled down by --scale) and then frees its slot.
+Reports queue wait percentiles per plan for FIFO release vs weighted fair
+queuing.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--scale 0.001] [--gpus 3]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import _common  # noqa: F401  (sets import path and settings)
+
+from config import get_settings
+from scheduler import JobScheduler
+
+GPU_SECONDS_PER_5S = 60
+
+
+def workload(seed: int = 7) -> list:
+    """(arrival time in simulated seconds, plan, user, durationSec)"""
+    rng = random.Random(seed)
+    jobs = [(0.0, "studio", "studio-burst", rng.choice((5, 10, 15))) for _ in range(60)]
+    for i in range(40):
+        jobs.append((i * 30.0, "starter", f"starter-{i % 8}", 5))
+        jobs.append((i * 30.0 + 15, "creator", f"creator-{i % 4}", rng.choice((5, 10))))
+    return sorted(jobs)
+
+
+async def simulate(fair: bool, gpus: int, scale: float) -> dict:
+    waits = {"starter": [], "creator": [], "studio": []}
+    enqueued_at = {}
+    scheduler = None
+
+    async def run_on_gpu(job):
+        waits[job["plan"]].append((time.monotonic() - enqueued_at[job["_id"]]) / scale)
+        await asyncio.sleep(job["durationSec"] / 5 * GPU_SECONDS_PER_5S * scale)
+        asyncio.get_running_loop().call_soon(scheduler.release, job["_id"])
+        return True
+
+    scheduler = JobScheduler(
+        max_in_flight=gpus,
+        plan_weights=get_settings().scheduler_plan_weights,
+        submit=run_on_gpu,
+        fair=fair,
+    )
+
+    start = time.monotonic()
+    for n, (arrival, plan, user, duration) in enumerate(workload()):
+        delay = start + arrival * scale - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        job_id = f"job-{n}"
+        enqueued_at[job_id] = time.monotonic()
+        scheduler.enqueue({"_id": job_id, "userId": user, "plan": plan, "durationSec": duration}, plan=plan)
+
+    while scheduler.stats()["queued"] or scheduler.stats()["inFlight"]:
+        await asyncio.sleep(scale * 10)
+    return waits
+
+
+def percentile(values: list, pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=0.001, help="wall seconds per simulated second")
+    parser.add_argument("--gpus", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Queue wait in simulated seconds ({args.gpus} GPUs, 60-job studio burst at t=0)")
+    print(f"{'policy':<8}{'plan':<10}{'jobs':>6}{'p50':>10}{'p90':>10}{'p99':>10}")
+    for name, fair in (("fifo", False), ("wfq", True)):
+        waits = asyncio.run(simulate(fair, args.gpus, args.scale))
+        for plan, values in waits.items():
+            print(
+                f"{name:<8}{plan:<10}{len(values):>6}"
+                f"{percentile(values, 50):>10.0f}{percentile(values, 90):>10.0f}{percentile(values, 99):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for RunPod webhook signature verification.
+
+Compares the old path (parse into RunPodWebhookPayload, re-serialize with
+payload.json(), then HMAC) with verifying the raw body before parsing, and
+the cost of rejecting a malformed signature.
+
+Usage:
+    python benchmarks/bench_webhook_signature.py [iterations] [output_kb]
+"""
+import hashlib
+import hmac
+import json
+import sys
+import time
+import warnings
+
+import _common  # noqa: F401  (sets import path and settings)
+
+from models import RunPodWebhookPayload
+from webhooks import verify_signature
+
+SECRET = b"bench"
+
+
+def make_body(output_kb: int) -> bytes:
+    frames = [{"index": i, "path": f"frames/{i:06d}.png", "score": i / 7} for i in range(output_kb * 16)]
+    payload = {
+        "id": "runpod-bench",
+        "status": "COMPLETED",
+        "output": {"r2Url": "https://pub-bench.r2.dev/outputs/bench.mp4", "frames": frames},
+    }
+    return json.dumps(payload).encode()
+
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    output_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    body = make_body(output_kb)
+    payload_json = RunPodWebhookPayload.model_validate_json(body).json().encode()
+    old_signature = hmac.new(SECRET, payload_json, hashlib.sha256).hexdigest()
+    signature = hmac.new(SECRET, body, hashlib.sha256).hexdigest()
+
+    def parse_then_sign():
+        payload = RunPodWebhookPayload.model_validate_json(body)
+        expected = hmac.new(SECRET, payload.json().encode(), hashlib.sha256).hexdigest()
+        assert hmac.compare_digest(old_signature, expected)
+
+    def sign_then_parse():
+        assert verify_signature(body, signature, SECRET)
+        RunPodWebhookPayload.model_validate_json(body)
+
+    def forged_valid_shape():
+        assert not verify_signature(body, "0" * 64, SECRET)
+
+    def forged_malformed():
+        assert not verify_signature(body, "forged", SECRET)
+
+    print(f"Body size: {len(body) / 1024:.0f} KiB, {iterations} iterations")
+    print(f"{'parse, re-serialize, HMAC':<32}{timed(parse_then_sign, iterations):>10.1f} us/req")
+    print(f"{'HMAC raw body, then parse':<32}{timed(sign_then_parse, iterations):>10.1f} us/req")
+    print(f"{'reject forged (well-formed)':<32}{timed(forged_valid_shape, iterations):>10.1f} us/req")
+    print(f"{'reject forged (malformed)':<32}{timed(forged_malformed, iterations):>10.1f} us/req")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -11,16 +12,26 @@ class Settings(BaseSettings):
     # Clerk
     clerk_jwks_url: str
     clerk_issuer: str
+    auth_token_cache_size: int = 1024
+    jwks_cache_duration_seconds: float = 300
+    jwks_min_refresh_interval_seconds: float = 30
 
     # Convex
     convex_url: str
     convex_admin_key: str
+    convex_timeout_seconds: float = 10.0
 
     # RunPod
     runpod_endpoint_id: str
     runpod_api_key: str
     runpod_api_url: str = "https://api.runpod.ai/v2"
 
+    # Outbound HTTP connection pools (RunPod, Convex)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = False
+
     # Cloudflare R2
     r2_account_id: str
     r2_bucket: str
@@ -28,12 +39,59 @@ class Settings(BaseSettings):
     r2_secret_access_key: str
     r2_public_domain: str
     r2_endpoint_url: str
+    r2_max_workers: int = 8
+    r2_presign_cache_size: int = 10000
+    r2_presign_reuse_fraction: float = 0.5
+
+    # GET /metrics requires this key in X-Metrics-Key (the endpoint is disabled when unset)
+    metrics_api_key: Optional[str] = None
 
     # Webhook security
     webhook_runpod_secret: str
+    webhook_dedup_cache_size: int = 10000
+    webhook_max_body_bytes: int = 5 * 1024 * 1024
+    webhook_queue_size: int = 1000
+    webhook_batch_size: int = 50
+    webhook_batch_wait_seconds: float = 0.05
+
+    # Stuck job reconciliation
+    reconciler_enabled: bool = True
+    reconciler_interval_seconds: float = 60.0
+    reconciler_stuck_after_seconds: float = 900.0
+    reconciler_concurrency: int = 10
+    reconciler_batch_size: int = 100
+
+    # User identity cache (never holds credit balances; plan changes apply after the TTL)
+    user_cache_ttl_seconds: float = 60
+    user_cache_max_size: int = 10000
 
-    # Rate limiting
+    # Job status events (SSE/WebSocket); "memory" or "redis"
+    event_backend: str = "memory"
+    redis_url: Optional[str] = None
+    event_queue_size: int = 100
+    event_heartbeat_seconds: float = 15.0
+
+    # Job listing
+    jobs_page_max_size: int = 100
+    jobs_batch_max_size: int = 50
+
+    # Reuse of identical seeded generations ("charge" or "free" for reused results)
+    result_cache_enabled: bool = True
+    result_cache_namespace: str = "v1"
+    result_cache_credit_policy: str = "charge"
+    result_cache_min_remaining_seconds: float = 3600
+
+    # Rate limiting (concurrent jobs are enforced by the scheduler; queued jobs at submission)
     max_concurrent_jobs_per_user: int = 5
+    max_jobs_per_minute_per_user: int = 10
+    max_queued_jobs_per_user: int = 50
+    max_job_batches_per_minute_per_user: int = 2
+    admission_reconcile_interval_seconds: float = 60.0
+
+    # Job scheduling (RunPod in-flight budget shared by all instances, fair-queuing weight per plan)
+    scheduler_max_in_flight: int = 3
+    scheduler_sync_interval_seconds: float = 15.0
+    scheduler_plan_weights: Dict[str, float] = {"starter": 1.0, "creator": 2.0, "studio": 4.0}
 
     class Config:
         env_file = ".env"
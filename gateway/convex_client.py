@@ -1,18 +1,33 @@
 import httpx
 from typing import Optional, Any, Dict
 from config import get_settings
+from http_pool import PooledHTTPClient, build_async_client
 
 settings = get_settings()
 
 
-class ConvexClient:
+class ConvexClient(PooledHTTPClient):
     """Client for interacting with Convex backend"""
 
     def __init__(self):
         self.base_url = settings.convex_url
         self.admin_key = settings.convex_admin_key
 
-    async def query(self, function_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+    def _build_http_client(self) -> httpx.AsyncClient:
+        return build_async_client(
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Convex {self.admin_key}",
+            },
+            timeout=settings.convex_timeout_seconds,
+        )
+
+    async def query(
+        self,
+        function_name: str,
+        args: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
         """Execute a Convex query"""
         url = f"{self.base_url}/api/query"
 
@@ -22,22 +37,21 @@ class ConvexClient:
             "format": "json",
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Convex {self.admin_key}",
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        response = await self.http.post(url, json=payload, timeout=timeout or settings.convex_timeout_seconds)
+        response.raise_for_status()
+        data = response.json()
 
-            if "error" in data:
-                raise Exception(f"Convex query error: {data['error']}")
+        if "error" in data:
+            raise Exception(f"Convex query error: {data['error']}")
 
-            return data.get("value")
+        return data.get("value")
 
-    async def mutation(self, function_name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+    async def mutation(
+        self,
+        function_name: str,
+        args: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
         """Execute a Convex mutation"""
         url = f"{self.base_url}/api/mutation"
 
@@ -47,20 +61,14 @@ class ConvexClient:
             "format": "json",
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Convex {self.admin_key}",
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        response = await self.http.post(url, json=payload, timeout=timeout or settings.convex_timeout_seconds)
+        response.raise_for_status()
+        data = response.json()
 
-            if "error" in data:
-                raise Exception(f"Convex mutation error: {data['error']}")
+        if "error" in data:
+            raise Exception(f"Convex mutation error: {data['error']}")
 
-            return data.get("value")
+        return data.get("value")
 
 
 # Singleton instance
@@ -1,12 +1,24 @@
 """Database client using Prisma"""
+import json
+import uuid
+import base64
 from prisma import Prisma
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
 
 # Singleton Prisma client
 db = Prisma()
 
 
+class InsufficientCreditsError(Exception):
+    """Raised when a balance cannot cover a reservation"""
+
+    def __init__(self, needed: int, available: int):
+        self.needed = needed
+        self.available = available
+        super().__init__(f"Insufficient credits. Need {needed}, have {available}")
+
+
 async def connect_db():
     """Connect to database"""
     if not db.is_connected():
@@ -82,48 +94,228 @@ async def get_user_by_clerk_id(clerk_id: str) -> Optional[Dict[str, Any]]:
     }
 
 
-async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
-    """Get user by ID"""
-    user = await db.user.find_unique(where={"id": user_id})
-
-    if not user:
-        return None
-
-    return {
-        "_id": user.id,
-        "clerkId": user.clerkId,
-        "email": user.email,
-        "plan": user.plan,
-        "credits": user.credits,
-        "createdAt": int(user.createdAt.timestamp() * 1000),
-    }
-
-
 # Job operations
-async def create_job(
+async def create_job_with_reservation(
     user_id: str,
     prompt: str,
     duration_sec: int,
     credits_used: int,
+    description: str,
     image_url: Optional[str] = None,
     seed: Optional[int] = None,
     cfg: float = 7.5,
-) -> str:
-    """Create a new job"""
-    job = await db.job.create(
-        data={
-            "userId": user_id,
+    params_hash: Optional[str] = None,
+    charge_reused: bool = True,
+    reuse_min_remaining: float = 3600,
+) -> Dict[str, Any]:
+    """
+    Insert and pay for a job in one transaction.
+
+    Debits credits, inserts the job and writes the ledger row. Nothing is
+    written if any step fails. Concurrency limits are enforced beforehand
+    by the in-memory admission controller. See create_jobs_with_reservation
+    for params_hash and result reuse.
+
+    Returns:
+        {"jobId", "status", "creditsUsed", "sourceJobId", "creditsRemaining"}
+
+    Raises:
+        InsufficientCreditsError: If the balance cannot cover credits_used
+    """
+    result = await create_jobs_with_reservation(
+        user_id=user_id,
+        jobs=[{
             "prompt": prompt,
-            "imageUrl": image_url,
-            "durationSec": duration_sec,
-            "creditsUsed": credits_used,
-            "status": "queued",
+            "duration_sec": duration_sec,
+            "credits_used": credits_used,
+            "description": description,
+            "image_url": image_url,
             "seed": seed,
             "cfg": cfg,
-        }
+            "params_hash": params_hash,
+        }],
+        charge_reused=charge_reused,
+        reuse_min_remaining=reuse_min_remaining,
+    )
+
+    return {**result["jobs"][0], "creditsRemaining": result["creditsRemaining"]}
+
+
+async def create_jobs_with_reservation(
+    user_id: str,
+    jobs: Sequence[Dict[str, Any]],
+    charge_reused: bool = True,
+    reuse_min_remaining: float = 3600,
+) -> Dict[str, Any]:
+    """
+    Insert and pay for several jobs in one transaction.
+
+    Each item holds create_job_with_reservation's job arguments (prompt,
+    duration_sec, credits_used, description, image_url, seed, cfg and an
+    optional params_hash). The total is debited once; jobs and their ledger
+    rows are bulk-inserted. Nothing is written if the balance cannot cover
+    the whole batch.
+
+    Items with a params_hash reuse earlier work: if a finished job with the
+    same hash has at least reuse_min_remaining seconds of its video left,
+    the new job is created `done` with that video; if one is still queued or
+    running, the new job follows it (sourceJobId) and is finalized with it.
+    Reused jobs cost nothing when charge_reused is False.
+
+    Returns:
+        {"jobs": [{"jobId", "status", "creditsUsed", "sourceJobId"}, ...] (in
+        input order), "creditsRemaining": ...}
+
+    Raises:
+        InsufficientCreditsError: If the balance cannot cover the total
+    """
+    async with db.tx() as transaction:
+        sources = await _find_reusable_jobs(
+            transaction,
+            [job["params_hash"] for job in jobs if job.get("params_hash")],
+            min_expiry=datetime.utcnow() + timedelta(seconds=reuse_min_remaining),
+        )
+
+        rows = []
+        for job in jobs:
+            row = {
+                "id": str(uuid.uuid4()),
+                "userId": user_id,
+                "prompt": job["prompt"],
+                "imageUrl": job.get("image_url"),
+                "durationSec": job["duration_sec"],
+                "creditsUsed": job["credits_used"],
+                "status": "queued",
+                "seed": job.get("seed"),
+                "cfg": job.get("cfg", 7.5),
+                "paramsHash": job.get("params_hash"),
+            }
+
+            source = sources.get(job.get("params_hash"))
+            if source is not None:
+                row["sourceJobId"] = source["id"]
+                if not charge_reused:
+                    row["creditsUsed"] = 0
+                if source["status"] == "done":
+                    row.update(status="done", r2Url=source["r2Url"], expiresAt=source["expiresAt"])
+            elif job.get("params_hash"):
+                # Later duplicates in this batch follow this job
+                sources[job["params_hash"]] = row
+
+            rows.append(row)
+
+        total_credits = sum(row["creditsUsed"] for row in rows)
+        new_balance = await _debit_credits(transaction, user_id, total_credits)
+
+        await transaction.job.create_many(
+            data=[{k: v for k, v in row.items() if v is not None} for row in rows]
+        )
+
+        balance = new_balance + total_credits
+        ledger_rows = []
+        for row, job in zip(rows, jobs):
+            if not row["creditsUsed"]:
+                continue
+            balance -= row["creditsUsed"]
+            ledger_rows.append({
+                "userId": user_id,
+                "amount": -row["creditsUsed"],
+                "balanceAfter": balance,
+                "type": "subscription",
+                "description": job["description"],
+                "jobId": row["id"],
+            })
+
+        if ledger_rows:
+            await transaction.creditledger.create_many(data=ledger_rows)
+
+    return {
+        "jobs": [
+            {
+                "jobId": row["id"],
+                "status": row["status"],
+                "creditsUsed": row["creditsUsed"],
+                "sourceJobId": row.get("sourceJobId"),
+            }
+            for row in rows
+        ],
+        "creditsRemaining": new_balance,
+    }
+
+
+async def _find_reusable_jobs(
+    transaction: Prisma,
+    params_hashes: Sequence[str],
+    min_expiry: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Original (non-follower) jobs whose result can be shared, by params hash.
+
+    Finished jobs with enough lifetime left win over in-flight ones.
+    """
+    if not params_hashes:
+        return {}
+
+    jobs = await transaction.job.find_many(
+        where={
+            "paramsHash": {"in": list(set(params_hashes))},
+            "sourceJobId": None,
+            "OR": [
+                {"status": {"in": ACTIVE_JOB_STATUSES}},
+                {"status": "done", "expiresAt": {"gt": min_expiry}},
+            ],
+        },
+        order={"createdAt": "desc"},
     )
 
-    return job.id
+    sources: Dict[str, Dict[str, Any]] = {}
+    for job in jobs:
+        current = sources.get(job.paramsHash)
+        if current is None or (current["status"] != "done" and job.status == "done"):
+            sources[job.paramsHash] = {
+                "id": job.id,
+                "status": job.status,
+                "r2Url": job.r2Url,
+                "expiresAt": job.expiresAt,
+            }
+
+    return sources
+
+
+async def fail_job_with_refund(
+    job_id: str,
+    error_message: str,
+    refund_reason: Optional[str] = None,
+    expected_status: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Mark a job failed and refund its credits in one transaction.
+
+    Jobs following it (sourceJobId) are failed and refunded with it.
+    With expected_status, nothing happens unless the job is still in that
+    status (compare-and-set, so two callers cannot refund it twice).
+
+    Returns:
+        Records for the failed job and its followers; empty if nothing changed
+    """
+    where: Dict[str, Any] = {"id": job_id}
+    if expected_status is not None:
+        where["status"] = expected_status
+
+    async with db.tx() as transaction:
+        updated = await transaction.job.update_many(
+            where=where,
+            data={"status": "failed", "errorMessage": error_message}
+        )
+
+        if not updated:
+            return []
+
+        leader = await transaction.job.find_unique(where={"id": job_id})
+        followers = await _finalize_followers(transaction, [leader])
+        await _refund_jobs(transaction, [(job, refund_reason or error_message) for job in [leader] + followers])
+
+    return [_job_record(job) for job in [leader] + followers]
 
 
 async def update_job_status(
@@ -162,7 +354,10 @@ async def update_job_status(
         "durationSec": job.durationSec,
         "creditsUsed": job.creditsUsed,
         "status": job.status,
+        "seed": job.seed,
+        "cfg": job.cfg,
         "runpodJobId": job.runpodJobId,
+        "sourceJobId": job.sourceJobId,
         "r2Url": job.r2Url,
         "errorMessage": job.errorMessage,
         "expiresAt": int(job.expiresAt.timestamp() * 1000) if job.expiresAt else None,
@@ -171,13 +366,11 @@ async def update_job_status(
     }
 
 
-async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
-    """Get job by ID"""
-    job = await db.job.find_unique(where={"id": job_id})
+# `submitting`: claimed by one gateway instance, RunPod call in progress
+ACTIVE_JOB_STATUSES = ["queued", "submitting", "running"]
 
-    if not job:
-        return None
 
+def _job_record(job) -> Dict[str, Any]:
     return {
         "_id": job.id,
         "userId": job.userId,
@@ -186,6 +379,10 @@ async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
         "durationSec": job.durationSec,
         "creditsUsed": job.creditsUsed,
         "status": job.status,
+        "seed": job.seed,
+        "cfg": job.cfg,
+        "runpodJobId": job.runpodJobId,
+        "sourceJobId": job.sourceJobId,
         "r2Url": job.r2Url,
         "errorMessage": job.errorMessage,
         "expiresAt": int(job.expiresAt.timestamp() * 1000) if job.expiresAt else None,
@@ -194,9 +391,274 @@ async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
     }
 
 
-async def get_job_by_runpod_id(runpod_job_id: str) -> Optional[Dict[str, Any]]:
-    """Get job by RunPod job ID"""
-    job = await db.job.find_unique(where={"runpodJobId": runpod_job_id})
+async def finalize_job(
+    runpod_job_id: str,
+    status: str,
+    r2_url: Optional[str] = None,
+    error_message: Optional[str] = None,
+    refund_reason: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Move a job to a terminal status at most once.
+
+    Returns:
+        The updated job record, or None if nothing transitioned
+    """
+    jobs = await finalize_jobs([{
+        "runpod_job_id": runpod_job_id,
+        "status": status,
+        "r2_url": r2_url,
+        "error_message": error_message,
+        "refund_reason": refund_reason,
+    }])
+    return jobs[0] if jobs else None
+
+
+async def finalize_jobs(transitions: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply a batch of terminal transitions in one transaction.
+
+    Each transition is a dict of finalize_job's keyword arguments. Every job
+    moves with a compare-and-set (status still queued/running), so replays
+    and unknown RunPod IDs are skipped. Refunds for the failed jobs that did
+    transition are applied with one balance update per user and a single
+    ledger insert.
+
+    Returns:
+        Records for the jobs that transitioned, in input order
+    """
+    matched = []
+
+    async with db.tx() as transaction:
+        for transition in transitions:
+            update_data: Dict[str, Any] = {"status": transition["status"]}
+
+            if transition.get("r2_url"):
+                update_data["r2Url"] = transition["r2_url"]
+
+            if transition.get("error_message"):
+                update_data["errorMessage"] = transition["error_message"]
+
+            # Set expiration for completed jobs (24 hours)
+            if transition["status"] == "done":
+                update_data["expiresAt"] = datetime.utcnow() + timedelta(hours=24)
+
+            updated = await transaction.job.update_many(
+                where={
+                    "runpodJobId": transition["runpod_job_id"],
+                    "status": {"in": ACTIVE_JOB_STATUSES},
+                },
+                data=update_data
+            )
+
+            if updated:
+                matched.append(transition)
+
+        if not matched:
+            return []
+
+        jobs = await transaction.job.find_many(
+            where={"runpodJobId": {"in": [transition["runpod_job_id"] for transition in matched]}}
+        )
+        jobs_by_runpod_id = {job.runpodJobId: job for job in jobs}
+
+        refunds: List[Tuple[Any, str]] = []
+        for transition in matched:
+            if transition["status"] != "failed":
+                continue
+            job = jobs_by_runpod_id[transition["runpod_job_id"]]
+            refunds.append((job, transition.get("refund_reason") or transition.get("error_message")))
+
+        leaders = [jobs_by_runpod_id[transition["runpod_job_id"]] for transition in matched]
+        followers = await _finalize_followers(transaction, leaders)
+        refunds += [(job, job.errorMessage) for job in followers if job.status == "failed"]
+
+        await _refund_jobs(transaction, refunds)
+
+    return [_job_record(job) for job in leaders + followers]
+
+
+async def _finalize_followers(transaction: Prisma, leaders: Sequence[Any]) -> List[Any]:
+    """Give active jobs that follow these (now terminal) jobs the same outcome"""
+    followers = await transaction.job.find_many(
+        where={
+            "sourceJobId": {"in": [leader.id for leader in leaders]},
+            "status": {"in": ACTIVE_JOB_STATUSES},
+        }
+    )
+
+    if not followers:
+        return []
+
+    for leader in leaders:
+        follower_ids = [job.id for job in followers if job.sourceJobId == leader.id]
+        if not follower_ids:
+            continue
+
+        if leader.status == "done":
+            data = {"status": "done", "r2Url": leader.r2Url, "expiresAt": leader.expiresAt}
+        else:
+            data = {"status": "failed", "errorMessage": leader.errorMessage}
+
+        await transaction.job.update_many(where={"id": {"in": follower_ids}}, data=data)
+
+    return await transaction.job.find_many(where={"id": {"in": [job.id for job in followers]}})
+
+
+async def _refund_jobs(transaction: Prisma, refunds: Sequence[Tuple[Any, str]]) -> None:
+    """Refund failed jobs: one balance update per user and a single ledger insert"""
+    by_user: Dict[str, List[Tuple[Any, str]]] = {}
+    for job, reason in refunds:
+        if job.creditsUsed:
+            by_user.setdefault(job.userId, []).append((job, reason))
+
+    ledger_rows = []
+    for user_id, refunded_jobs in by_user.items():
+        total = sum(job.creditsUsed for job, _ in refunded_jobs)
+        user = await transaction.user.update(
+            where={"id": user_id},
+            data={"credits": {"increment": total}}
+        )
+
+        balance = user.credits - total
+        for job, reason in refunded_jobs:
+            balance += job.creditsUsed
+            ledger_rows.append({
+                "userId": user_id,
+                "amount": job.creditsUsed,
+                "balanceAfter": balance,
+                "type": "refund",
+                "description": f"Refund: {reason}",
+                "jobId": job.id,
+            })
+
+    if ledger_rows:
+        await transaction.creditledger.create_many(data=ledger_rows)
+
+
+async def list_active_jobs() -> List[Dict[str, Any]]:
+    """Every queued or running job with its owner's plan, oldest first"""
+    jobs = await db.job.find_many(
+        where={"status": {"in": ACTIVE_JOB_STATUSES}},
+        include={"user": True},
+        order={"createdAt": "asc"},
+    )
+
+    return [{**_job_record(job), "plan": job.user.plan} for job in jobs]
+
+
+async def claim_job_for_submission(job_id: str) -> bool:
+    """
+    Atomically move a queued, never-submitted job to `submitting`.
+
+    Returns:
+        False if another gateway instance (or an earlier attempt) already claimed it
+    """
+    claimed = await db.job.update_many(
+        where={"id": job_id, "status": "queued", "runpodJobId": None},
+        data={"status": "submitting"},
+    )
+
+    return claimed > 0
+
+
+async def list_in_flight_jobs() -> Dict[str, str]:
+    """Jobs being submitted to or running on RunPod, from every gateway instance, as job ID -> user ID"""
+    jobs = await db.job.find_many(where={"status": {"in": ["submitting", "running"]}})
+
+    return {job.id: job.userId for job in jobs}
+
+
+async def list_stale_submissions(older_than: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+    """Jobs claimed for submission before older_than that never got a RunPod ID, oldest first"""
+    jobs = await db.job.find_many(
+        where={
+            "status": "submitting",
+            "runpodJobId": None,
+            "updatedAt": {"lt": older_than},
+        },
+        order={"updatedAt": "asc"},
+        take=limit,
+    )
+
+    return [_job_record(job) for job in jobs]
+
+
+async def list_stale_queued_jobs(
+    older_than: datetime,
+    limit: int = 100,
+    after: Optional[Tuple[int, str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Queued, never-submitted jobs created before older_than, oldest first, with their owner's plan.
+
+    Followers are left out; they finish with their leader.
+
+    Args:
+        older_than: Only jobs created before this
+        limit: Page size
+        after: (createdAt ms, id) of the last job of the previous page
+    """
+    where: Dict[str, Any] = {
+        "status": "queued",
+        "runpodJobId": None,
+        "sourceJobId": None,
+        "createdAt": {"lt": older_than},
+    }
+    if after is not None:
+        created_at = datetime.fromtimestamp(after[0] / 1000, tz=timezone.utc)
+        where["OR"] = [
+            {"createdAt": {"gt": created_at}},
+            {"createdAt": created_at, "id": {"gt": after[1]}},
+        ]
+
+    jobs = await db.job.find_many(
+        where=where,
+        include={"user": True},
+        order=[{"createdAt": "asc"}, {"id": "asc"}],
+        take=limit,
+    )
+
+    return [{**_job_record(job), "plan": job.user.plan} for job in jobs]
+
+
+async def list_stuck_jobs(
+    older_than: datetime,
+    limit: int = 100,
+    after: Optional[Tuple[int, str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Running jobs with a RunPod ID not updated since older_than, oldest first.
+
+    Args:
+        older_than: Only jobs whose updatedAt is before this
+        limit: Page size
+        after: (updatedAt ms, id) of the last job of the previous page
+    """
+    where: Dict[str, Any] = {
+        "status": "running",
+        "runpodJobId": {"not": None},
+        "updatedAt": {"lt": older_than},
+    }
+    if after is not None:
+        updated_at = datetime.fromtimestamp(after[0] / 1000, tz=timezone.utc)
+        where["OR"] = [
+            {"updatedAt": {"gt": updated_at}},
+            {"updatedAt": updated_at, "id": {"gt": after[1]}},
+        ]
+
+    jobs = await db.job.find_many(
+        where=where,
+        order=[{"updatedAt": "asc"}, {"id": "asc"}],
+        take=limit,
+    )
+
+    return [_job_record(job) for job in jobs]
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get job by ID"""
+    job = await db.job.find_unique(where={"id": job_id})
 
     if not job:
         return None
@@ -205,51 +667,178 @@ async def get_job_by_runpod_id(runpod_job_id: str) -> Optional[Dict[str, Any]]:
         "_id": job.id,
         "userId": job.userId,
         "prompt": job.prompt,
+        "imageUrl": job.imageUrl,
         "durationSec": job.durationSec,
         "creditsUsed": job.creditsUsed,
         "status": job.status,
         "r2Url": job.r2Url,
         "errorMessage": job.errorMessage,
+        "expiresAt": int(job.expiresAt.timestamp() * 1000) if job.expiresAt else None,
         "createdAt": int(job.createdAt.timestamp() * 1000),
         "updatedAt": int(job.updatedAt.timestamp() * 1000),
     }
 
 
-async def list_user_jobs(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-    """List user's jobs"""
-    jobs = await db.job.find_many(
+# API field name -> Job column, for /jobs projections
+JOB_LIST_FIELDS = {
+    "_id": "id",
+    "userId": "userId",
+    "prompt": "prompt",
+    "imageUrl": "imageUrl",
+    "durationSec": "durationSec",
+    "creditsUsed": "creditsUsed",
+    "status": "status",
+    "seed": "seed",
+    "cfg": "cfg",
+    "r2Url": "r2Url",
+    "errorMessage": "errorMessage",
+    "expiresAt": "expiresAt",
+    "createdAt": "createdAt",
+    "updatedAt": "updatedAt",
+}
+
+DEFAULT_JOB_LIST_FIELDS = (
+    "_id", "userId", "prompt", "durationSec", "creditsUsed",
+    "status", "r2Url", "errorMessage", "createdAt", "updatedAt",
+)
+
+_TIMESTAMP_FIELDS = ("expiresAt", "createdAt", "updatedAt")
+
+
+def _timestamp_ms(value: Any) -> Optional[int]:
+    """Normalize a raw-query DateTime (datetime, ISO string or epoch ms) to epoch ms"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+    return int(value)
+
+
+def encode_job_cursor(created_at: int, job_id: str) -> str:
+    raw = json.dumps({"c": created_at, "i": job_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_job_cursor(cursor: str) -> Tuple[int, str]:
+    """Raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return int(data["c"]), str(data["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def list_user_jobs(
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    List user's jobs, newest first, one keyset page at a time.
+
+    Pages are keyed on (userId, createdAt, id) so deep pages cost the same as
+    the first, and only the requested columns are read.
+
+    Args:
+        user_id: Owner of the jobs
+        limit: Page size
+        cursor: nextCursor from the previous page
+        fields: API field names to return (see JOB_LIST_FIELDS); _id and
+            createdAt are always included
+
+    Returns:
+        {"jobs": [...], "nextCursor": str or None}
+
+    Raises:
+        ValueError: For an unknown field or malformed cursor
+    """
+    fields = list(fields or DEFAULT_JOB_LIST_FIELDS)
+    unknown = [field for field in fields if field not in JOB_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    for required in ("createdAt", "_id"):
+        if required not in fields:
+            fields.append(required)
+
+    columns = ", ".join(f'"{JOB_LIST_FIELDS[field]}" AS "{field}"' for field in fields)
+    query = f'SELECT {columns} FROM "Job" WHERE "userId" = ?'
+    args: List[Any] = [user_id]
+
+    if cursor:
+        created_at, job_id = decode_job_cursor(cursor)
+        query += ' AND ("createdAt" < ? OR ("createdAt" = ? AND "id" < ?))'
+        args += [created_at, created_at, job_id]
+
+    # Fetch one extra row to know whether another page exists
+    query += ' ORDER BY "createdAt" DESC, "id" DESC LIMIT ?'
+    args.append(limit + 1)
+
+    rows = await db.query_raw(query, *args)
+
+    jobs = []
+    for row in rows[:limit]:
+        for field in _TIMESTAMP_FIELDS:
+            if field in row:
+                row[field] = _timestamp_ms(row[field])
+        jobs.append(row)
+
+    next_cursor = None
+    if len(rows) > limit and jobs:
+        next_cursor = encode_job_cursor(jobs[-1]["createdAt"], jobs[-1]["_id"])
+
+    return {"jobs": jobs, "nextCursor": next_cursor}
+
+
+async def get_jobs_version(user_id: str) -> Dict[str, Any]:
+    """
+    Cheap fingerprint of a user's jobs for conditional GETs.
+
+    One aggregate query returning the job count and newest updatedAt; any
+    create or status change alters it.
+    """
+    groups = await db.job.group_by(
+        ["userId"],
         where={"userId": user_id},
-        order={"createdAt": "desc"},
-        take=limit
+        count=True,
+        max={"updatedAt": True},
     )
 
-    return [
-        {
-            "_id": job.id,
-            "userId": job.userId,
-            "prompt": job.prompt,
-            "durationSec": job.durationSec,
-            "creditsUsed": job.creditsUsed,
-            "status": job.status,
-            "r2Url": job.r2Url,
-            "errorMessage": job.errorMessage,
-            "createdAt": int(job.createdAt.timestamp() * 1000),
-            "updatedAt": int(job.updatedAt.timestamp() * 1000),
-        }
-        for job in jobs
-    ]
+    if not groups:
+        return {"count": 0, "latestUpdatedAt": None}
+
+    return {
+        "count": groups[0]["_count"]["_all"],
+        "latestUpdatedAt": str(groups[0]["_max"]["updatedAt"]),
+    }
 
 
-async def count_active_jobs(user_id: str) -> int:
-    """Count active jobs for rate limiting"""
-    count = await db.job.count(
-        where={
-            "userId": user_id,
-            "status": {"in": ["queued", "running"]}
-        }
+async def count_active_jobs_by_user() -> Dict[str, int]:
+    """Active (queued/submitting/running) job counts for every user that has any"""
+    groups = await db.job.group_by(
+        ["userId"],
+        where={"status": {"in": ACTIVE_JOB_STATUSES}},
+        count=True,
     )
 
-    return count
+    return {group["userId"]: group["_count"]["_all"] for group in groups}
+
+
+async def get_plan_limits() -> Dict[str, Dict[str, int]]:
+    """Admission limits per plan name"""
+    plans = await db.plan.find_many()
+
+    return {
+        plan.name: {
+            "maxConcurrentJobs": plan.maxConcurrentJobs,
+            "jobsPerMinute": plan.jobsPerMinute,
+        }
+        for plan in plans
+    }
 
 
 # Credit operations
@@ -266,70 +855,19 @@ async def get_credits(user_id: str) -> Dict[str, Any]:
     }
 
 
-async def reserve_credits(
-    user_id: str,
-    credits: int,
-    job_id: str,
-    description: str
-) -> None:
-    """Reserve credits for a job"""
-    user = await db.user.find_unique(where={"id": user_id})
-
-    if not user:
-        raise Exception("User not found")
-
-    if user.credits < credits:
-        raise Exception(f"Insufficient credits. Need {credits}, have {user.credits}")
-
-    new_balance = user.credits - credits
-
-    # Update user credits
-    await db.user.update(
-        where={"id": user_id},
-        data={"credits": new_balance}
-    )
-
-    # Create ledger entry
-    await db.creditledger.create(
-        data={
-            "userId": user_id,
-            "amount": -credits,
-            "balanceAfter": new_balance,
-            "type": "subscription",
-            "description": description,
-            "jobId": job_id,
-        }
+async def _debit_credits(transaction: Prisma, user_id: str, credits: int) -> int:
+    """Conditionally decrement a balance inside a transaction; return the new balance"""
+    updated = await transaction.user.update_many(
+        where={"id": user_id, "credits": {"gte": credits}},
+        data={"credits": {"decrement": credits}}
     )
 
-
-async def refund_credits(
-    user_id: str,
-    credits: int,
-    job_id: str,
-    reason: str
-) -> None:
-    """Refund credits"""
-    user = await db.user.find_unique(where={"id": user_id})
+    user = await transaction.user.find_unique(where={"id": user_id})
 
     if not user:
         raise Exception("User not found")
 
-    new_balance = user.credits + credits
-
-    # Update user credits
-    await db.user.update(
-        where={"id": user_id},
-        data={"credits": new_balance}
-    )
+    if updated == 0:
+        raise InsufficientCreditsError(credits, user.credits)
 
-    # Create ledger entry
-    await db.creditledger.create(
-        data={
-            "userId": user_id,
-            "amount": credits,
-            "balanceAfter": new_balance,
-            "type": "refund",
-            "description": f"Refund: {reason}",
-            "jobId": job_id,
-        }
-    )
+    return user.credits
@@ -0,0 +1,179 @@
+"""
+In-process pub/sub for job status events.
+
+The webhook handler publishes every status transition; SSE and WebSocket
+subscribers receive them instead of polling /jobs/{job_id}. The backend is
+pluggable: InMemoryPubSub serves a single process (and tests), RedisPubSub
+fans out across gateway processes.
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class Subscription:
+    """A stream of messages for one channel"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self._queue = queue
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next message, or None if timeout elapses first"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+
+class PubSubBackend:
+    """Interface for pub/sub backends"""
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str):
+        """Async context manager yielding a Subscription"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryPubSub(PubSubBackend):
+    """Single-process backend; slow subscribers drop their oldest messages"""
+
+    def __init__(self, queue_size: int = 100):
+        self._queue_size = queue_size
+        self._channels: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        for queue in list(self._channels.get(channel, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        self._channels.setdefault(channel, set()).add(queue)
+        try:
+            yield Subscription(queue)
+        finally:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        if channel is not None:
+            return len(self._channels.get(channel, ()))
+        return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+class RedisPubSub(PubSubBackend):
+    """Cross-process backend on Redis pub/sub (requires the `redis` package)"""
+
+    def __init__(self, url: str, queue_size: int = 100):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError(
+                "EVENT_BACKEND=redis requires the redis package:\n"
+                "pip install redis"
+            )
+
+        self._redis = redis.from_url(url)
+        self._queue_size = queue_size
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self._redis.publish(channel, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+
+        async def reader():
+            async for raw in pubsub.listen():
+                if raw.get("type") != "message":
+                    continue
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(json.loads(raw["data"]))
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            yield Subscription(queue)
+        finally:
+            reader_task.cancel()
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class JobEventBus:
+    """Publishes job status transitions on per-job and per-user channels"""
+
+    def __init__(self, backend: PubSubBackend):
+        self.backend = backend
+        self.published = 0
+
+    @staticmethod
+    def job_channel(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    @staticmethod
+    def user_channel(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    async def publish_job_update(self, job: Dict[str, Any]) -> None:
+        """Publish a job record (as returned by db_client); never raises"""
+        try:
+            await self.backend.publish(self.job_channel(job["_id"]), job)
+            await self.backend.publish(self.user_channel(job["userId"]), job)
+            self.published += 1
+        except Exception as e:
+            logger.warning(f"Failed to publish event for job {job.get('_id')}: {str(e)}")
+
+    def subscribe_job(self, job_id: str):
+        return self.backend.subscribe(self.job_channel(job_id))
+
+    def subscribe_user(self, user_id: str):
+        return self.backend.subscribe(self.user_channel(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"published": self.published}
+        if isinstance(self.backend, InMemoryPubSub):
+            stats["subscribers"] = self.backend.subscriber_count()
+        return stats
+
+
+def create_backend() -> PubSubBackend:
+    if settings.event_backend == "redis":
+        if not settings.redis_url:
+            raise ValueError("EVENT_BACKEND=redis requires REDIS_URL")
+        return RedisPubSub(settings.redis_url, queue_size=settings.event_queue_size)
+    return InMemoryPubSub(queue_size=settings.event_queue_size)
+
+
+# Singleton instance
+event_bus = JobEventBus(create_backend())
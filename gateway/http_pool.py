@@ -0,0 +1,58 @@
+"""Shared construction of long-lived, pooled httpx clients"""
+from typing import Optional
+
+import httpx
+
+from config import get_settings
+
+settings = get_settings()
+
+
+def build_async_client(
+    base_url: str = "",
+    headers: Optional[dict] = None,
+    timeout: float = 30.0,
+) -> httpx.AsyncClient:
+    """
+    Create an app-lifetime AsyncClient with the configured pool limits.
+
+    HTTP/2 requires the optional `h2` package and is off unless HTTP2_ENABLED is set.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        http2=settings.http2_enabled,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+    )
+
+
+class PooledHTTPClient:
+    """Mixin holding one pooled AsyncClient, opened on startup and closed on shutdown"""
+
+    _http: Optional[httpx.AsyncClient] = None
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Open the connection pool (called from the FastAPI startup hook)"""
+        if self._http is None or self._http.is_closed:
+            self._http = self._build_http_client()
+
+    async def close(self) -> None:
+        """Close the connection pool (called from the FastAPI shutdown hook)"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Lazily open the pool for scripts and tests that skip the startup hook
+        if self._http is None or self._http.is_closed:
+            self._http = self._build_http_client()
+        return self._http
@@ -1,19 +1,40 @@
-import hmac
 import hashlib
+import hmac
 import logging
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+import math
+from contextlib import AsyncExitStack
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from typing import Optional, Dict, Any
+from pydantic import ValidationError
 
 from config import get_settings
-from auth import verify_clerk_token, get_user_id_from_token
+from admission import admission, QueueLimitError, RateLimitError
+from auth import verify_clerk_token, verify_token, get_user_id_from_token
+from events import event_bus, TERMINAL_STATUSES
+from webhooks import (
+    WebhookQueueFullError,
+    ingest_runpod_event,
+    processed_webhooks,
+    verify_signature,
+    webhook_queue,
+    webhook_stats,
+)
 from runpod_client import runpod_client
+from convex_client import convex_client
 from r2_client import r2_client
+from reconciler import job_reconciler
+from scheduler import scheduler
+from result_cache import result_cache
 import db_client
+from user_cache import user_cache, resolve_user
 from models import (
     CreateJobRequest,
     CreateJobResponse,
+    CreateJobBatchRequest,
+    CreateJobBatchResponse,
+    BatchJobResult,
     JobStatusResponse,
     CreditsResponse,
     RunPodWebhookPayload,
@@ -30,6 +51,7 @@ logger = logging.getLogger(__name__)
 
 # Settings
 settings = get_settings()
+webhook_secret = settings.webhook_runpod_secret.encode()
 
 # FastAPI app
 app = FastAPI(
@@ -45,6 +67,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 
@@ -53,10 +76,29 @@ app.add_middleware(
 async def startup():
     await db_client.connect_db()
     logger.info("Database connected")
+    await admission.start()
+    scheduler.restore(await db_client.list_active_jobs())
+    await scheduler.start()
+    await runpod_client.start()
+    await convex_client.start()
+    logger.info("HTTP client pools started")
+    await webhook_queue.start()
+    if settings.reconciler_enabled:
+        await job_reconciler.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await admission.close()
+    await scheduler.close()
+    await job_reconciler.close()
+    await webhook_queue.close()
+    logger.info("Webhook queue drained")
+    await runpod_client.close()
+    await convex_client.close()
+    logger.info("HTTP client pools closed")
+    r2_client.close()
+    await event_bus.backend.close()
     await db_client.disconnect_db()
     logger.info("Database disconnected")
 
@@ -81,6 +123,32 @@ async def health_check():
     )
 
 
+# Internal metrics
+@app.get("/metrics")
+async def metrics(x_metrics_key: Optional[str] = Header(None)):
+    """In-process cache and queue counters, for callers holding METRICS_API_KEY"""
+    if not settings.metrics_api_key:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_metrics_key or not hmac.compare_digest(x_metrics_key.encode(), settings.metrics_api_key.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics key")
+
+    return {
+        "userCache": user_cache.stats(),
+        "admission": admission.stats(),
+        "scheduler": scheduler.stats(),
+        "resultCache": result_cache.stats(),
+        "r2Pool": r2_client.stats(),
+        "presignCache": r2_client.presign_cache.stats(),
+        "events": event_bus.stats(),
+        "webhooks": {
+            **webhook_stats,
+            **webhook_queue.stats(),
+            "dedupCacheSize": len(processed_webhooks),
+        },
+        "reconciler": job_reconciler.stats(),
+    }
+
+
 # Get or create user (called by frontend after Clerk auth)
 @app.post("/users/init")
 async def initialize_user(token_payload: dict = Depends(verify_clerk_token)):
@@ -90,6 +158,7 @@ async def initialize_user(token_payload: dict = Depends(verify_clerk_token)):
         email = token_payload.get('email', '')
 
         user = await db_client.get_or_create_user(clerk_id, email)
+        user_cache.put(user)
 
         return user
     except Exception as e:
@@ -105,12 +174,12 @@ async def get_credits(token_payload: dict = Depends(verify_clerk_token)):
         clerk_id = get_user_id_from_token(token_payload)
 
         # Get user
-        user = await db_client.get_user_by_clerk_id(clerk_id)
+        user = await resolve_user(clerk_id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Get credits
+        # Get credits (always read fresh, never from the user cache)
         credits_data = await db_client.get_credits(user["_id"])
 
         return CreditsResponse(**credits_data)
@@ -131,157 +200,295 @@ async def create_job(
     try:
         clerk_id = get_user_id_from_token(token_payload)
 
-        # Get user
-        user = await db_client.get_user_by_clerk_id(clerk_id)
+        # Get user (the balance is checked inside the reservation transaction)
+        user = await resolve_user(clerk_id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         user_id = user["_id"]
 
-        # Check rate limiting (max concurrent jobs)
-        active_jobs = await db_client.count_active_jobs(user_id)
-
-        if active_jobs >= settings.max_concurrent_jobs_per_user:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Maximum {settings.max_concurrent_jobs_per_user} concurrent jobs allowed"
-            )
-
         # Calculate credits needed
         credits_needed = request.durationSec // 5
 
-        # Check user has enough credits
-        if user["credits"] < credits_needed:
+        # Check queued-job and submission rate limits (in memory)
+        try:
+            admission.admit(user_id, user.get("plan"))
+        except QueueLimitError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        except RateLimitError as e:
             raise HTTPException(
-                status_code=402,
-                detail=f"Insufficient credits. Need {credits_needed}, have {user['credits']}"
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
             )
 
-        # Create job in database
-        job_id = await db_client.create_job(
-            user_id=user_id,
-            prompt=request.prompt,
-            duration_sec=request.durationSec,
-            credits_used=credits_needed,
-            image_url=request.imageUrl,
-            seed=request.seed,
-            cfg=request.cfg or 7.5,
-        )
-
-        # Reserve credits
+        # Create job and reserve credits atomically (reusing identical seeded work)
         try:
-            await db_client.reserve_credits(
+            reservation = await db_client.create_job_with_reservation(
                 user_id=user_id,
-                credits=credits_needed,
-                job_id=job_id,
-                description=f"Video generation ({request.durationSec}s)"
-            )
-        except Exception as e:
-            # Delete job if credit reservation fails
-            await db_client.update_job_status(
-                job_id=job_id,
-                status="failed",
-                error_message=str(e)
-            )
-            raise HTTPException(status_code=402, detail=str(e))
-
-        # Submit to RunPod
-        try:
-            runpod_response = await runpod_client.submit_job(
                 prompt=request.prompt,
                 duration_sec=request.durationSec,
+                credits_used=credits_needed,
+                description=f"Video generation ({request.durationSec}s)",
                 image_url=request.imageUrl,
                 seed=request.seed,
                 cfg=request.cfg or 7.5,
+                params_hash=result_cache.params_hash(
+                    request.prompt, request.durationSec, request.seed, request.cfg or 7.5, request.imageUrl,
+                ),
+                charge_reused=result_cache.charge_reused,
+                reuse_min_remaining=result_cache.min_remaining,
             )
+        except db_client.InsufficientCreditsError as e:
+            admission.cancel(user_id)
+            raise HTTPException(status_code=402, detail=str(e))
+        except Exception:
+            admission.cancel(user_id)
+            raise
+
+        schedule_reserved_job(reservation, request, user)
+
+        return CreateJobResponse(
+            jobId=reservation["jobId"],
+            creditsUsed=reservation["creditsUsed"],
+            creditsRemaining=reservation["creditsRemaining"]
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
+
+
+def schedule_reserved_job(reserved: Dict[str, Any], request: CreateJobRequest, user: Dict[str, Any]) -> None:
+    """
+    Hand a freshly reserved job to the scheduler.
+
+    Jobs that reused a finished result are already done; jobs following an
+    identical in-flight job are finalized along with it.
+    """
+    job_id = reserved["jobId"]
+    if result_cache.enabled and request.seed is not None:
+        result_cache.record(reserved)
+
+    if reserved["status"] == "done":
+        admission.release(user["_id"])
+        logger.info(f"Job {job_id} reused the result of {reserved['sourceJobId']}")
+        return
+
+    if reserved.get("sourceJobId"):
+        logger.info(f"Job {job_id} coalesced onto in-flight job {reserved['sourceJobId']}")
+        return
+
+    # Stays queued until the scheduler releases it to RunPod
+    scheduler.enqueue(
+        {
+            "_id": job_id,
+            "userId": user["_id"],
+            "prompt": request.prompt,
+            "imageUrl": request.imageUrl,
+            "durationSec": request.durationSec,
+            "creditsUsed": reserved["creditsUsed"],
+            "seed": request.seed,
+            "cfg": request.cfg or 7.5,
+        },
+        plan=user.get("plan"),
+    )
+    logger.info(f"Job {job_id} queued for RunPod")
 
-            runpod_job_id = runpod_response.get("id")
 
-            # Update job with RunPod job ID
-            await db_client.update_job_status(
-                job_id=job_id,
-                status="running",
-                runpod_job_id=runpod_job_id
+# Create several jobs in one request
+@app.post("/jobs/batch", response_model=CreateJobBatchResponse)
+async def create_job_batch(
+    request: CreateJobBatchRequest,
+    token_payload: dict = Depends(verify_clerk_token)
+):
+    """
+    Create up to JOBS_BATCH_MAX_SIZE jobs with one auth check and one reservation.
+
+    A batch takes one token from the batches-per-minute limit and admits jobs
+    in order until the queued-jobs limit; the rest get a per-item error.
+    Admitted jobs wait in the scheduler until the plan's concurrent-job limit
+    leaves room. Credits for the admitted jobs are reserved all-or-nothing.
+    """
+    try:
+        if len(request.jobs) > settings.jobs_batch_max_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.jobs_batch_max_size} jobs per batch",
             )
 
-            logger.info(f"Job {job_id} submitted to RunPod as {runpod_job_id}")
+        clerk_id = get_user_id_from_token(token_payload)
+        user = await resolve_user(clerk_id)
 
-        except Exception as e:
-            logger.error(f"Failed to submit to RunPod: {str(e)}")
-            # Refund credits and mark job as failed
-            await db_client.refund_credits(
-                user_id=user_id,
-                credits=credits_needed,
-                job_id=job_id,
-                reason="RunPod submission failed"
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        user_id = user["_id"]
+
+        try:
+            admitted = admission.admit(user_id, user.get("plan"), jobs=len(request.jobs), batch=True)
+        except QueueLimitError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        except RateLimitError as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
             )
-            await db_client.update_job_status(
-                job_id=job_id,
-                status="failed",
-                error_message=str(e)
+
+        items = request.jobs[:admitted]
+        try:
+            reservation = await db_client.create_jobs_with_reservation(
+                user_id=user_id,
+                jobs=[
+                    {
+                        "prompt": item.prompt,
+                        "duration_sec": item.durationSec,
+                        "credits_used": item.durationSec // 5,
+                        "description": f"Video generation ({item.durationSec}s)",
+                        "image_url": item.imageUrl,
+                        "seed": item.seed,
+                        "cfg": item.cfg or 7.5,
+                        "params_hash": result_cache.params_hash(
+                            item.prompt, item.durationSec, item.seed, item.cfg or 7.5, item.imageUrl,
+                        ),
+                    }
+                    for item in items
+                ],
+                charge_reused=result_cache.charge_reused,
+                reuse_min_remaining=result_cache.min_remaining,
             )
-            raise HTTPException(status_code=500, detail=f"Failed to submit job: {str(e)}")
+        except db_client.InsufficientCreditsError as e:
+            admission.cancel(user_id, admitted, batch=True)
+            raise HTTPException(status_code=402, detail=str(e))
+        except Exception:
+            admission.cancel(user_id, admitted, batch=True)
+            raise
 
-        return CreateJobResponse(
-            jobId=job_id,
-            creditsUsed=credits_needed,
-            creditsRemaining=user["credits"] - credits_needed
+        results = []
+        for index, (item, reserved) in enumerate(zip(items, reservation["jobs"])):
+            schedule_reserved_job(reserved, item, user)
+            results.append(BatchJobResult(index=index, jobId=reserved["jobId"], creditsUsed=reserved["creditsUsed"]))
+
+        limit_error = str(QueueLimitError(admission.max_queued_jobs))
+        for index in range(admitted, len(request.jobs)):
+            results.append(BatchJobResult(index=index, error=limit_error))
+
+        logger.info(f"Queued {admitted} of {len(request.jobs)} batch jobs for user {user_id}")
+
+        return CreateJobBatchResponse(
+            jobs=results,
+            creditsUsed=sum(result.creditsUsed for result in results),
+            creditsRemaining=reservation["creditsRemaining"],
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to create job: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
+        logger.error(f"Failed to create job batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create job batch: {str(e)}")
+
+
+async def presign_job_video(job: Dict[str, Any]) -> Optional[str]:
+    """Presigned URL for a finished job's video (served from the presign cache on repeats)"""
+    if not job.get("r2Url"):
+        return None
+
+    # Extract key from R2 URL
+    r2_key = job["r2Url"].split("/")[-1]
+    # Generate presigned URL valid for 24 hours
+    return await r2_client.generate_presigned_url(f"outputs/{r2_key}", expiration=86400)
+
+
+def serialize_job_status(job: Dict[str, Any], r2_url: Optional[str]) -> JobStatusResponse:
+    return JobStatusResponse(
+        jobId=job["_id"],
+        status=job["status"],
+        prompt=job["prompt"],
+        durationSec=job["durationSec"],
+        creditsUsed=job["creditsUsed"],
+        r2Url=r2_url,
+        expiresAt=job.get("expiresAt"),
+        errorMessage=job.get("errorMessage"),
+        createdAt=job["createdAt"],
+        updatedAt=job["updatedAt"],
+    )
+
+
+async def build_job_status(job: Dict[str, Any]) -> JobStatusResponse:
+    """Serialize a job record, presigning the video URL if it is ready"""
+    return serialize_job_status(job, await presign_job_video(job))
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+async def get_owned_job(job_id: str, clerk_id: str) -> Dict[str, Any]:
+    """Load a job and check it belongs to the user"""
+    # Get user
+    user = await resolve_user(clerk_id)
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Get job
+    job = await db_client.get_job(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Verify job belongs to user
+    if job["userId"] != user["_id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return job
 
 
 # Get job status
 @app.get("/jobs/{job_id}", response_model=JobStatusResponse)
 async def get_job_status(
     job_id: str,
-    token_payload: dict = Depends(verify_clerk_token)
+    response: Response,
+    token_payload: dict = Depends(verify_clerk_token),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Get status of a video generation job"""
+    """Get status of a video generation job (supports If-None-Match)"""
     try:
         clerk_id = get_user_id_from_token(token_payload)
 
-        # Get user
-        user = await db_client.get_user_by_clerk_id(clerk_id)
+        job = await get_owned_job(job_id, clerk_id)
 
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        # The presigned URL is part of the ETag so a rotated URL is never
+        # hidden behind a 304; repeats are served from the presign cache
+        r2_url = await presign_job_video(job)
+        etag = make_etag(job["_id"], job["status"], job["updatedAt"], r2_url)
 
-        # Get job
-        job = await db_client.get_job(job_id)
-
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
-
-        # Verify job belongs to user
-        if job["userId"] != user["_id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
-
-        # Generate presigned URL if video is ready
-        r2_url = None
-        if job.get("r2Url"):
-            # Extract key from R2 URL
-            r2_key = job["r2Url"].split("/")[-1]
-            # Generate presigned URL valid for 24 hours
-            r2_url = r2_client.generate_presigned_url(f"outputs/{r2_key}", expiration=86400)
-
-        return JobStatusResponse(
-            jobId=job["_id"],
-            status=job["status"],
-            prompt=job["prompt"],
-            durationSec=job["durationSec"],
-            creditsUsed=job["creditsUsed"],
-            r2Url=r2_url,
-            expiresAt=job.get("expiresAt"),
-            errorMessage=job.get("errorMessage"),
-            createdAt=job["createdAt"],
-            updatedAt=job["updatedAt"],
-        )
+        if etag_matches(etag, if_none_match):
+            return not_modified(etag)
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+
+        return serialize_job_status(job, r2_url)
 
     except HTTPException:
         raise
@@ -290,26 +497,154 @@ async def get_job_status(
         raise HTTPException(status_code=500, detail=f"Failed to get job: {str(e)}")
 
 
+# Stream job status (Server-Sent Events)
+@app.get("/jobs/{job_id}/events")
+async def stream_job_status(
+    job_id: str,
+    token_payload: dict = Depends(verify_clerk_token)
+):
+    """Push job status transitions until the job finishes (replaces polling)"""
+    clerk_id = get_user_id_from_token(token_payload)
+
+    stack = AsyncExitStack()
+    try:
+        # Subscribe before reading the snapshot so no transition is missed
+        subscription = await stack.enter_async_context(event_bus.subscribe_job(job_id))
+        job = await get_owned_job(job_id, clerk_id)
+    except HTTPException:
+        await stack.aclose()
+        raise
+    except Exception as e:
+        await stack.aclose()
+        logger.error(f"Failed to stream job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to stream job: {str(e)}")
+
+    async def event_stream():
+        async with stack:
+            current = job
+            while True:
+                status = await build_job_status(current)
+                yield f"event: job\ndata: {status.json()}\n\n"
+
+                if current["status"] in TERMINAL_STATUSES:
+                    return
+
+                current = None
+                while current is None:
+                    current = await subscription.get(timeout=settings.event_heartbeat_seconds)
+                    if current is None:
+                        yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Stream all of a user's job updates (WebSocket)
+WEBSOCKET_AUTH_PROTOCOL = "bearer"
+
+
+def websocket_token(websocket: WebSocket) -> Optional[str]:
+    """Clerk token offered as `Sec-WebSocket-Protocol: bearer, <token>`"""
+    protocols = [
+        protocol.strip()
+        for protocol in websocket.headers.get("sec-websocket-protocol", "").split(",")
+    ]
+    if len(protocols) == 2 and protocols[0] == WEBSOCKET_AUTH_PROTOCOL and protocols[1]:
+        return protocols[1]
+    return None
+
+
+@app.websocket("/ws/jobs")
+async def jobs_websocket(websocket: WebSocket):
+    """
+    Push status transitions for all of the user's jobs.
+
+    Browsers cannot set headers on WebSocket requests, so the Clerk token is
+    offered as a subprotocol: new WebSocket(url, ["bearer", token]). Unlike a
+    query parameter, it does not end up in access logs.
+    """
+    token = websocket_token(websocket)
+    if token is None:
+        await websocket.close(code=4401, reason="Missing token")
+        return
+
+    try:
+        token_payload = await verify_token(token)
+        user = await resolve_user(get_user_id_from_token(token_payload))
+    except HTTPException as e:
+        await websocket.close(code=4401, reason=e.detail)
+        return
+
+    if not user:
+        await websocket.close(code=4404, reason="User not found")
+        return
+
+    await websocket.accept(subprotocol=WEBSOCKET_AUTH_PROTOCOL)
+
+    try:
+        async with event_bus.subscribe_user(user["_id"]) as subscription:
+            while True:
+                job = await subscription.get(timeout=settings.event_heartbeat_seconds)
+                if job is None:
+                    await websocket.send_json({"type": "ping"})
+                    continue
+
+                status = await build_job_status(job)
+                await websocket.send_json({"type": "job", "job": status.dict()})
+    except WebSocketDisconnect:
+        pass
+
+
 # List user's jobs
 @app.get("/jobs")
 async def list_jobs(
-    limit: int = 20,
-    token_payload: dict = Depends(verify_clerk_token)
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    token_payload: dict = Depends(verify_clerk_token),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """List user's video generation jobs"""
+    """
+    List user's video generation jobs, newest first (supports If-None-Match).
+
+    Pass the X-Next-Cursor response header back as `cursor` for the next page;
+    `fields` is a comma-separated projection (e.g. `_id,status,createdAt`).
+    """
     try:
         clerk_id = get_user_id_from_token(token_payload)
 
         # Get user
-        user = await db_client.get_user_by_clerk_id(clerk_id)
+        user = await resolve_user(clerk_id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        limit = min(limit, settings.jobs_page_max_size)
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+        # Fingerprint the list with one aggregate before fetching rows
+        version = await db_client.get_jobs_version(user["_id"])
+        etag = make_etag(user["_id"], version["count"], version["latestUpdatedAt"], limit, cursor, fields)
+
+        if etag_matches(etag, if_none_match):
+            return not_modified(etag)
+
         # Get jobs
-        jobs = await db_client.list_user_jobs(user["_id"], limit)
+        try:
+            page = await db_client.list_user_jobs(user["_id"], limit, cursor=cursor, fields=field_list)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        return jobs
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        if page["nextCursor"]:
+            response.headers["X-Next-Cursor"] = page["nextCursor"]
+
+        return page["jobs"]
 
     except HTTPException:
         raise
@@ -318,92 +653,59 @@ async def list_jobs(
         raise HTTPException(status_code=500, detail=f"Failed to list jobs: {str(e)}")
 
 
+async def read_body_capped(request: Request, max_bytes: int) -> bytes:
+    """Read a request body, raising 413 as soon as it exceeds max_bytes (chunked bodies included)"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail="Payload too large")
+    return bytes(body)
+
+
 # RunPod webhook
 @app.post("/webhooks/runpod")
 async def runpod_webhook(
-    payload: RunPodWebhookPayload,
+    request: Request,
     x_runpod_signature: Optional[str] = Header(None)
 ):
     """Handle RunPod job completion webhook"""
     try:
-        # Verify webhook signature
-        if x_runpod_signature:
-            # Create HMAC signature
-            expected_signature = hmac.new(
-                settings.webhook_runpod_secret.encode(),
-                payload.json().encode(),
-                hashlib.sha256
-            ).hexdigest()
-
-            if not hmac.compare_digest(x_runpod_signature, expected_signature):
+        # The size cap applies before the signature check, even without Content-Length
+        body = await read_body_capped(request, settings.webhook_max_body_bytes)
+
+        # Verify webhook signature over the exact bytes RunPod sent, before parsing;
+        # with a secret configured, unsigned requests are rejected too
+        if webhook_secret:
+            if not x_runpod_signature:
+                logger.warning("Unsigned RunPod webhook")
+                raise HTTPException(status_code=401, detail="Missing signature")
+            if not verify_signature(body, x_runpod_signature, webhook_secret):
                 logger.warning("Invalid RunPod webhook signature")
                 raise HTTPException(status_code=401, detail="Invalid signature")
 
-        logger.info(f"Received RunPod webhook for job {payload.id}: {payload.status}")
-
-        # Get job by RunPod job ID
-        job = await db_client.get_job_by_runpod_id(payload.id)
-
-        if not job:
-            logger.warning(f"Job not found for RunPod ID: {payload.id}")
-            return {"status": "job not found"}
-
-        job_id = job["_id"]
-        user_id = job["userId"]
-
-        # Handle completed job
-        if payload.status == "COMPLETED":
-            if not payload.output or "r2Url" not in payload.output:
-                logger.error(f"No R2 URL in RunPod output for job {job_id}")
-                # Refund credits
-                await db_client.refund_credits(
-                    user_id=user_id,
-                    credits=job["creditsUsed"],
-                    job_id=job_id,
-                    reason="Missing video output"
-                )
-                await db_client.update_job_status(
-                    job_id=job_id,
-                    status="failed",
-                    error_message="Missing video output"
-                )
-                return {"status": "failed", "reason": "missing output"}
-
-            # Update job with video URL
-            await db_client.update_job_status(
-                job_id=job_id,
-                status="done",
-                r2_url=payload.output["r2Url"]
-            )
-
-            logger.info(f"Job {job_id} completed successfully")
-            return {"status": "success"}
-
-        # Handle failed job
-        elif payload.status == "FAILED":
-            error_message = payload.error or "Unknown error"
+        try:
+            payload = RunPodWebhookPayload.model_validate_json(body)
+        except ValidationError:
+            raise HTTPException(status_code=422, detail="Invalid webhook payload")
 
-            # Refund credits
-            await db_client.refund_credits(
-                user_id=user_id,
-                credits=job["creditsUsed"],
-                job_id=job_id,
-                reason=error_message
-            )
+        logger.info(f"Received RunPod webhook for job {payload.id}: {payload.status}")
 
-            # Update job status
-            await db_client.update_job_status(
-                job_id=job_id,
-                status="failed",
-                error_message=error_message
+        # Acknowledge now; webhook_queue applies the update in the background
+        try:
+            return ingest_runpod_event(
+                runpod_job_id=payload.id,
+                status=payload.status,
+                output=payload.output,
+                error=payload.error,
             )
-
-            logger.info(f"Job {job_id} failed: {error_message}")
-            return {"status": "refunded"}
-
-        else:
-            logger.info(f"Job {job_id} status: {payload.status}")
-            return {"status": "acknowledged"}
+        except WebhookQueueFullError as e:
+            logger.warning(f"Rejecting RunPod webhook for job {payload.id}: {str(e)}")
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
     except HTTPException:
         raise
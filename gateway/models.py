@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 
 
 class CreateJobRequest(BaseModel):
@@ -22,6 +22,23 @@ class CreateJobResponse(BaseModel):
     creditsRemaining: int
 
 
+class CreateJobBatchRequest(BaseModel):
+    jobs: List[CreateJobRequest] = Field(..., min_length=1, description="Jobs to create in one reservation")
+
+
+class BatchJobResult(BaseModel):
+    index: int
+    jobId: Optional[str] = None
+    creditsUsed: int = 0
+    error: Optional[str] = None
+
+
+class CreateJobBatchResponse(BaseModel):
+    jobs: List[BatchJobResult]
+    creditsUsed: int
+    creditsRemaining: int
+
+
 class JobStatusResponse(BaseModel):
     jobId: str
     status: str
@@ -1,31 +1,167 @@
-import boto3
-from botocore.config import Config
-from botocore.exceptions import ClientError
-from typing import Optional
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
 from config import get_settings
+from sigv4 import SigV4Presigner
 
 settings = get_settings()
 
 
+class PresignedURLCache:
+    """
+    Bounded LRU of presigned URLs keyed by (object key, expiration).
+
+    A URL is reused until reuse_fraction of its lifetime has passed, so polling
+    clients see a stable URL (browser/CDN cacheable) and signing work is skipped.
+    """
+
+    def __init__(self, max_size: int = 10000, reuse_fraction: float = 0.5):
+        self._max_size = max_size
+        self._reuse_fraction = reuse_fraction
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, expiration: int) -> Optional[str]:
+        cache_key = (key, expiration)
+        entry = self._entries.get(cache_key)
+
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[cache_key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(cache_key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, expiration: int, url: str) -> None:
+        if self._max_size <= 0 or self._reuse_fraction <= 0:
+            return
+
+        cache_key = (key, expiration)
+        reuse_until = time.time() + expiration * self._reuse_fraction
+        self._entries[cache_key] = (url, reuse_until)
+        self._entries.move_to_end(cache_key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        for cache_key in [k for k in self._entries if k[0] == key]:
+            del self._entries[cache_key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+
 class R2Client:
-    """Client for Cloudflare R2 operations"""
+    """
+    Client for Cloudflare R2 operations
 
-    def __init__(self):
-        self.client = boto3.client(
-            's3',
+    boto3 is blocking, so every boto3 call runs on a dedicated bounded thread pool
+    and is exposed as an awaitable; a slow R2 call never stalls the event loop.
+
+    Presigning, the only operation on the request path, uses the pure-Python
+    SigV4Presigner; boto3 is imported on first use by the admin operations.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        presign_cache_size: int = 10000,
+        presign_reuse_fraction: float = 0.5,
+    ):
+        self._client = None
+        self.presigner = SigV4Presigner(
             endpoint_url=settings.r2_endpoint_url,
-            aws_access_key_id=settings.r2_access_key_id,
-            aws_secret_access_key=settings.r2_secret_access_key,
-            config=Config(signature_version='s3v4'),
-            region_name='auto',
+            access_key_id=settings.r2_access_key_id,
+            secret_access_key=settings.r2_secret_access_key,
+            region='auto',
         )
         self.bucket = settings.r2_bucket
         self.public_domain = settings.r2_public_domain
 
-    def generate_presigned_url(self, key: str, expiration: int = 86400) -> str:
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="r2")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+
+        self.presign_cache = PresignedURLCache(
+            max_size=presign_cache_size,
+            reuse_fraction=presign_reuse_fraction,
+        )
+
+    @property
+    def client(self):
+        """boto3 S3 client, created on first use"""
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            self._client = boto3.client(
+                's3',
+                endpoint_url=settings.r2_endpoint_url,
+                aws_access_key_id=settings.r2_access_key_id,
+                aws_secret_access_key=settings.r2_secret_access_key,
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=self._max_workers,
+                ),
+                region_name='auto',
+            )
+        return self._client
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking boto3 call on the R2 pool, tracking queue depth"""
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+    def stats(self) -> Dict[str, int]:
+        """Thread pool metrics: queued (waiting for a thread), active, completed"""
+        with self._lock:
+            return {
+                "maxWorkers": self._max_workers,
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+            }
+
+    def close(self) -> None:
+        """Stop accepting work and wait for in-flight calls"""
+        self._executor.shutdown(wait=True)
+
+    async def generate_presigned_url(self, key: str, expiration: int = 86400) -> str:
         """
         Generate a presigned URL for downloading a file from R2
 
+        A previously issued URL for the same key and expiration is reused
+        while it is within the configured fraction of its lifetime.
+
         Args:
             key: Object key in R2
             expiration: URL expiration time in seconds (default 24 hours)
@@ -33,18 +169,13 @@ class R2Client:
         Returns:
             Presigned URL string
         """
-        try:
-            url = self.client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': self.bucket,
-                    'Key': key,
-                },
-                ExpiresIn=expiration
-            )
-            return url
-        except ClientError as e:
-            raise Exception(f"Failed to generate presigned URL: {str(e)}")
+        cached_url = self.presign_cache.get(key, expiration)
+        if cached_url is not None:
+            return cached_url
+
+        url = self.presigner.presign_get_object(self.bucket, key, expires_in=expiration)
+        self.presign_cache.put(key, expiration, url)
+        return url
 
     def get_public_url(self, key: str) -> str:
         """
@@ -70,8 +201,11 @@ class R2Client:
         Returns:
             Object key
         """
+        from botocore.exceptions import ClientError
+
         try:
-            self.client.upload_file(
+            await self._run(
+                self.client.upload_file,
                 file_path,
                 self.bucket,
                 key,
@@ -81,7 +215,7 @@ class R2Client:
         except ClientError as e:
             raise Exception(f"Failed to upload to R2: {str(e)}")
 
-    def delete_object(self, key: str) -> bool:
+    async def delete_object(self, key: str) -> bool:
         """
         Delete an object from R2
 
@@ -91,13 +225,33 @@ class R2Client:
         Returns:
             True if successful
         """
+        from botocore.exceptions import ClientError
+
         try:
-            self.client.delete_object(Bucket=self.bucket, Key=key)
+            await self._run(self.client.delete_object, Bucket=self.bucket, Key=key)
+            self.presign_cache.invalidate(key)
             return True
         except ClientError as e:
             raise Exception(f"Failed to delete from R2: {str(e)}")
 
-    def check_object_exists(self, key: str) -> bool:
+    async def head_object(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get object metadata from R2
+
+        Args:
+            key: Object key to inspect
+
+        Returns:
+            HeadObject response, or None if the object does not exist
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            return await self._run(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+
+    async def check_object_exists(self, key: str) -> bool:
         """
         Check if an object exists in R2
 
@@ -107,12 +261,12 @@ class R2Client:
         Returns:
             True if exists, False otherwise
         """
-        try:
-            self.client.head_object(Bucket=self.bucket, Key=key)
-            return True
-        except ClientError:
-            return False
+        return await self.head_object(key) is not None
 
 
 # Singleton instance
-r2_client = R2Client()
+r2_client = R2Client(
+    max_workers=settings.r2_max_workers,
+    presign_cache_size=settings.r2_presign_cache_size,
+    presign_reuse_fraction=settings.r2_presign_reuse_fraction,
+)
@@ -0,0 +1,216 @@
+"""
+Background reconciliation of jobs whose RunPod webhook never arrived.
+
+Every interval the reconciler lists `running` jobs that have not been
+updated for a while, asks RunPod for their status (bounded concurrency),
+and applies the terminal ones through db_client.finalize_jobs, the same
+compare-and-set the webhook queue uses, so a late webhook cannot refund twice.
+
+Jobs that stay in flight keep their updatedAt, so each run continues after
+the last job of the previous page and wraps around once the end is
+reached; otherwise a full page of long-running jobs would be re-polled
+forever and the jobs behind it never looked at.
+
+Jobs left `submitting` by a gateway instance that died between claiming
+them and recording the RunPod ID are failed and refunded. Jobs still
+`queued` after stuck_after (their instance scaled in or was redeployed) are
+handed to this instance's scheduler; claim_job_for_submission keeps a job
+that is also queued elsewhere from being submitted twice.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+import db_client
+from admission import admission
+from config import get_settings
+from events import event_bus
+from runpod_client import RunPodClient, runpod_client
+from scheduler import scheduler
+from webhooks import build_transition
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# RunPod statuses after which the job will never report again
+RUNPOD_FAILED_STATUSES = ("FAILED", "CANCELLED", "TIMED_OUT")
+
+
+class JobReconciler:
+    """Periodically polls RunPod for stuck jobs and finalizes them"""
+
+    def __init__(
+        self,
+        runpod: RunPodClient,
+        interval: float = 60.0,
+        stuck_after: float = 900.0,
+        concurrency: int = 10,
+        batch_size: int = 100,
+    ):
+        self.runpod = runpod
+        self.interval = interval
+        self.stuck_after = stuck_after
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        # (updatedAt, id) of the last job polled; None starts from the oldest
+        self._cursor: Optional[Tuple[int, str]] = None
+        # (createdAt, id) of the last stale queued job looked at
+        self._queued_cursor: Optional[Tuple[int, str]] = None
+        self.runs = 0
+        self.scanned = 0
+        self.polled = 0
+        self.poll_errors = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Job reconciliation failed: {str(e)}")
+
+    async def run_once(self) -> List[Dict[str, Any]]:
+        """
+        Reconcile the next page of stuck jobs.
+
+        Returns:
+            Records for the jobs that were finalized
+        """
+        start = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stuck_after)
+        jobs = await db_client.list_stuck_jobs(
+            older_than=cutoff, limit=self.batch_size, after=self._cursor
+        )
+        self.scanned += len(jobs)
+        if len(jobs) < self.batch_size:
+            self._cursor = None
+        else:
+            self._cursor = (jobs[-1]["updatedAt"], jobs[-1]["_id"])
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self._poll_transition(job["runpodJobId"])
+
+        results = await asyncio.gather(*(poll(job) for job in jobs))
+        transitions = [transition for transition in results if transition is not None]
+
+        finalized = await db_client.finalize_jobs(transitions) if transitions else []
+        finalized += await self._fail_stale_submissions(cutoff)
+
+        for job in finalized:
+            if job["status"] == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+            logger.info(f"Reconciled job {job['_id']} to {job['status']}")
+            admission.release(job["userId"])
+            scheduler.release(job["_id"])
+            await event_bus.publish_job_update(job)
+
+        await self._requeue_orphans(cutoff)
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_duration = time.monotonic() - start
+        return finalized
+
+    async def _fail_stale_submissions(self, cutoff: datetime) -> List[Dict[str, Any]]:
+        """Fail and refund jobs whose submitting instance never recorded a RunPod ID"""
+        failed: List[Dict[str, Any]] = []
+        for job in await db_client.list_stale_submissions(older_than=cutoff, limit=self.batch_size):
+            failed += await db_client.fail_job_with_refund(
+                job_id=job["_id"],
+                error_message="Submission interrupted",
+                refund_reason="RunPod submission interrupted",
+                expected_status="submitting",
+            )
+        return failed
+
+    async def _requeue_orphans(self, cutoff: datetime) -> None:
+        """Schedule queued jobs whose instance went away before submitting them"""
+        jobs = await db_client.list_stale_queued_jobs(
+            older_than=cutoff, limit=self.batch_size, after=self._queued_cursor
+        )
+        if len(jobs) < self.batch_size:
+            self._queued_cursor = None
+        else:
+            self._queued_cursor = (jobs[-1]["createdAt"], jobs[-1]["_id"])
+
+        for job in jobs:
+            if scheduler.enqueue(job, job.get("plan")):
+                self.requeued += 1
+                logger.info(f"Requeued orphaned job {job['_id']}")
+
+    async def _poll_transition(self, runpod_job_id: str) -> Optional[Dict[str, Any]]:
+        """finalize_job arguments for a terminal RunPod job, None if still in flight or unknown"""
+        self.polled += 1
+        try:
+            status = await self.runpod.get_job_status(runpod_job_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                # RunPod no longer knows the job (results expire); it will never finish
+                return build_transition(runpod_job_id, "FAILED", error="Job lost by RunPod")
+            self.poll_errors += 1
+            logger.warning(f"RunPod status for {runpod_job_id} failed: {str(e)}")
+            return None
+        except httpx.HTTPError as e:
+            self.poll_errors += 1
+            logger.warning(f"RunPod status for {runpod_job_id} failed: {str(e)}")
+            return None
+
+        runpod_status = status.get("status")
+        if runpod_status == "COMPLETED":
+            return build_transition(runpod_job_id, "COMPLETED", output=status.get("output"))
+        if runpod_status in RUNPOD_FAILED_STATUSES:
+            error = status.get("error") or f"RunPod job {runpod_status.lower()}"
+            return build_transition(runpod_job_id, "FAILED", error=error)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "runs": self.runs,
+            "scanned": self.scanned,
+            "polled": self.polled,
+            "pollErrors": self.poll_errors,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "lastRunAt": self.last_run_at,
+            "lastDurationSeconds": round(self.last_duration, 4),
+        }
+
+
+# Singleton instance
+job_reconciler = JobReconciler(
+    runpod=runpod_client,
+    interval=settings.reconciler_interval_seconds,
+    stuck_after=settings.reconciler_stuck_after_seconds,
+    concurrency=settings.reconciler_concurrency,
+    batch_size=settings.reconciler_batch_size,
+)
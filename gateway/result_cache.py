@@ -0,0 +1,87 @@
+"""
+Content-addressed reuse of generation results.
+
+A seeded request is deterministic, so its parameters are hashed and stored
+on the job. db_client.create_jobs_with_reservation uses the hash to hand a
+new job an existing video (a finished job) or to attach it to an identical
+job that is still queued or running, instead of spending another GPU run.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+
+class ResultCache:
+    """Hashing policy and counters for generation result reuse"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        namespace: str = "v1",
+        charge_reused: bool = True,
+        min_remaining: float = 3600,
+    ):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.charge_reused = charge_reused
+        self.min_remaining = min_remaining
+        self.lookups = 0
+        self.reused = 0
+        self.coalesced = 0
+
+    def params_hash(
+        self,
+        prompt: str,
+        duration_sec: int,
+        seed: Optional[int],
+        cfg: float,
+        image_url: Optional[str] = None,
+    ) -> Optional[str]:
+        """Canonical hash of the generation parameters; None for unseeded requests"""
+        if not self.enabled or seed is None:
+            return None
+
+        canonical = json.dumps(
+            {
+                "namespace": self.namespace,
+                "prompt": prompt,
+                "durationSec": duration_sec,
+                "seed": seed,
+                "cfg": float(cfg),
+                "imageUrl": image_url,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def record(self, job: Dict[str, Any]) -> None:
+        """Count the outcome of a hashed job from create_jobs_with_reservation"""
+        self.lookups += 1
+        if job.get("sourceJobId"):
+            if job["status"] == "done":
+                self.reused += 1
+            else:
+                self.coalesced += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "coalesced": self.coalesced,
+            "misses": self.lookups - self.reused - self.coalesced,
+        }
+
+
+# Singleton instance
+result_cache = ResultCache(
+    enabled=settings.result_cache_enabled,
+    namespace=settings.result_cache_namespace,
+    charge_reused=settings.result_cache_credit_policy != "free",
+    min_remaining=settings.result_cache_min_remaining_seconds,
+)
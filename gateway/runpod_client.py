@@ -1,11 +1,12 @@
 import httpx
 from typing import Optional, Dict, Any
 from config import get_settings
+from http_pool import PooledHTTPClient, build_async_client
 
 settings = get_settings()
 
 
-class RunPodClient:
+class RunPodClient(PooledHTTPClient):
     """Client for RunPod Serverless API"""
 
     def __init__(self):
@@ -13,6 +14,12 @@ class RunPodClient:
         self.endpoint_id = settings.runpod_endpoint_id
         self.api_key = settings.runpod_api_key
 
+    def _build_http_client(self) -> httpx.AsyncClient:
+        return build_async_client(
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=30.0,
+        )
+
     async def submit_job(
         self,
         prompt: str,
@@ -20,6 +27,7 @@ class RunPodClient:
         image_url: Optional[str] = None,
         seed: Optional[int] = None,
         cfg: float = 7.5,
+        timeout: float = 30.0,
     ) -> Dict[str, Any]:
         """
         Submit a video generation job to RunPod
@@ -30,6 +38,7 @@ class RunPodClient:
             image_url: Optional image URL for image-to-video
             seed: Optional random seed for reproducibility
             cfg: Classifier-free guidance scale
+            timeout: Request timeout in seconds
 
         Returns:
             RunPod job response with job ID
@@ -48,57 +57,43 @@ class RunPodClient:
         if image_url:
             payload["input"]["imageUrl"] = image_url
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.http.post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
 
-    async def get_job_status(self, job_id: str) -> Dict[str, Any]:
+    async def get_job_status(self, job_id: str, timeout: float = 10.0) -> Dict[str, Any]:
         """
         Get status of a RunPod job
 
         Args:
             job_id: RunPod job ID
+            timeout: Request timeout in seconds
 
         Returns:
             Job status information
         """
         url = f"{self.api_url}/{self.endpoint_id}/status/{job_id}"
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-        }
+        response = await self.http.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
-
-    async def cancel_job(self, job_id: str) -> Dict[str, Any]:
+    async def cancel_job(self, job_id: str, timeout: float = 10.0) -> Dict[str, Any]:
         """
         Cancel a RunPod job
 
         Args:
             job_id: RunPod job ID
+            timeout: Request timeout in seconds
 
         Returns:
             Cancellation confirmation
         """
         url = f"{self.api_url}/{self.endpoint_id}/cancel/{job_id}"
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-        }
-
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, headers=headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.http.post(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
 
 
 # Singleton instance
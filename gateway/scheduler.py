@@ -0,0 +1,313 @@
+"""
+Gateway-side job scheduler.
+
+/jobs/create leaves new jobs `queued` and hands them to the scheduler, which
+submits them to RunPod only while fewer than max_in_flight jobs are running
+(roughly the endpoint's GPU worker count), so bursts wait here instead of in
+RunPod's queue. The budget is shared by all gateway instances: the in-flight
+set is the `submitting`/`running` jobs in the database, resynced every
+sync_interval, because the webhook or reconciler pass that frees a slot
+usually runs on another instance. Between syncs instances may overshoot the
+budget slightly. The release order is weighted fair queuing: each user is a
+flow weighted by their plan, and a job's cost is its duration in 5 s units,
+so a studio account gets a larger share than a starter account but cannot
+starve it, and long clips use up a share faster than short ones. A user
+already running their plan's concurrent-job limit has their next job parked
+until one of their jobs leaves RunPod, so other users' jobs go first.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+import db_client
+from admission import admission
+from config import get_settings
+from events import event_bus
+from runpod_client import runpod_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def job_cost(duration_sec: int) -> float:
+    """Scheduling cost of a job: GPU time scales with clip length (5/10/15 s -> 1/2/3)"""
+    return max(duration_sec, 5) / 5
+
+
+class WeightedFairQueue:
+    """
+    Self-clocked weighted fair queue.
+
+    Each item gets a virtual finish tag max(V, flow's last tag) + cost / weight;
+    pop() returns the smallest tag and advances V to it. Items of one flow keep
+    their order; idle flows do not bank credit.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._last_finish: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self.virtual_time = 0.0
+
+    def push(self, item: Any, flow: str, weight: float, cost: float) -> None:
+        start = max(self.virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + cost / weight
+        self._last_finish[flow] = finish
+        heapq.heappush(self._heap, (finish, next(self._sequence), item))
+
+    def pop(self) -> Any:
+        finish, _, item = heapq.heappop(self._heap)
+        self.virtual_time = finish
+        if len(self._last_finish) > 2 * len(self._heap) + 64:
+            # Flows at or behind V would restart from V anyway
+            self._last_finish = {
+                flow: tag for flow, tag in self._last_finish.items() if tag > self.virtual_time
+            }
+        return item
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+async def submit_to_runpod(job: Dict[str, Any]) -> bool:
+    """
+    Submit a queued job and mark it running; refund and fail it if RunPod rejects it.
+
+    The job is claimed in the database first, so when several gateway
+    instances hold the same queued job (each restores every queued job on
+    startup) only one of them submits it.
+    """
+    if not await db_client.claim_job_for_submission(job["_id"]):
+        logger.info(f"Job {job['_id']} was already claimed for submission, skipping")
+        return False
+
+    try:
+        runpod_response = await runpod_client.submit_job(
+            prompt=job["prompt"],
+            duration_sec=job["durationSec"],
+            image_url=job.get("imageUrl"),
+            seed=job.get("seed"),
+            cfg=job.get("cfg") or 7.5,
+        )
+
+        runpod_job_id = runpod_response.get("id")
+
+        # Update job with RunPod job ID
+        updated_job = await db_client.update_job_status(
+            job_id=job["_id"],
+            status="running",
+            runpod_job_id=runpod_job_id
+        )
+        await event_bus.publish_job_update(updated_job)
+
+        logger.info(f"Job {job['_id']} submitted to RunPod as {runpod_job_id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to submit job {job['_id']} to RunPod: {str(e)}")
+        # Refund credits and mark the job (and any jobs following it) as failed
+        failed_jobs = await db_client.fail_job_with_refund(
+            job_id=job["_id"],
+            error_message=str(e),
+            refund_reason="RunPod submission failed",
+            expected_status="submitting",
+        )
+        for failed_job in failed_jobs:
+            admission.release(failed_job["userId"])
+            await event_bus.publish_job_update(failed_job)
+        return False
+
+
+class JobScheduler:
+    """Holds queued jobs and releases them to RunPod within an in-flight budget"""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        plan_weights: Dict[str, float],
+        submit: Callable[[Dict[str, Any]], Awaitable[bool]] = submit_to_runpod,
+        fair: bool = True,
+        sync_interval: float = 15.0,
+        user_limit: Optional[Callable[[Optional[str]], int]] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.plan_weights = plan_weights
+        self.submit = submit
+        self.fair = fair
+        self.sync_interval = sync_interval
+        # Concurrent jobs allowed per user by plan (None for no per-user cap)
+        self.user_limit = user_limit
+        self._queue = WeightedFairQueue()
+        self._queued_ids: Set[str] = set()
+        # Job ID -> user ID
+        self._in_flight: Dict[str, str] = {}
+        # Dispatched by this process, submit call not finished yet
+        self._submitting: Dict[str, str] = {}
+        # Popped while the user was at their concurrent-job limit, per user
+        self._parked: Dict[str, List[Tuple[float, Dict[str, Any], Optional[str]]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.submit_failures = 0
+        self.total_wait = 0.0
+        self.syncs = 0
+        self.corrections = 0
+
+    def weight(self, plan: Optional[str]) -> float:
+        return self.plan_weights.get(plan, 1.0)
+
+    def enqueue(self, job: Dict[str, Any], plan: Optional[str]) -> bool:
+        """
+        Queue a job record (needs _id, userId, durationSec and the submit fields).
+
+        Returns:
+            False if the job is already queued or in flight here
+        """
+        if job["_id"] in self._queued_ids or job["_id"] in self._in_flight:
+            return False
+        self._push((time.monotonic(), job, plan), job_cost(job["durationSec"]))
+        self._queued_ids.add(job["_id"])
+        self._dispatch()
+        return True
+
+    def _push(self, entry: Tuple[float, Dict[str, Any], Optional[str]], cost: float) -> None:
+        _, job, plan = entry
+        if self.fair:
+            self._queue.push(entry, job["userId"], self.weight(plan), cost)
+        else:
+            self._queue.push(entry, "fifo", 1.0, 1.0)
+
+    def release(self, job_id: str) -> None:
+        """A job left RunPod (finished, failed or lost); free its slot"""
+        if job_id in self._in_flight:
+            del self._in_flight[job_id]
+            self._dispatch()
+
+    def sync(self, in_flight: Mapping[str, str]) -> None:
+        """
+        Replace the in-flight set with the submitting/running jobs in the database.
+
+        Jobs this process is still submitting are kept even if the database
+        does not show them as claimed yet.
+        """
+        in_flight = {**in_flight, **self._submitting}
+        if in_flight != self._in_flight:
+            self.corrections += 1
+        self._in_flight = in_flight
+        self.syncs += 1
+        self._dispatch()
+
+    async def resync(self) -> None:
+        """Reload the in-flight set from the database"""
+        self.sync(await db_client.list_in_flight_jobs())
+
+    def restore(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Rebuild state after a restart from db_client.list_active_jobs().
+
+        Jobs being submitted or running (on any instance) count against the
+        budget until a resync shows they finished; queued jobs are requeued.
+        """
+        self.sync({job["_id"]: job["userId"] for job in jobs if job["status"] in ("submitting", "running")})
+        for job in jobs:
+            if job["status"] == "queued" and not job.get("runpodJobId") and not job.get("sourceJobId"):
+                self.enqueue(job, job.get("plan"))
+
+    def _at_user_limit(self, running: Counter, user_id: str, plan: Optional[str]) -> bool:
+        return self.user_limit is not None and running[user_id] >= self.user_limit(plan)
+
+    def _dispatch(self) -> None:
+        running = Counter(self._in_flight.values())
+        # Once a user has a free slot their parked jobs are requeued, without being charged again
+        for user_id, parked in list(self._parked.items()):
+            if not self._at_user_limit(running, user_id, parked[0][2]):
+                del self._parked[user_id]
+                for entry in parked:
+                    self._push(entry, 0.0)
+
+        while self._queue and len(self._in_flight) < self.max_in_flight:
+            entry = self._queue.pop()
+            enqueued_at, job, plan = entry
+            if self._at_user_limit(running, job["userId"], plan):
+                self._parked.setdefault(job["userId"], []).append(entry)
+                continue
+            running[job["userId"]] += 1
+            self._queued_ids.discard(job["_id"])
+            self._in_flight[job["_id"]] = job["userId"]
+            self._submitting[job["_id"]] = job["userId"]
+            self.dispatched += 1
+            self.total_wait += time.monotonic() - enqueued_at
+            task = asyncio.create_task(self._submit(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _submit(self, job: Dict[str, Any]) -> None:
+        try:
+            submitted = await self.submit(job)
+        except Exception as e:
+            logger.error(f"Scheduler submit for job {job['_id']} raised: {str(e)}")
+            submitted = False
+        finally:
+            self._submitting.pop(job["_id"], None)
+        if not submitted:
+            self.submit_failures += 1
+            self.release(job["_id"])
+
+    async def start(self) -> None:
+        """Resync the in-flight set every sync_interval"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.error(f"Scheduler resync failed: {str(e)}")
+
+    async def close(self) -> None:
+        """
+        Stop resyncing and wait for submissions already started.
+
+        Queued jobs stay queued in the database; another instance's
+        reconciler picks them up once they are older than its stuck_after.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def parked_count(self) -> int:
+        return sum(len(parked) for parked in self._parked.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue) + self.parked_count(),
+            "parked": self.parked_count(),
+            "inFlight": len(self._in_flight),
+            "maxInFlight": self.max_in_flight,
+            "dispatched": self.dispatched,
+            "submitFailures": self.submit_failures,
+            "avgWaitSeconds": round(self.total_wait / self.dispatched, 4) if self.dispatched else 0.0,
+            "syncs": self.syncs,
+            "corrections": self.corrections,
+        }
+
+
+# Singleton instance
+scheduler = JobScheduler(
+    max_in_flight=settings.scheduler_max_in_flight,
+    plan_weights=settings.scheduler_plan_weights,
+    sync_interval=settings.scheduler_sync_interval_seconds,
+    user_limit=lambda plan: admission.limits_for(plan).max_concurrent_jobs,
+)
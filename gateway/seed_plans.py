@@ -0,0 +1,64 @@
+"""
+Seed the Plan table with the subscription plans and their admission limits.
+
+Run after `prisma db push`:
+
+    python seed_plans.py
+
+Existing plans are updated in place, so re-running it after changing PLANS
+applies the new limits (gateways pick them up on their next reconcile).
+"""
+import asyncio
+import json
+
+import db_client
+
+PLANS = [
+    {
+        "name": "starter",
+        "displayName": "Starter",
+        "credits": 80,
+        "price": 1000,
+        "features": ["80 credits/month", "720p @ 24fps", "24-hour video access", "Email support"],
+        "maxConcurrentJobs": 2,
+        "jobsPerMinute": 10,
+    },
+    {
+        "name": "creator",
+        "displayName": "Creator",
+        "credits": 250,
+        "price": 3100,
+        "features": ["250 credits/month", "720p @ 24fps", "24-hour video access", "Priority queue", "Email support"],
+        "maxConcurrentJobs": 5,
+        "jobsPerMinute": 20,
+    },
+    {
+        "name": "studio",
+        "displayName": "Studio",
+        "credits": 500,
+        "price": 6000,
+        "features": [
+            "500 credits/month", "720p @ 24fps", "24-hour video access", "Priority queue", "Dedicated support",
+        ],
+        "maxConcurrentJobs": 10,
+        "jobsPerMinute": 40,
+    },
+]
+
+
+async def seed_plans() -> None:
+    await db_client.connect_db()
+    try:
+        for plan in PLANS:
+            data = dict(plan, features=json.dumps(plan["features"]))
+            await db_client.db.plan.upsert(
+                where={"name": plan["name"]},
+                data={"create": data, "update": data},
+            )
+            print(f"Seeded plan {plan['name']}")
+    finally:
+        await db_client.disconnect_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(seed_plans())
@@ -0,0 +1,18 @@
+import pytest
+
+import main
+from auth import verify_clerk_token
+
+USER = {"_id": "user-1", "clerkId": "clerk_1", "email": "a@example.com", "plan": "starter", "createdAt": 0}
+
+
+@pytest.fixture
+def authenticated_user(monkeypatch):
+    """Authenticate every request as USER without touching Clerk or the database"""
+    async def fake_resolve_user(clerk_id):
+        return USER
+
+    monkeypatch.setattr(main, "resolve_user", fake_resolve_user)
+    main.app.dependency_overrides[verify_clerk_token] = lambda: {"sub": USER["clerkId"]}
+    yield USER
+    main.app.dependency_overrides.pop(verify_clerk_token, None)
@@ -0,0 +1,62 @@
+"""
+Minimal stand-in for the RunPod Serverless API.
+
+Tests mount it on an httpx ASGITransport; for local runs start it with
+`python tests/fake_runpod.py` and point RUNPOD_API_URL at http://127.0.0.1:8090.
+Jobs are held in memory and their status is set directly through `jobs`.
+"""
+import asyncio
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException
+
+
+class FakeRunPod:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.status_calls = 0
+        self.app = self._build_app()
+
+    def set_status(self, job_id: str, status: str, output: Any = None, error: str = None) -> None:
+        self.jobs[job_id] = {"id": job_id, "status": status, "output": output, "error": error}
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/{endpoint_id}/run")
+        async def run(endpoint_id: str, body: Dict[str, Any]):
+            job_id = f"fake-{uuid.uuid4().hex[:12]}"
+            self.set_status(job_id, "IN_QUEUE")
+            return {"id": job_id, "status": "IN_QUEUE"}
+
+        @app.get("/{endpoint_id}/status/{job_id}")
+        async def status(endpoint_id: str, job_id: str):
+            self.status_calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.latency)
+            finally:
+                self.in_flight -= 1
+
+            if job_id not in self.jobs:
+                raise HTTPException(status_code=404, detail="job not found")
+            return {k: v for k, v in self.jobs[job_id].items() if v is not None}
+
+        @app.post("/{endpoint_id}/cancel/{job_id}")
+        async def cancel(endpoint_id: str, job_id: str):
+            if job_id not in self.jobs:
+                raise HTTPException(status_code=404, detail="job not found")
+            self.jobs[job_id]["status"] = "CANCELLED"
+            return {"id": job_id, "status": "CANCELLED"}
+
+        return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(FakeRunPod(latency=0.05).app, host="127.0.0.1", port=8090)
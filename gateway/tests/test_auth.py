@@ -0,0 +1,165 @@
+import json
+import asyncio
+import time
+import pytest
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+from auth import VerifiedTokenCache, JWKSCache
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk["kid"] = "test-kid"
+    return private_key, jwk
+
+
+@pytest.fixture
+def loaded_keys(signing_key):
+    """Prime the module JWKS cache so no network fetch happens"""
+    _, jwk = signing_key
+    auth.jwks_cache._keys = JWKSCache._parse_keys({"keys": [jwk]})
+    auth.jwks_cache._last_fetch = time.time()
+    auth.token_cache.clear()
+    yield
+    auth.jwks_cache._keys = None
+    auth.token_cache.clear()
+
+
+def make_token(private_key, exp_offset: int = 3600, sub: str = "user_1") -> str:
+    return jwt.encode(
+        {"sub": sub, "iss": auth.settings.clerk_issuer, "exp": int(time.time()) + exp_offset},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "test-kid"},
+    )
+
+
+def test_token_cache_hit_and_lru_eviction():
+    """Test verified claims are returned until evicted by newer entries"""
+    cache = VerifiedTokenCache(max_size=2)
+    exp = time.time() + 60
+
+    cache.put("a", {"sub": "a", "exp": exp})
+    cache.put("b", {"sub": "b", "exp": exp})
+    assert cache.get("a")["sub"] == "a"
+
+    # "b" is now least recently used
+    cache.put("c", {"sub": "c", "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+
+
+def test_token_cache_expires_at_exp():
+    """Test cached claims are dropped once the token's exp has passed"""
+    cache = VerifiedTokenCache(max_size=4)
+    cache.put("expired", {"sub": "x", "exp": time.time() - 1})
+    cache.put("no-exp", {"sub": "y"})
+
+    assert cache.get("expired") is None
+    assert cache.get("no-exp") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_verify_caches_claims(signing_key, loaded_keys, monkeypatch):
+    """Test repeat verification of the same token skips the RS256 decode"""
+    private_key, _ = signing_key
+    token = make_token(private_key)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    calls = []
+    original_decode = auth.decode_token
+    monkeypatch.setattr(auth, "decode_token", lambda *a: calls.append(a) or original_decode(*a))
+
+    first = await auth.verify_clerk_token(credentials)
+    second = await auth.verify_clerk_token(credentials)
+
+    assert first["sub"] == second["sub"] == "user_1"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_verify_rejects_expired_token(signing_key, loaded_keys):
+    """Test expired tokens are rejected and not cached"""
+    private_key, _ = signing_key
+    token = make_token(private_key, exp_offset=-60)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.verify_clerk_token(credentials)
+
+    assert exc_info.value.status_code == 401
+    assert len(auth.token_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_jwks_refresh_is_single_flight(signing_key):
+    """Test concurrent cold-start callers share one JWKS fetch"""
+    _, jwk = signing_key
+    cache = JWKSCache()
+    fetches = []
+
+    async def fake_fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return {"keys": [jwk]}
+
+    cache._fetch_jwks = fake_fetch
+
+    results = await asyncio.gather(*(cache.get_keys() for _ in range(20)))
+
+    assert len(fetches) == 1
+    assert all("test-kid" in keys for keys in results)
+
+
+@pytest.mark.asyncio
+async def test_jwks_serves_stale_keys_while_refreshing(signing_key):
+    """Test expired keys are returned immediately and refreshed in the background"""
+    _, jwk = signing_key
+    cache = JWKSCache(cache_duration=300)
+    stale_keys = JWKSCache._parse_keys({"keys": [jwk]})
+    cache._keys = stale_keys
+    cache._last_fetch = time.time() - 301
+    refresh_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_fetch():
+        refresh_started.set()
+        await release.wait()
+        return {"keys": [dict(jwk, kid="rotated-kid")]}
+
+    cache._fetch_jwks = slow_fetch
+
+    assert await cache.get_keys() is stale_keys
+    await refresh_started.wait()
+    assert await cache.get_keys() is stale_keys
+
+    release.set()
+    await cache._refresh_task
+    assert "rotated-kid" in await cache.get_keys()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_forces_rate_limited_refresh(signing_key):
+    """Test an unknown kid refetches the JWKS at most once per interval"""
+    _, jwk = signing_key
+    cache = JWKSCache(min_refresh_interval=60)
+    fetches = []
+
+    async def fake_fetch():
+        fetches.append(1)
+        return {"keys": [jwk] if len(fetches) == 1 else [jwk, dict(jwk, kid="new-kid")]}
+
+    cache._fetch_jwks = fake_fetch
+
+    assert await cache.get_key("test-kid") is not None
+    assert await cache.get_key("new-kid") is not None
+    assert await cache.get_key("bogus-kid") is None
+    assert len(fetches) == 2
@@ -0,0 +1,202 @@
+"""
+Concurrency stress test for credit reservation.
+
+Runs against the local database from schema.prisma (run `prisma db push`
+first); it is skipped when no generated Prisma client or database is available.
+"""
+import asyncio
+import uuid
+import pytest
+import httpx
+import pytest_asyncio
+
+import db_client
+import main
+from admission import AdmissionController, PlanLimits
+from auth import verify_clerk_token
+from scheduler import JobScheduler
+
+PARALLEL_REQUESTS = 200
+STARTING_CREDITS = 50
+
+
+@pytest_asyncio.fixture
+async def local_user():
+    try:
+        await db_client.connect_db()
+        await db_client.db.user.count()
+    except Exception as e:
+        pytest.skip(f"Local database not available: {e}")
+
+    clerk_id = f"stress_{uuid.uuid4().hex}"
+    user = await db_client.db.user.create(
+        data={
+            "clerkId": clerk_id,
+            "email": f"{clerk_id}@example.com",
+            "plan": "studio",
+            "credits": STARTING_CREDITS,
+        }
+    )
+
+    yield user
+
+    await db_client.db.creditledger.delete_many(where={"userId": user.id})
+    await db_client.db.job.delete_many(where={"userId": user.id})
+    await db_client.db.user.delete(where={"id": user.id})
+    await db_client.disconnect_db()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_parallel_job_creation_never_overspends(local_user, monkeypatch):
+    """Test hundreds of parallel /jobs/create calls debit exactly the available credits"""
+    monkeypatch.setattr(main, "admission", AdmissionController(
+        default_limits=PlanLimits(max_concurrent_jobs=PARALLEL_REQUESTS, jobs_per_minute=PARALLEL_REQUESTS),
+    ))
+    monkeypatch.setattr(main, "scheduler", JobScheduler(max_in_flight=0, plan_weights={}))
+    main.user_cache.clear()
+    main.app.dependency_overrides[verify_clerk_token] = lambda: {"sub": local_user.clerkId}
+
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/jobs/create", json={"prompt": f"clip {i}", "durationSec": 5})
+                for i in range(PARALLEL_REQUESTS)
+            ))
+    finally:
+        main.app.dependency_overrides.pop(verify_clerk_token, None)
+
+    accepted = [r for r in responses if r.status_code == 200]
+    rejected = [r for r in responses if r.status_code == 402]
+
+    assert len(accepted) == STARTING_CREDITS
+    assert len(accepted) + len(rejected) == PARALLEL_REQUESTS
+
+    user = await db_client.db.user.find_unique(where={"id": local_user.id})
+    assert user.credits == 0
+
+    ledger = await db_client.db.creditledger.find_many(where={"userId": local_user.id})
+    assert sum(entry.amount for entry in ledger) == -STARTING_CREDITS
+    assert min(entry.balanceAfter for entry in ledger) >= 0
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_batched_webhook_refunds_apply_once(local_user):
+    """Test finalize_jobs refunds each failed job once, however often it is replayed"""
+    runpod_ids = []
+    for i in range(5):
+        result = await db_client.create_job_with_reservation(
+            user_id=local_user.id,
+            prompt=f"clip {i}",
+            duration_sec=5,
+            credits_used=2,
+            description="Video generation: 5s",
+        )
+        runpod_id = f"runpod-{uuid.uuid4().hex}"
+        await db_client.update_job_status(job_id=result["jobId"], status="running", runpod_job_id=runpod_id)
+        runpod_ids.append(runpod_id)
+
+    transitions = [
+        {"runpod_job_id": runpod_id, "status": "failed", "error_message": "OOM"}
+        for runpod_id in runpod_ids
+    ]
+    first = await db_client.finalize_jobs(transitions + transitions[:2])
+    replay = await db_client.finalize_jobs(transitions)
+
+    assert len(first) == 5
+    assert replay == []
+
+    user = await db_client.db.user.find_unique(where={"id": local_user.id})
+    assert user.credits == STARTING_CREDITS
+
+    refunds = await db_client.db.creditledger.find_many(
+        where={"userId": local_user.id, "type": "refund"},
+        order={"balanceAfter": "asc"},
+    )
+    assert [entry.balanceAfter for entry in refunds] == [42, 44, 46, 48, 50]
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_batch_reservation_is_all_or_nothing(local_user):
+    """Test a batch debits its total once and writes one ledger row per job"""
+    batch = [
+        {"prompt": f"sweep {i}", "duration_sec": 10, "credits_used": 2, "description": "Video generation (10s)"}
+        for i in range(20)
+    ]
+
+    result = await db_client.create_jobs_with_reservation(user_id=local_user.id, jobs=batch)
+    assert len(result["jobs"]) == 20
+    assert result["creditsRemaining"] == STARTING_CREDITS - 40
+
+    with pytest.raises(db_client.InsufficientCreditsError):
+        await db_client.create_jobs_with_reservation(user_id=local_user.id, jobs=batch)
+
+    assert await db_client.db.job.count(where={"userId": local_user.id}) == 20
+    ledger = await db_client.db.creditledger.find_many(
+        where={"userId": local_user.id},
+        order={"balanceAfter": "desc"},
+    )
+    assert [entry.balanceAfter for entry in ledger] == list(range(STARTING_CREDITS - 2, STARTING_CREDITS - 42, -2))
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_identical_seeded_jobs_share_one_generation(local_user):
+    """Test twins of an in-flight job follow it to completion and later twins reuse the video"""
+    params = {
+        "user_id": local_user.id,
+        "prompt": "a drone",
+        "duration_sec": 5,
+        "credits_used": 1,
+        "description": "Video generation (5s)",
+        "seed": 42,
+        "params_hash": f"hash-{uuid.uuid4().hex}",
+    }
+
+    leader = await db_client.create_job_with_reservation(**params)
+    follower = await db_client.create_job_with_reservation(**params, charge_reused=False)
+    assert leader["sourceJobId"] is None
+    assert follower == {**follower, "status": "queued", "sourceJobId": leader["jobId"], "creditsUsed": 0}
+
+    runpod_id = f"runpod-{uuid.uuid4().hex}"
+    await db_client.update_job_status(job_id=leader["jobId"], status="running", runpod_job_id=runpod_id)
+    finalized = await db_client.finalize_jobs([
+        {"runpod_job_id": runpod_id, "status": "done", "r2_url": "https://r2/outputs/twin.mp4"}
+    ])
+    assert {job["_id"]: job["status"] for job in finalized} == {leader["jobId"]: "done", follower["jobId"]: "done"}
+
+    reused = await db_client.create_job_with_reservation(**params)
+    assert reused["status"] == "done"
+    assert reused["sourceJobId"] == leader["jobId"]
+
+    job = await db_client.get_job(reused["jobId"])
+    assert job["r2Url"] == "https://r2/outputs/twin.mp4"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_job_is_claimed_for_submission_once(local_user):
+    """Test two instances restoring the same queued job submit it once and refund a failure once"""
+    result = await db_client.create_job_with_reservation(
+        user_id=local_user.id,
+        prompt="claimed",
+        duration_sec=5,
+        credits_used=2,
+        description="Video generation (5s)",
+    )
+
+    claims = await asyncio.gather(*(db_client.claim_job_for_submission(result["jobId"]) for _ in range(2)))
+    assert sorted(claims) == [False, True]
+
+    for _ in range(2):
+        await db_client.fail_job_with_refund(
+            job_id=result["jobId"],
+            error_message="RunPod unavailable",
+            expected_status="submitting",
+        )
+
+    user = await db_client.db.user.find_unique(where={"id": local_user.id})
+    assert user.credits == STARTING_CREDITS
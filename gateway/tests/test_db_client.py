@@ -0,0 +1,76 @@
+import sqlite3
+import pytest
+
+import db_client
+
+
+@pytest.fixture
+def jobs_db(monkeypatch):
+    """Run db.query_raw against an in-memory SQLite copy of the Job table"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        'CREATE TABLE "Job" ("id" TEXT PRIMARY KEY, "userId" TEXT, "prompt" TEXT, "imageUrl" TEXT, '
+        '"durationSec" INTEGER, "creditsUsed" INTEGER, "status" TEXT, "seed" INTEGER, "cfg" REAL, '
+        '"runpodJobId" TEXT, "r2Url" TEXT, "errorMessage" TEXT, "expiresAt" DATETIME, '
+        '"createdAt" DATETIME, "updatedAt" DATETIME)'
+    )
+    # 25 jobs for user-1; pairs share a createdAt to exercise the id tie-breaker
+    for i in range(25):
+        conn.execute(
+            'INSERT INTO "Job" VALUES (?, ?, ?, NULL, 5, 1, ?, NULL, 7.5, NULL, NULL, NULL, NULL, ?, ?)',
+            (f"job-{i:02d}", "user-1", "p" * 500, "done", 1000 + i // 2, 2000 + i),
+        )
+    conn.execute(
+        'INSERT INTO "Job" VALUES (?, ?, ?, NULL, 5, 1, ?, NULL, 7.5, NULL, NULL, NULL, NULL, ?, ?)',
+        ("other-job", "user-2", "p", "done", 5000, 5000),
+    )
+
+    queries = []
+
+    async def fake_query_raw(query, *args):
+        queries.append(query)
+        return [dict(row) for row in conn.execute(query, args).fetchall()]
+
+    monkeypatch.setattr(db_client.db, "query_raw", fake_query_raw, raising=False)
+    yield queries
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_job_once(jobs_db):
+    """Test walking nextCursor visits each of the user's jobs exactly once, newest first"""
+    seen = []
+    cursor = None
+
+    while True:
+        page = await db_client.list_user_jobs("user-1", limit=10, cursor=cursor)
+        seen += [(job["createdAt"], job["_id"]) for job in page["jobs"]]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_projection_selects_only_requested_columns(jobs_db):
+    """Test fields limits both the SQL column list and the returned keys"""
+    page = await db_client.list_user_jobs("user-1", limit=5, fields=["status"])
+
+    assert set(page["jobs"][0]) == {"status", "createdAt", "_id"}
+    assert '"prompt"' not in jobs_db[-1]
+
+
+@pytest.mark.asyncio
+async def test_rejects_unknown_fields_and_bad_cursors(jobs_db):
+    """Test invalid projections and cursors raise ValueError before querying"""
+    with pytest.raises(ValueError):
+        await db_client.list_user_jobs("user-1", fields=["clerkSecret"])
+
+    with pytest.raises(ValueError):
+        await db_client.list_user_jobs("user-1", cursor="not-a-cursor")
+
+    assert jobs_db == []
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import pytest
+import httpx
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+import db_client
+from events import InMemoryPubSub, JobEventBus
+from tests.conftest import USER
+
+
+def make_job(status: str = "running", **overrides) -> dict:
+    job = {
+        "_id": "job-1",
+        "userId": USER["_id"],
+        "prompt": "a drone",
+        "durationSec": 5,
+        "creditsUsed": 1,
+        "status": status,
+        "r2Url": None,
+        "errorMessage": None,
+        "expiresAt": None,
+        "createdAt": 1,
+        "updatedAt": 2,
+    }
+    job.update(overrides)
+    return job
+
+
+@pytest.fixture
+def bus(authenticated_user, monkeypatch):
+    """Fresh in-memory bus and authenticated USER"""
+    bus = JobEventBus(InMemoryPubSub())
+    monkeypatch.setattr(main, "event_bus", bus)
+    return bus
+
+
+def parse_sse(body: str) -> list:
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_in_memory_pubsub_fan_out_and_overflow():
+    """Test every subscriber gets each message and slow ones drop the oldest"""
+    backend = InMemoryPubSub(queue_size=2)
+
+    async with backend.subscribe("job:1") as first, backend.subscribe("job:1") as second:
+        for i in range(3):
+            await backend.publish("job:1", {"n": i})
+
+        assert [(await first.get(timeout=1))["n"] for _ in range(2)] == [1, 2]
+        assert (await second.get(timeout=1))["n"] == 1
+
+    assert backend.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_sse_pushes_transitions_until_terminal(bus, monkeypatch):
+    """Test the SSE stream sends the snapshot, then each published transition"""
+    async def fake_get_job(job_id):
+        return make_job("running")
+
+    monkeypatch.setattr(db_client, "get_job", fake_get_job)
+
+    async def publisher():
+        while bus.backend.subscriber_count("job:job-1") == 0:
+            await asyncio.sleep(0.01)
+        await bus.publish_job_update(make_job("done", r2Url="https://pub.r2.dev/outputs/job-1.mp4"))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response, _ = await asyncio.gather(
+            client.get("/jobs/job-1/events"),
+            publisher(),
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert [event["status"] for event in events] == ["running", "done"]
+    assert "X-Amz-Signature=" in events[1]["r2Url"]
+
+
+def test_sse_rejects_other_users_job(bus, monkeypatch):
+    """Test ownership is checked before the stream opens"""
+    async def fake_get_job(job_id):
+        return make_job(userId="someone-else")
+
+    monkeypatch.setattr(db_client, "get_job", fake_get_job)
+
+    response = TestClient(main.app).get("/jobs/job-1/events")
+
+    assert response.status_code == 403
+    assert bus.backend.subscriber_count() == 0
+
+
+def test_websocket_rejects_invalid_token(bus, monkeypatch):
+    """Test the WebSocket closes with 4401 when the token does not verify"""
+    async def fake_verify_token(token):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    monkeypatch.setattr(main, "verify_token", fake_verify_token)
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with TestClient(main.app).websocket_connect("/ws/jobs", subprotocols=["bearer", "bad"]):
+            pass
+
+    assert exc_info.value.code == 4401
+
+
+def test_websocket_reads_token_from_subprotocol(bus, monkeypatch):
+    """Test the token comes from Sec-WebSocket-Protocol and a query string token is ignored"""
+    tokens = []
+
+    async def fake_verify_token(token):
+        tokens.append(token)
+        return {"sub": USER["clerkId"]}
+
+    monkeypatch.setattr(main, "verify_token", fake_verify_token)
+    client = TestClient(main.app)
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws/jobs?token=leaked"):
+            pass
+    assert exc_info.value.code == 4401
+
+    with client.websocket_connect("/ws/jobs", subprotocols=["bearer", "jwt-1"]) as websocket:
+        assert websocket.accepted_subprotocol == "bearer"
+
+    assert tokens == ["jwt-1"]
@@ -0,0 +1,271 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import db_client
+from admission import AdmissionController, PlanLimits, QueueLimitError, RateLimitError
+from scheduler import JobScheduler
+from tests.conftest import USER
+
+client = TestClient(main.app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission(authenticated_user, monkeypatch):
+    """Every request is made as USER against empty admission counters"""
+    monkeypatch.setattr(main, "admission", AdmissionController(default_limits=PlanLimits(5, 10)))
+
+
+def test_create_job_reserves_in_one_call(monkeypatch):
+    """Test job creation uses a single reservation call and hands the job to the scheduler"""
+    calls = []
+    scheduler = JobScheduler(max_in_flight=0, plan_weights={})
+
+    async def fake_reservation(**kwargs):
+        calls.append(kwargs)
+        return {"jobId": "job-1", "status": "queued", "creditsUsed": 2, "sourceJobId": None, "creditsRemaining": 78}
+
+    monkeypatch.setattr(db_client, "create_job_with_reservation", fake_reservation)
+    monkeypatch.setattr(main, "scheduler", scheduler)
+
+    response = client.post("/jobs/create", json={"prompt": "a drone", "durationSec": 10})
+
+    assert response.status_code == 200
+    assert response.json() == {"jobId": "job-1", "creditsUsed": 2, "creditsRemaining": 78}
+    assert len(calls) == 1
+    assert calls[0]["credits_used"] == 2
+    assert main.admission.active_jobs(USER["_id"]) == 1
+    assert scheduler.stats()["queued"] == 1
+
+
+def test_create_job_insufficient_credits_releases_admission(monkeypatch):
+    """Test a failed reservation maps to 402 and gives back the admission slot"""
+    error = db_client.InsufficientCreditsError(3, 1)
+
+    async def fake_reservation(**kwargs):
+        raise error
+
+    monkeypatch.setattr(db_client, "create_job_with_reservation", fake_reservation)
+
+    response = client.post("/jobs/create", json={"prompt": "a drone", "durationSec": 15})
+
+    assert response.status_code == 402
+    assert response.json()["detail"] == str(error)
+    assert main.admission.active_jobs(USER["_id"]) == 0
+
+
+def test_create_job_rejected_in_memory_at_limit(monkeypatch):
+    """Test a user at the queued-jobs limit is refused without a database call"""
+    async def fail_reservation(**kwargs):
+        raise AssertionError("reservation should not run")
+
+    monkeypatch.setattr(db_client, "create_job_with_reservation", fail_reservation)
+    main.admission.max_queued_jobs = 1
+    main.admission.admit(USER["_id"], "starter")
+
+    response = client.post("/jobs/create", json={"prompt": "a drone", "durationSec": 5})
+
+    assert response.status_code == 429
+    assert response.json()["detail"] == str(QueueLimitError(1))
+
+
+def test_admission_controller_limits_and_reconcile():
+    """Test the token buckets, per-plan limits and reconciling against database counts"""
+    admission = AdmissionController(
+        default_limits=PlanLimits(max_concurrent_jobs=5, jobs_per_minute=2),
+        max_queued_jobs=10,
+        batches_per_minute=1,
+    )
+    admission.set_plan_limits({"studio": PlanLimits(max_concurrent_jobs=10, jobs_per_minute=60)})
+
+    admission.admit("user-1", "starter")
+    admission.admit("user-1", "starter")
+    with pytest.raises(RateLimitError) as exc_info:
+        admission.admit("user-1", "starter")
+    assert 0 < exc_info.value.retry_after <= 30
+
+    for _ in range(10):
+        admission.admit("user-2", "studio")
+    with pytest.raises(QueueLimitError):
+        admission.admit("user-2", "studio")
+
+    # A batch draws on its own bucket, not on the per-job one
+    assert admission.admit("user-1", "starter", jobs=20, batch=True) == 8
+    assert admission.admit("user-4", "starter", jobs=2, batch=True) == 2
+    with pytest.raises(RateLimitError, match="batch submissions"):
+        admission.admit("user-4", "starter", jobs=2, batch=True)
+
+    admission.release("user-2")
+    admission.sync({"user-1": 1, "user-3": 2})
+
+    assert admission.active_jobs("user-1") == 1
+    assert admission.active_jobs("user-2") == 0
+    assert admission.active_jobs("user-3") == 2
+    assert admission.stats()["rejectedRate"] == 2
+    assert admission.stats()["rejectedQueue"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_starts_on_defaults_when_reconcile_fails(monkeypatch):
+    """Test an unmigrated Plan table does not stop the gateway from starting"""
+    async def failing_get_plan_limits():
+        raise RuntimeError("no such column: Plan.maxConcurrentJobs")
+
+    monkeypatch.setattr(db_client, "get_plan_limits", failing_get_plan_limits)
+    admission = AdmissionController(default_limits=PlanLimits(5, 10), reconcile_interval=3600)
+
+    await admission.start()
+    await admission.close()
+
+    assert admission.limits_for("studio") == PlanLimits(5, 10)
+    assert admission.stats()["reconciles"] == 0
+
+
+JOB = {
+    "_id": "job-1",
+    "userId": USER["_id"],
+    "prompt": "a drone",
+    "durationSec": 5,
+    "creditsUsed": 1,
+    "status": "done",
+    "r2Url": "https://pub.r2.dev/outputs/job-1.mp4",
+    "errorMessage": None,
+    "expiresAt": 3,
+    "createdAt": 1,
+    "updatedAt": 2,
+}
+
+
+def test_job_status_conditional_get(monkeypatch):
+    """Test an unchanged job answers If-None-Match with 304 and skips serialization"""
+    async def fake_get_job(job_id):
+        return dict(JOB)
+
+    serialized = []
+    original_serialize = main.serialize_job_status
+    monkeypatch.setattr(db_client, "get_job", fake_get_job)
+    monkeypatch.setattr(
+        main, "serialize_job_status",
+        lambda job, r2_url: serialized.append(job) or original_serialize(job, r2_url),
+    )
+
+    first = client.get("/jobs/job-1")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    second = client.get("/jobs/job-1", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert second.content == b""
+    assert len(serialized) == 1
+
+    async def fake_get_updated_job(job_id):
+        return dict(JOB, updatedAt=5)
+
+    monkeypatch.setattr(db_client, "get_job", fake_get_updated_job)
+    third = client.get("/jobs/job-1", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
+
+
+def test_list_jobs_conditional_get_skips_row_fetch(monkeypatch):
+    """Test a matching list ETag is answered without fetching job rows"""
+    listed = []
+
+    async def fake_version(user_id):
+        return {"count": 1, "latestUpdatedAt": "2026-10-16T00:00:00+00:00"}
+
+    async def fake_list(user_id, limit, cursor=None, fields=None):
+        listed.append(limit)
+        return {"jobs": [dict(JOB)], "nextCursor": "next"}
+
+    monkeypatch.setattr(db_client, "get_jobs_version", fake_version)
+    monkeypatch.setattr(db_client, "list_user_jobs", fake_list)
+
+    first = client.get("/jobs")
+    assert first.status_code == 200
+    assert first.headers["X-Next-Cursor"] == "next"
+
+    second = client.get("/jobs", headers={"If-None-Match": f'W/{first.headers["ETag"]}'})
+    assert second.status_code == 304
+    assert listed == [20]
+
+
+def test_list_jobs_caps_page_size(monkeypatch):
+    """Test the page size is clamped to the configured maximum"""
+    requested = {}
+
+    async def fake_version(user_id):
+        return {"count": 0, "latestUpdatedAt": None}
+
+    async def fake_list(user_id, limit, cursor=None, fields=None):
+        requested.update(limit=limit, cursor=cursor, fields=fields)
+        return {"jobs": [], "nextCursor": None}
+
+    monkeypatch.setattr(db_client, "get_jobs_version", fake_version)
+    monkeypatch.setattr(db_client, "list_user_jobs", fake_list)
+
+    response = client.get("/jobs", params={"limit": 100000, "cursor": "abc", "fields": "status, _id"})
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert requested == {
+        "limit": main.settings.jobs_page_max_size,
+        "cursor": "abc",
+        "fields": ["status", "_id"],
+    }
+
+
+def test_batch_reserves_once_and_reports_each_item(monkeypatch):
+    """Test a batch is one reservation; jobs past the queued-jobs limit get per-item errors"""
+    calls = []
+    scheduler = JobScheduler(max_in_flight=0, plan_weights={})
+
+    async def fake_batch_reservation(user_id, jobs, **reuse_policy):
+        calls.append(jobs)
+        return {
+            "jobs": [
+                {"jobId": f"job-{i}", "status": "queued", "creditsUsed": job["credits_used"], "sourceJobId": None}
+                for i, job in enumerate(jobs)
+            ],
+            "creditsRemaining": 70,
+        }
+
+    monkeypatch.setattr(db_client, "create_jobs_with_reservation", fake_batch_reservation)
+    monkeypatch.setattr(main, "scheduler", scheduler)
+    main.admission.set_plan_limits({"starter": PlanLimits(max_concurrent_jobs=2, jobs_per_minute=1)})
+    main.admission.max_queued_jobs = 4
+
+    items = [{"prompt": f"sweep {i}", "durationSec": 5 if i % 2 else 10, "seed": i} for i in range(6)]
+    response = client.post("/jobs/batch", json={"jobs": items})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["jobId"] for item in body["jobs"]] == ["job-0", "job-1", "job-2", "job-3", None, None]
+    assert body["jobs"][4]["error"] == str(QueueLimitError(4))
+    assert body["creditsUsed"] == 6
+    assert body["creditsRemaining"] == 70
+    assert len(calls) == 1
+    assert [job["seed"] for job in calls[0]] == [0, 1, 2, 3]
+    assert scheduler.stats()["queued"] == 4
+    assert main.admission.stats()["rejectedRate"] == 0
+
+
+def test_batch_insufficient_credits_admits_nothing(monkeypatch):
+    """Test credits are checked for the batch total and admission is rolled back"""
+    async def fake_batch_reservation(user_id, jobs, **reuse_policy):
+        raise db_client.InsufficientCreditsError(30, 4)
+
+    monkeypatch.setattr(db_client, "create_jobs_with_reservation", fake_batch_reservation)
+
+    response = client.post("/jobs/batch", json={"jobs": [{"prompt": "p", "durationSec": 15}] * 5})
+
+    assert response.status_code == 402
+    assert main.admission.active_jobs(USER["_id"]) == 0
+
+
+def test_batch_size_is_capped():
+    items = [{"prompt": "p", "durationSec": 5}] * (main.settings.jobs_batch_max_size + 1)
+    response = client.post("/jobs/batch", json={"jobs": items})
+
+    assert response.status_code == 400
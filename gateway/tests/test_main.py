@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from main import app
+from main import app, settings
 
 client = TestClient(app)
 
@@ -14,6 +14,19 @@ def test_health_check():
     assert "environment" in data
 
 
+def test_metrics_require_the_metrics_key(monkeypatch):
+    """Test /metrics is hidden without a configured key and refuses a missing or wrong one"""
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_api_key", "metrics-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"X-Metrics-Key": "wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"X-Metrics-Key": "metrics-secret"})
+    assert response.status_code == 200
+    assert "scheduler" in response.json()
+
+
 def test_health_check_structure():
     """Test health check returns proper structure"""
     response = client.get("/health")
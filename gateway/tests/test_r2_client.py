@@ -0,0 +1,82 @@
+import asyncio
+import time
+import pytest
+
+from r2_client import R2Client
+
+
+@pytest.mark.asyncio
+async def test_presign_is_awaitable():
+    """Test presigning needs neither boto3 nor the thread pool"""
+    client = R2Client(max_workers=2)
+    url = await client.generate_presigned_url("outputs/video.mp4", expiration=3600)
+
+    assert "outputs/video.mp4" in url
+    assert "X-Amz-Expires=3600" in url
+    assert client._client is None
+    assert client.stats()["completed"] == 0
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_do_not_stall_event_loop():
+    """Test a slow boto3 call leaves other coroutines running and shows in queue depth"""
+    client = R2Client(max_workers=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    slow_calls = [client._run(time.sleep, 0.1) for _ in range(2)]
+    tasks = [asyncio.ensure_future(call) for call in slow_calls]
+    await asyncio.sleep(0.02)
+
+    stats = client.stats()
+    assert stats["active"] == 1
+    assert stats["queued"] == 1
+
+    await ticker()
+    assert ticks[-1] - ticks[0] < 0.1
+
+    await asyncio.gather(*tasks)
+    assert client.stats()["completed"] == 2
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_presigned_url_reused_until_reuse_window_passes():
+    """Test polls get the same URL until the reuse fraction of its lifetime passes"""
+    client = R2Client(max_workers=1, presign_reuse_fraction=0.5)
+
+    first = await client.generate_presigned_url("outputs/a.mp4", expiration=3600)
+    second = await client.generate_presigned_url("outputs/a.mp4", expiration=3600)
+    assert first == second
+    assert client.presign_cache.stats()["hits"] == 1
+
+    # Push the entry past its reuse window
+    cache_key = ("outputs/a.mp4", 3600)
+    url, _ = client.presign_cache._entries[cache_key]
+    client.presign_cache._entries[cache_key] = (url, time.time() - 1)
+
+    third = await client.generate_presigned_url("outputs/a.mp4", expiration=3600)
+    assert client.presign_cache.stats()["misses"] == 2
+    assert "X-Amz-Signature=" in third
+    client.close()
+
+
+def test_presign_cache_lru_eviction():
+    """Test the presign cache stays bounded"""
+    client = R2Client(max_workers=1, presign_cache_size=2)
+    cache = client.presign_cache
+
+    cache.put("a", 60, "url-a")
+    cache.put("b", 60, "url-b")
+    cache.get("a", 60)
+    cache.put("c", 60, "url-c")
+
+    assert cache.get("b", 60) is None
+    assert cache.get("a", 60) == "url-a"
+    assert cache.stats()["size"] == 2
+    client.close()
@@ -0,0 +1,168 @@
+import httpx
+import pytest
+
+import db_client
+import reconciler
+from events import InMemoryPubSub, JobEventBus
+from runpod_client import RunPodClient
+from scheduler import JobScheduler
+from tests.fake_runpod import FakeRunPod
+
+
+def make_running_job(runpod_job_id: str, updated_at: int = 0) -> dict:
+    return {
+        "_id": f"job-{runpod_job_id}",
+        "userId": "user-1",
+        "status": "running",
+        "runpodJobId": runpod_job_id,
+        "updatedAt": updated_at,
+    }
+
+
+@pytest.fixture
+def fake_runpod(monkeypatch):
+    """RunPodClient wired to an in-process fake RunPod API and a fresh event bus"""
+    fake = FakeRunPod(latency=0.01)
+    client = RunPodClient()
+    client.api_url = "http://fake-runpod"
+    client._http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app))
+    monkeypatch.setattr(reconciler, "event_bus", JobEventBus(InMemoryPubSub()))
+    fake.client = client
+    return fake
+
+
+@pytest.fixture
+def stuck_jobs(monkeypatch):
+    """Stub the stuck-job scan and record finalize_jobs batches"""
+    state = {"jobs": [], "batches": [], "cursors": []}
+
+    async def fake_list_stuck_jobs(older_than, limit=100, after=None):
+        state["cursors"].append(after)
+        jobs = sorted(state["jobs"], key=lambda job: (job["updatedAt"], job["_id"]))
+        if after is not None:
+            jobs = [job for job in jobs if (job["updatedAt"], job["_id"]) > after]
+        return jobs[:limit]
+
+    async def fake_finalize_jobs(transitions):
+        state["batches"].append(transitions)
+        return [
+            {"_id": f"job-{t['runpod_job_id']}", "userId": "user-1", "status": t["status"]}
+            for t in transitions
+        ]
+
+    async def fake_list_stale_submissions(older_than, limit=100):
+        return state["stale"][:limit]
+
+    async def fake_fail_job_with_refund(job_id, error_message, refund_reason=None, expected_status=None):
+        state["refunded"].append((job_id, expected_status))
+        return [{"_id": job_id, "userId": "user-1", "status": "failed", "errorMessage": error_message}]
+
+    async def fake_list_stale_queued_jobs(older_than, limit=100, after=None):
+        jobs = state["queued"]
+        if after is not None:
+            jobs = [job for job in jobs if (job["createdAt"], job["_id"]) > after]
+        return jobs[:limit]
+
+    state.update(stale=[], refunded=[], queued=[])
+    monkeypatch.setattr(reconciler, "scheduler", JobScheduler(max_in_flight=0, plan_weights={}))
+    monkeypatch.setattr(db_client, "list_stale_queued_jobs", fake_list_stale_queued_jobs)
+    monkeypatch.setattr(db_client, "list_stuck_jobs", fake_list_stuck_jobs)
+    monkeypatch.setattr(db_client, "finalize_jobs", fake_finalize_jobs)
+    monkeypatch.setattr(db_client, "list_stale_submissions", fake_list_stale_submissions)
+    monkeypatch.setattr(db_client, "fail_job_with_refund", fake_fail_job_with_refund)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_reconciler_finalizes_terminal_jobs_in_one_batch(fake_runpod, stuck_jobs):
+    """Test completed, failed and lost jobs are finalized together; in-flight ones are left"""
+    fake_runpod.set_status("rp-done", "COMPLETED", output={"r2Url": "https://r2/done.mp4"})
+    fake_runpod.set_status("rp-failed", "FAILED", error="CUDA OOM")
+    fake_runpod.set_status("rp-timeout", "TIMED_OUT")
+    fake_runpod.set_status("rp-busy", "IN_PROGRESS")
+    stuck_jobs["jobs"] = [
+        make_running_job(runpod_id)
+        for runpod_id in ("rp-done", "rp-failed", "rp-timeout", "rp-busy", "rp-lost")
+    ]
+
+    job_reconciler = reconciler.JobReconciler(runpod=fake_runpod.client, concurrency=2)
+    finalized = await job_reconciler.run_once()
+
+    assert len(stuck_jobs["batches"]) == 1
+    transitions = {t["runpod_job_id"]: t for t in stuck_jobs["batches"][0]}
+    assert set(transitions) == {"rp-done", "rp-failed", "rp-timeout", "rp-lost"}
+    assert transitions["rp-done"]["r2_url"] == "https://r2/done.mp4"
+    assert transitions["rp-failed"]["error_message"] == "CUDA OOM"
+    assert transitions["rp-timeout"]["error_message"] == "RunPod job timed_out"
+    assert transitions["rp-lost"]["error_message"] == "Job lost by RunPod"
+
+    assert len(finalized) == 4
+    stats = job_reconciler.stats()
+    assert (stats["scanned"], stats["polled"], stats["completed"], stats["failed"]) == (5, 5, 1, 3)
+    assert reconciler.event_bus.published == 4
+
+
+@pytest.mark.asyncio
+async def test_reconciler_bounds_concurrent_polls(fake_runpod, stuck_jobs):
+    """Test no more than `concurrency` status requests are in flight at once"""
+    for i in range(20):
+        fake_runpod.set_status(f"rp-{i}", "IN_PROGRESS")
+    stuck_jobs["jobs"] = [make_running_job(f"rp-{i}") for i in range(20)]
+
+    job_reconciler = reconciler.JobReconciler(runpod=fake_runpod.client, concurrency=4)
+    finalized = await job_reconciler.run_once()
+
+    assert finalized == []
+    assert stuck_jobs["batches"] == []
+    assert fake_runpod.status_calls == 20
+    assert 1 < fake_runpod.max_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_reconciler_pages_past_jobs_still_in_flight(fake_runpod, stuck_jobs):
+    """Test jobs RunPod keeps reporting as running do not starve the ones behind them"""
+    for i in range(5):
+        fake_runpod.set_status(f"rp-{i}", "IN_PROGRESS")
+    stuck_jobs["jobs"] = [make_running_job(f"rp-{i}", updated_at=i) for i in range(5)]
+
+    job_reconciler = reconciler.JobReconciler(runpod=fake_runpod.client, batch_size=2)
+    for _ in range(4):
+        await job_reconciler.run_once()
+
+    assert stuck_jobs["cursors"] == [None, (1, "job-rp-1"), (3, "job-rp-3"), None]
+    assert job_reconciler.stats()["scanned"] == 7
+    assert fake_runpod.status_calls == 7
+
+
+@pytest.mark.asyncio
+async def test_reconciler_refunds_interrupted_submissions(fake_runpod, stuck_jobs):
+    """Test jobs left `submitting` by a dead instance are failed, refunded and published"""
+    stuck_jobs["stale"] = [
+        {"_id": "job-orphan", "userId": "user-1", "status": "submitting", "runpodJobId": None, "creditsUsed": 2}
+    ]
+
+    job_reconciler = reconciler.JobReconciler(runpod=fake_runpod.client)
+    finalized = await job_reconciler.run_once()
+
+    assert stuck_jobs["refunded"] == [("job-orphan", "submitting")]
+    assert [(job["_id"], job["status"]) for job in finalized] == [("job-orphan", "failed")]
+    assert job_reconciler.stats()["failed"] == 1
+    assert reconciler.event_bus.published == 1
+    assert fake_runpod.status_calls == 0
+
+
+@pytest.mark.asyncio
+async def test_reconciler_requeues_orphaned_queued_jobs(fake_runpod, stuck_jobs):
+    """Test queued jobs left behind by a scaled-in instance are scheduled here, once"""
+    stuck_jobs["queued"] = [
+        {"_id": f"job-q{i}", "userId": "user-1", "durationSec": 5, "createdAt": i, "plan": "starter"}
+        for i in range(3)
+    ]
+
+    job_reconciler = reconciler.JobReconciler(runpod=fake_runpod.client, batch_size=2)
+    await job_reconciler.run_once()
+    await job_reconciler.run_once()
+    await job_reconciler.run_once()
+
+    assert job_reconciler.stats()["requeued"] == 3
+    assert reconciler.scheduler.stats()["queued"] == 3
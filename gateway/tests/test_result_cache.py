@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import db_client
+from admission import AdmissionController, PlanLimits
+from result_cache import ResultCache
+from scheduler import JobScheduler
+from tests.conftest import USER
+
+
+def test_params_hash_is_canonical_and_seeded_only():
+    """Test equal parameters hash equally, any difference changes the hash, and unseeded requests skip it"""
+    cache = ResultCache()
+    base = cache.params_hash("a drone", 5, seed=42, cfg=7.5)
+
+    assert base == cache.params_hash("a drone", 5, seed=42, cfg=7.5, image_url=None)
+    assert cache.params_hash("a drone", 5, seed=42, cfg=7) != base
+    assert cache.params_hash("a drone", 10, seed=42, cfg=7.5) != base
+    assert cache.params_hash("a drone", 5, seed=42, cfg=7.5, image_url="https://img") != base
+    assert ResultCache(namespace="v2").params_hash("a drone", 5, seed=42, cfg=7.5) != base
+    assert cache.params_hash("a drone", 5, seed=None, cfg=7.5) is None
+    assert ResultCache(enabled=False).params_hash("a drone", 5, seed=42, cfg=7.5) is None
+
+
+@pytest.fixture
+def create_job(authenticated_user, monkeypatch):
+    """POST /jobs/create with a stubbed reservation returning the given job"""
+    scheduler = JobScheduler(max_in_flight=0, plan_weights={})
+    admission = AdmissionController(default_limits=PlanLimits(5, 10))
+    cache = ResultCache()
+    calls = []
+
+    monkeypatch.setattr(main, "scheduler", scheduler)
+    monkeypatch.setattr(main, "admission", admission)
+    monkeypatch.setattr(main, "result_cache", cache)
+
+    def post(reserved):
+        async def fake_reservation(**kwargs):
+            calls.append(kwargs)
+            return {**reserved, "jobId": "job-2", "creditsRemaining": 70}
+
+        monkeypatch.setattr(db_client, "create_job_with_reservation", fake_reservation)
+        return TestClient(main.app).post("/jobs/create", json={"prompt": "a drone", "durationSec": 5, "seed": 42})
+
+    return post, calls, scheduler, admission, cache
+
+
+def test_reused_result_skips_runpod(create_job):
+    """Test a job that reused a finished video is neither queued nor counted as active"""
+    post, calls, scheduler, admission, cache = create_job
+
+    response = post({"status": "done", "creditsUsed": 0, "sourceJobId": "job-1"})
+
+    assert response.status_code == 200
+    assert response.json()["creditsUsed"] == 0
+    assert calls[0]["params_hash"] == cache.params_hash("a drone", 5, 42, 7.5)
+    assert scheduler.stats()["queued"] == 0
+    assert admission.active_jobs(USER["_id"]) == 0
+    assert cache.stats() == {"lookups": 1, "reused": 1, "coalesced": 0, "misses": 0}
+
+
+def test_identical_in_flight_job_coalesces(create_job):
+    """Test a job following an in-flight twin stays active but is not submitted again"""
+    post, calls, scheduler, admission, cache = create_job
+
+    response = post({"status": "queued", "creditsUsed": 1, "sourceJobId": "job-1"})
+
+    assert response.status_code == 200
+    assert scheduler.stats()["queued"] == 0
+    assert admission.active_jobs(USER["_id"]) == 1
+    assert cache.stats()["coalesced"] == 1
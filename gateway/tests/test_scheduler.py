@@ -0,0 +1,304 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import db_client
+import scheduler as scheduler_module
+from events import InMemoryPubSub, JobEventBus
+from scheduler import JobScheduler, WeightedFairQueue, job_cost, submit_to_runpod
+
+WEIGHTS = {"starter": 1.0, "creator": 2.0, "studio": 4.0}
+
+
+def make_job(job_id: str, user_id: str, duration_sec: int = 5) -> dict:
+    return {"_id": job_id, "userId": user_id, "durationSec": duration_sec, "prompt": "p", "creditsUsed": 1}
+
+
+def make_job_row(job_id: str, user_id: str, plan: str, **fields) -> SimpleNamespace:
+    """A Job model as Prisma returns it, with every schema column and the owner included"""
+    now = datetime.now(timezone.utc)
+    row = {
+        "id": job_id,
+        "userId": user_id,
+        "prompt": "p",
+        "imageUrl": None,
+        "durationSec": 5,
+        "creditsUsed": 1,
+        "status": "queued",
+        "seed": None,
+        "cfg": 7.5,
+        "runpodJobId": None,
+        "r2Url": None,
+        "errorMessage": None,
+        "expiresAt": None,
+        "paramsHash": None,
+        "sourceJobId": None,
+        "createdAt": now,
+        "updatedAt": now,
+        "user": SimpleNamespace(id=user_id, plan=plan),
+    }
+    row.update(fields)
+    return SimpleNamespace(**row)
+
+
+async def list_active_jobs(monkeypatch, rows):
+    """Run db_client.list_active_jobs over in-memory Job rows"""
+    async def find_many(**kwargs):
+        return rows
+
+    monkeypatch.setattr(db_client.db, "job", SimpleNamespace(find_many=find_many), raising=False)
+    return await db_client.list_active_jobs()
+
+
+def test_fair_queue_shares_by_weight_and_cost():
+    """Test a backlogged heavy flow cannot starve a lighter one and cost counts against share"""
+    queue = WeightedFairQueue()
+    for i in range(8):
+        queue.push(f"studio-{i}", flow="studio-user", weight=4.0, cost=1.0)
+    for i in range(2):
+        queue.push(f"starter-{i}", flow="starter-user", weight=1.0, cost=1.0)
+    for i in range(2):
+        queue.push(f"long-{i}", flow="studio-long", weight=4.0, cost=job_cost(15))
+
+    order = [queue.pop() for _ in range(len(queue))]
+
+    # starter gets its first slot after 4 studio jobs of equal cost, not after all 8
+    assert order.index("starter-0") <= 5
+    # 15 s jobs pay three times the virtual time of 5 s jobs on the same weight
+    assert order.index("long-1") > order.index("studio-3")
+    assert [item for item in order if item.startswith("studio-")] == [f"studio-{i}" for i in range(8)]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_respects_in_flight_budget():
+    """Test jobs are released only as in-flight slots free up, in fair order"""
+    submitted = []
+
+    async def fake_submit(job):
+        submitted.append(job["_id"])
+        return True
+
+    scheduler = JobScheduler(max_in_flight=2, plan_weights=WEIGHTS, submit=fake_submit)
+    for i in range(4):
+        scheduler.enqueue(make_job(f"studio-{i}", "user-studio"), plan="studio")
+    scheduler.enqueue(make_job("starter-0", "user-starter"), plan="starter")
+    await asyncio.sleep(0)
+
+    assert submitted == ["studio-0", "studio-1"]
+    assert scheduler.stats()["inFlight"] == 2
+    assert scheduler.stats()["queued"] == 3
+
+    scheduler.release("studio-0")
+    scheduler.release("unknown-job")
+    await asyncio.sleep(0)
+    assert scheduler.stats()["inFlight"] == 2
+
+    scheduler.release("studio-1")
+    scheduler.release("studio-2")
+    scheduler.release("studio-3")
+    await asyncio.sleep(0)
+    assert "starter-0" in submitted
+    assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_user_at_plan_limit_waits_while_others_run():
+    """Test a user's batch runs at most their plan's concurrent jobs and does not block other users"""
+    submitted = []
+
+    async def fake_submit(job):
+        submitted.append(job["_id"])
+        return True
+
+    limits = {"starter": 2, "studio": 3}
+    scheduler = JobScheduler(max_in_flight=4, plan_weights=WEIGHTS, submit=fake_submit, user_limit=limits.get)
+    for i in range(5):
+        scheduler.enqueue(make_job(f"sweep-{i}", "user-1"), plan="starter")
+    scheduler.enqueue(make_job("other-0", "user-2"), plan="studio")
+    await asyncio.sleep(0)
+
+    assert submitted == ["sweep-0", "sweep-1", "other-0"]
+    assert scheduler.stats()["inFlight"] == 3
+    assert scheduler.stats()["queued"] == 3
+    assert not scheduler.enqueue(make_job("sweep-4", "user-1"), plan="starter")
+
+    scheduler.release("other-0")
+    await asyncio.sleep(0)
+    assert submitted[3:] == []
+
+    scheduler.release("sweep-0")
+    await asyncio.sleep(0)
+    assert submitted[3:] == ["sweep-2"]
+
+    for job_id in ("sweep-1", "sweep-2", "sweep-3"):
+        scheduler.release(job_id)
+    await asyncio.sleep(0)
+    assert submitted[3:] == ["sweep-2", "sweep-3", "sweep-4"]
+    assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_submission_frees_its_slot():
+    """Test a job RunPod rejects does not hold an in-flight slot"""
+    async def failing_submit(job):
+        return job["_id"] != "bad"
+
+    scheduler = JobScheduler(max_in_flight=1, plan_weights=WEIGHTS, submit=failing_submit)
+    scheduler.enqueue(make_job("bad", "user-1"), plan="starter")
+    scheduler.enqueue(make_job("good", "user-1"), plan="starter")
+    await scheduler.close()
+    await scheduler.close()
+
+    stats = scheduler.stats()
+    assert stats["dispatched"] == 2
+    assert stats["submitFailures"] == 1
+    assert stats["inFlight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_restore_counts_running_and_requeues_unsubmitted(monkeypatch):
+    """Test restart recovery counts submitting/running jobs in flight and resubmits queued ones unchanged"""
+    submitted = []
+
+    async def fake_submit(job):
+        submitted.append(job)
+        return True
+
+    active = await list_active_jobs(monkeypatch, [
+        make_job_row("running-1", "user-1", "starter", status="running", runpodJobId="rp-1"),
+        make_job_row("queued-1", "user-2", "creator", seed=42, cfg=4.0, imageUrl="https://img/1.png"),
+        make_job_row("queued-2", "user-3", "starter", durationSec=10),
+        make_job_row("submitting-1", "user-4", "starter", status="submitting"),
+    ])
+
+    scheduler = JobScheduler(max_in_flight=3, plan_weights=WEIGHTS, submit=fake_submit)
+    scheduler.restore(active)
+    await asyncio.sleep(0)
+
+    assert scheduler.stats()["inFlight"] == 3
+    assert scheduler.stats()["queued"] == 1
+    assert len(submitted) == 1
+    job = submitted[0]
+    assert job["_id"] == "queued-1"
+    assert (job["seed"], job["cfg"], job["imageUrl"], job["durationSec"]) == (42, 4.0, "https://img/1.png", 5)
+
+
+@pytest.mark.asyncio
+async def test_restore_leaves_followers_to_their_leader(monkeypatch):
+    """Test a queued job reusing another job's result is not submitted again after a restart"""
+    submitted = []
+
+    async def fake_submit(job):
+        submitted.append(job["_id"])
+        return True
+
+    active = await list_active_jobs(monkeypatch, [
+        make_job_row("leader-1", "user-1", "starter", seed=7),
+        make_job_row("follower-1", "user-2", "starter", seed=7, sourceJobId="leader-1"),
+    ])
+
+    scheduler = JobScheduler(max_in_flight=2, plan_weights=WEIGHTS, submit=fake_submit)
+    scheduler.restore(active)
+    await asyncio.sleep(0)
+
+    assert submitted == ["leader-1"]
+    assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_submission_publishes_and_releases_followers(monkeypatch):
+    """Test a job RunPod rejects, and the jobs following it, are published and free their admission slots"""
+    async def rejecting_submit_job(**kwargs):
+        raise RuntimeError("RunPod unavailable")
+
+    async def claim_job_for_submission(job_id):
+        return True
+
+    async def fake_fail_job_with_refund(job_id, error_message, refund_reason=None, expected_status=None):
+        assert expected_status == "submitting"
+        return [
+            dict(make_job(job_id, "user-1"), status="failed", errorMessage=error_message),
+            dict(make_job("follower-1", "user-2"), status="failed", errorMessage=error_message),
+        ]
+
+    released = []
+    monkeypatch.setattr(scheduler_module.runpod_client, "submit_job", rejecting_submit_job)
+    monkeypatch.setattr(db_client, "claim_job_for_submission", claim_job_for_submission)
+    monkeypatch.setattr(db_client, "fail_job_with_refund", fake_fail_job_with_refund)
+    monkeypatch.setattr(scheduler_module.admission, "release", lambda user_id, jobs=1: released.append(user_id))
+    monkeypatch.setattr(scheduler_module, "event_bus", JobEventBus(InMemoryPubSub()))
+
+    assert await submit_to_runpod(make_job("leader-1", "user-1")) is False
+    assert released == ["user-1", "user-2"]
+    assert scheduler_module.event_bus.published == 2
+
+
+@pytest.mark.asyncio
+async def test_submission_skips_jobs_claimed_elsewhere(monkeypatch):
+    """Test a job another gateway instance already claimed is not sent to RunPod again"""
+    submitted = []
+
+    async def claim_job_for_submission(job_id):
+        return False
+
+    async def recording_submit_job(**kwargs):
+        submitted.append(kwargs)
+        return {"id": "rp-1"}
+
+    monkeypatch.setattr(db_client, "claim_job_for_submission", claim_job_for_submission)
+    monkeypatch.setattr(scheduler_module.runpod_client, "submit_job", recording_submit_job)
+
+    assert await submit_to_runpod(make_job("job-1", "user-1")) is False
+    assert submitted == []
+
+
+@pytest.mark.asyncio
+async def test_slots_freed_on_another_instance_are_picked_up_on_resync(monkeypatch):
+    """Test a webhook handled by instance B frees the budget of instance A after A resyncs"""
+    statuses = {}
+
+    async def list_in_flight_jobs():
+        return {job_id: "user-1" for job_id, status in statuses.items() if status in ("submitting", "running")}
+
+    async def fake_submit(job):
+        statuses[job["_id"]] = "running"
+        return True
+
+    monkeypatch.setattr(db_client, "list_in_flight_jobs", list_in_flight_jobs)
+    instance_a = JobScheduler(max_in_flight=2, plan_weights=WEIGHTS, submit=fake_submit)
+    instance_b = JobScheduler(max_in_flight=2, plan_weights=WEIGHTS, submit=fake_submit)
+    for i in range(3):
+        statuses[f"j{i}"] = "queued"
+        instance_a.enqueue(make_job(f"j{i}", "user-1"), plan="starter")
+    await instance_a.close()
+    assert instance_a.stats()["inFlight"] == 2
+
+    # Both webhooks land on instance B
+    for job_id in ("j0", "j1"):
+        statuses[job_id] = "done"
+        instance_b.release(job_id)
+    assert instance_a.stats()["inFlight"] == 2
+
+    await instance_a.resync()
+    await instance_a.close()
+
+    assert statuses["j2"] == "running"
+    assert instance_a.stats()["inFlight"] == 1
+    assert instance_a.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_enqueue_ignores_jobs_already_held():
+    """Test a job queued or in flight here is not queued a second time"""
+    async def fake_submit(job):
+        return True
+
+    scheduler = JobScheduler(max_in_flight=1, plan_weights=WEIGHTS, submit=fake_submit)
+    assert scheduler.enqueue(make_job("running", "user-1"), plan="starter")
+    assert scheduler.enqueue(make_job("waiting", "user-1"), plan="starter")
+
+    assert not scheduler.enqueue(make_job("running", "user-1"), plan="starter")
+    assert not scheduler.enqueue(make_job("waiting", "user-1"), plan="starter")
+    assert scheduler.stats()["queued"] == 1
@@ -0,0 +1,64 @@
+import types
+import datetime as dt
+import pytest
+import boto3
+import botocore.auth
+from botocore.config import Config
+
+from sigv4 import SigV4Presigner
+
+SIGNING_TIME = dt.datetime(2026, 10, 16, 12, 34, 56)
+
+
+@pytest.fixture
+def frozen_botocore(monkeypatch):
+    """Pin botocore's signing clock so its URLs are deterministic"""
+    class FrozenDatetime(dt.datetime):
+        @classmethod
+        def utcnow(cls):
+            return SIGNING_TIME
+
+    monkeypatch.setattr(botocore.auth, "datetime", types.SimpleNamespace(datetime=FrozenDatetime))
+
+
+def boto3_presign(endpoint_url: str, bucket: str, key: str, expires_in: int) -> str:
+    client = boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id="AKIDEXAMPLE",
+        aws_secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+        config=Config(signature_version='s3v4'),
+        region_name='auto',
+    )
+    return client.generate_presigned_url(
+        'get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=expires_in
+    )
+
+
+@pytest.mark.parametrize("endpoint_url", [
+    "https://0681fbcb.r2.cloudflarestorage.com",
+    "https://0681fbcb.r2.cloudflarestorage.com:443",
+    "http://127.0.0.1:9000",
+])
+@pytest.mark.parametrize("key", [
+    "outputs/3f2c9a1e-7b4d-4c2a-9f1e-2b7c8d9e0f1a.mp4",
+    "outputs/a b+c~é.mp4",
+    "outputs/!*'()[]{}&$@=;:,?#%.mp4",
+    "outputs//nested/ path",
+])
+@pytest.mark.parametrize("expires_in", [60, 86400])
+def test_matches_boto3_byte_for_byte(frozen_botocore, endpoint_url, key, expires_in):
+    """Test presigned URLs are identical to boto3's for R2-style endpoints"""
+    presigner = SigV4Presigner(
+        endpoint_url=endpoint_url,
+        access_key_id="AKIDEXAMPLE",
+        secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+    )
+
+    expected = boto3_presign(endpoint_url, "cineweave-outputs", key, expires_in)
+    actual = presigner.presign_get_object(
+        "cineweave-outputs", key, expires_in=expires_in,
+        now=SIGNING_TIME.replace(tzinfo=dt.timezone.utc),
+    )
+
+    assert actual == expected
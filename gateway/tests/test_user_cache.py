@@ -0,0 +1,72 @@
+import time
+import pytest
+
+import user_cache as user_cache_module
+from user_cache import UserCache
+
+
+def make_user(clerk_id: str = "user_clerk_1", credits: int = 80) -> dict:
+    return {
+        "_id": f"id-{clerk_id}",
+        "clerkId": clerk_id,
+        "email": f"{clerk_id}@example.com",
+        "plan": "starter",
+        "credits": credits,
+        "createdAt": 0,
+    }
+
+
+def test_cache_never_stores_credits():
+    """Test cached identities carry no credit balance"""
+    cache = UserCache(ttl=60)
+    cache.put(make_user())
+
+    identity = cache.get("user_clerk_1")
+    assert identity["_id"] == "id-user_clerk_1"
+    assert "credits" not in identity
+
+
+def test_cache_ttl():
+    """Test entries expire after the TTL, so a plan change is picked up on the next lookup"""
+    cache = UserCache(ttl=60)
+    cache.put(make_user("a"))
+    cache.put(make_user("b"))
+
+    cache._entries["b"] = (cache._entries["b"][0], time.time() - 1)
+    assert cache.get("b") is None
+    assert cache.get("a")["plan"] == "starter"
+
+
+def test_cache_hit_miss_counters():
+    """Test hit/miss counters track lookups"""
+    cache = UserCache(ttl=60)
+    cache.get("a")
+    cache.put(make_user("a"))
+    cache.get("a")
+    cache.get("a")
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_hits_db_once(monkeypatch):
+    """Test repeated resolution only reads the database on the first call"""
+    cache = UserCache(ttl=60)
+    monkeypatch.setattr(user_cache_module, "user_cache", cache)
+    calls = []
+
+    async def fake_get_user(clerk_id):
+        calls.append(clerk_id)
+        return make_user(clerk_id)
+
+    monkeypatch.setattr(user_cache_module.db_client, "get_user_by_clerk_id", fake_get_user)
+
+    for _ in range(3):
+        user = await user_cache_module.resolve_user("user_clerk_1")
+        assert user["_id"] == "id-user_clerk_1"
+        assert "credits" not in user
+
+    assert calls == ["user_clerk_1"]
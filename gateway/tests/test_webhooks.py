@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import db_client
+import webhooks
+from events import InMemoryPubSub, JobEventBus
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """Fresh dedup set, bus and queue; finalize_jobs transitions each RunPod job once"""
+    queue = webhooks.WebhookQueue(max_size=3, batch_size=10)
+    monkeypatch.setattr(webhooks, "processed_webhooks", webhooks.RecentKeySet(max_size=100))
+    monkeypatch.setattr(webhooks, "event_bus", JobEventBus(InMemoryPubSub()))
+    monkeypatch.setattr(webhooks, "webhook_queue", queue)
+
+    queue.batch_calls = []
+    finalized = set()
+
+    async def fake_finalize_jobs(transitions):
+        queue.batch_calls.append([(t["runpod_job_id"], t["status"]) for t in transitions])
+        jobs = []
+        for transition in transitions:
+            if transition["runpod_job_id"] in finalized:
+                continue
+            finalized.add(transition["runpod_job_id"])
+            jobs.append({"_id": transition["runpod_job_id"], "userId": "user-1", "status": transition["status"]})
+        return jobs
+
+    monkeypatch.setattr(db_client, "finalize_jobs", fake_finalize_jobs)
+    return queue
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(main.settings.webhook_runpod_secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def post_signed(client: TestClient, payload: dict):
+    body = json.dumps(payload).encode()
+    return client.post(
+        "/webhooks/runpod",
+        content=body,
+        headers={"Content-Type": "application/json", "X-RunPod-Signature": sign(body)},
+    )
+
+
+def test_webhook_acknowledges_before_database_work(queue):
+    """Test the handler only enqueues; replays are dropped before the queue"""
+    client = TestClient(main.app)
+    payload = {"id": "runpod-1", "status": "COMPLETED", "output": {"r2Url": "https://r2/job-1.mp4"}}
+
+    first = post_signed(client, payload)
+    replay = post_signed(client, payload)
+
+    assert first.json() == {"status": "accepted"}
+    assert replay.json() == {"status": "duplicate"}
+    assert queue.depth() == 1
+    assert queue.batch_calls == []
+
+
+@pytest.mark.asyncio
+async def test_queue_applies_events_in_one_batch(queue):
+    """Test queued events are written together and each transition is published once"""
+    webhooks.ingest_runpod_event("runpod-1", "COMPLETED", output={"r2Url": "https://r2/1.mp4"})
+    webhooks.ingest_runpod_event("runpod-2", "FAILED", error="OOM")
+    webhooks.ingest_runpod_event("runpod-3", "COMPLETED")
+
+    await queue.drain()
+
+    assert queue.batch_calls == [[("runpod-1", "done"), ("runpod-2", "failed"), ("runpod-3", "failed")]]
+    assert queue.stats()["queueDepth"] == 0
+    assert queue.stats()["transitions"] == 3
+    assert webhooks.event_bus.published == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_from_another_process_refunds_once(queue):
+    """Test a retry that misses the local dedup set is absorbed by the compare-and-set"""
+    webhooks.ingest_runpod_event("runpod-1", "FAILED", error="OOM")
+    await queue.drain()
+
+    webhooks.processed_webhooks = webhooks.RecentKeySet(max_size=100)
+    webhooks.ingest_runpod_event("runpod-1", "FAILED", error="OOM")
+    await queue.drain()
+
+    assert len(queue.batch_calls) == 2
+    assert queue.stats()["transitions"] == 1
+    assert webhooks.event_bus.published == 1
+
+
+def test_full_queue_returns_503(queue):
+    """Test a saturated queue sheds load so RunPod retries later"""
+    client = TestClient(main.app)
+
+    for i in range(3):
+        post_signed(client, {"id": f"runpod-{i}", "status": "FAILED"})
+    response = post_signed(client, {"id": "runpod-9", "status": "FAILED"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert queue.stats()["rejected"] == 1
+    assert "runpod-9:FAILED" not in webhooks.processed_webhooks
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_single_events(queue, monkeypatch):
+    """Test a failing batch is retried per event and unapplied events can be redelivered"""
+    async def broken_finalize_jobs(transitions):
+        raise RuntimeError("database is locked")
+
+    async def fake_finalize_job(runpod_job_id, status, **kwargs):
+        if runpod_job_id == "runpod-bad":
+            raise RuntimeError("constraint failed")
+        return {"_id": runpod_job_id, "userId": "user-1", "status": status}
+
+    monkeypatch.setattr(db_client, "finalize_jobs", broken_finalize_jobs)
+    monkeypatch.setattr(db_client, "finalize_job", fake_finalize_job)
+
+    webhooks.ingest_runpod_event("runpod-ok", "FAILED")
+    webhooks.ingest_runpod_event("runpod-bad", "FAILED")
+    await queue.drain()
+
+    assert queue.stats()["transitions"] == 1
+    assert queue.stats()["failures"] == 1
+    assert "runpod-ok:FAILED" in webhooks.processed_webhooks
+    assert "runpod-bad:FAILED" not in webhooks.processed_webhooks
+
+
+@pytest.mark.asyncio
+async def test_close_lets_the_current_batch_finish(queue, monkeypatch):
+    """Test closing mid-write neither cancels the acknowledged batch nor drops later events"""
+    started = asyncio.Event()
+    release = asyncio.Event()
+    applied = []
+
+    async def slow_finalize_jobs(transitions):
+        started.set()
+        await release.wait()
+        applied.extend(t["runpod_job_id"] for t in transitions)
+        return [{"_id": t["runpod_job_id"], "userId": "user-1", "status": t["status"]} for t in transitions]
+
+    monkeypatch.setattr(db_client, "finalize_jobs", slow_finalize_jobs)
+
+    await queue.start()
+    webhooks.ingest_runpod_event("runpod-1", "FAILED")
+    await started.wait()
+    webhooks.ingest_runpod_event("runpod-2", "FAILED")
+
+    closing = asyncio.create_task(queue.close())
+    await asyncio.sleep(0.01)
+    assert not closing.done()
+
+    release.set()
+    await closing
+
+    assert applied == ["runpod-1", "runpod-2"]
+    assert queue.stats()["transitions"] == 2
+    assert queue.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_close_keeps_events_collected_for_the_next_batch(queue):
+    """Test events the consumer already took while filling a batch are applied on close"""
+    queue._batch_wait = 10
+    await queue.start()
+    webhooks.ingest_runpod_event("runpod-1", "FAILED")
+    await asyncio.sleep(0.01)
+    assert queue.depth() == 0
+
+    await queue.close()
+
+    assert queue.batch_calls == [[("runpod-1", "failed")]]
+
+
+@pytest.mark.asyncio
+async def test_non_terminal_status_is_acknowledged_without_queueing(queue):
+    """Test IN_PROGRESS updates never reach the queue"""
+    result = webhooks.ingest_runpod_event("runpod-1", "IN_PROGRESS")
+
+    assert result == {"status": "acknowledged"}
+    assert queue.depth() == 0
+
+
+def test_recent_key_set_evicts_least_recent():
+    keys = webhooks.RecentKeySet(max_size=2)
+    keys.add("a")
+    keys.add("b")
+    assert "a" in keys
+    keys.add("c")
+
+    assert "a" in keys
+    assert "b" not in keys
+    assert len(keys) == 2
+
+
+def test_signature_checked_over_raw_body(queue):
+    """Test the HMAC covers the sender's exact bytes, not a re-serialization"""
+    client = TestClient(main.app)
+    # Key order and whitespace that payload.json() would not reproduce
+    body = b'{"status": "FAILED",  "id": "runpod-1", "error": "OOM"}'
+
+    accepted = client.post(
+        "/webhooks/runpod",
+        content=body,
+        headers={"Content-Type": "application/json", "X-RunPod-Signature": sign(body)},
+    )
+    assert accepted.json() == {"status": "accepted"}
+
+    forged = client.post(
+        "/webhooks/runpod",
+        content=body.replace(b"OOM", b"oom").replace(b"runpod-1", b"runpod-2"),
+        headers={"Content-Type": "application/json", "X-RunPod-Signature": sign(body)},
+    )
+    assert forged.status_code == 401
+    assert queue.depth() == 1
+
+
+def test_unsigned_webhook_rejected(queue):
+    """Test a request without X-RunPod-Signature cannot skip verification"""
+    client = TestClient(main.app)
+
+    response = client.post(
+        "/webhooks/runpod",
+        json={"id": "runpod-1", "status": "COMPLETED", "output": {"r2Url": "https://evil/x.mp4"}},
+    )
+
+    assert response.status_code == 401
+    assert queue.depth() == 0
+    assert "runpod-1:COMPLETED" not in webhooks.processed_webhooks
+
+
+def test_oversized_chunked_body_rejected_before_signature_check(queue, monkeypatch):
+    """Test the body cap holds for chunked requests that send no Content-Length"""
+    def fail_verify(body, signature, secret):
+        raise AssertionError("signature should not be checked")
+
+    monkeypatch.setattr(main.settings, "webhook_max_body_bytes", 1024)
+    monkeypatch.setattr(main, "verify_signature", fail_verify)
+    client = TestClient(main.app)
+
+    def chunks():
+        for _ in range(8):
+            yield b"x" * 512
+
+    response = client.post(
+        "/webhooks/runpod",
+        content=chunks(),
+        headers={"Content-Type": "application/json", "X-RunPod-Signature": "0" * 64},
+    )
+
+    assert response.status_code == 413
+    assert queue.depth() == 0
+
+
+def test_malformed_signature_rejected_without_hashing():
+    """Test signatures of the wrong shape fail before any HMAC is computed"""
+    secret = b"secret"
+
+    assert not webhooks.verify_signature(b"{}", "abc", secret)
+    assert not webhooks.verify_signature(b"{}", "z" * 64, secret)
+    assert webhooks.verify_signature(b"{}", hmac.new(secret, b"{}", hashlib.sha256).hexdigest().upper(), secret)
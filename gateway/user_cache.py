@@ -0,0 +1,94 @@
+"""Clerk ID -> user identity cache to skip the user lookup on every request"""
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+import db_client
+from config import get_settings
+
+settings = get_settings()
+
+
+class UserCache:
+    """
+    TTL + LRU cache of user identity (id, clerkId, email, plan) by Clerk ID.
+
+    Credit balances are deliberately stripped from cached entries: anything
+    that makes an admission decision must read credits from the database.
+    Entries only expire by TTL: plans change in Convex, not through the
+    gateway, so a new plan takes effect here within ttl seconds.
+    """
+
+    IDENTITY_FIELDS = ("_id", "clerkId", "email", "plan", "createdAt")
+
+    def __init__(self, ttl: float = 60, max_size: int = 10000):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clerk_id: str) -> Optional[Dict[str, Any]]:
+        """Return cached identity, or None on miss or expiry"""
+        entry = self._entries.get(clerk_id)
+
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[clerk_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(clerk_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache the identity fields of a user record and return them"""
+        identity = {field: user.get(field) for field in self.IDENTITY_FIELDS}
+
+        if self._ttl > 0 and self._max_size > 0:
+            clerk_id = identity["clerkId"]
+            self._entries[clerk_id] = (identity, time.time() + self._ttl)
+            self._entries.move_to_end(clerk_id)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+        return identity
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+
+# Singleton instance
+user_cache = UserCache(
+    ttl=settings.user_cache_ttl_seconds,
+    max_size=settings.user_cache_max_size,
+)
+
+
+async def resolve_user(clerk_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a Clerk ID to the user's identity, hitting the database on miss.
+
+    The result has no "credits" field; read balances with db_client.get_credits.
+    """
+    identity = user_cache.get(clerk_id)
+    if identity is not None:
+        return identity
+
+    user = await db_client.get_user_by_clerk_id(clerk_id)
+    if not user:
+        return None
+
+    return user_cache.put(user)
+
@@ -0,0 +1,278 @@
+"""
+RunPod webhook ingestion.
+
+The HTTP handler verifies the signature, drops deliveries it has already
+seen, and enqueues the rest; WebhookQueue applies them to the database in
+micro-batches (one transaction per batch) and publishes the resulting job
+transitions.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import db_client
+from admission import admission
+from config import get_settings
+from events import event_bus
+from scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RecentKeySet:
+    """Bounded LRU set of recently processed webhook keys"""
+
+    def __init__(self, max_size: int = 10000):
+        self._max_size = max_size
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key: str) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self._max_size:
+            self._keys.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+_SIGNATURE_LENGTH = hashlib.sha256().digest_size * 2
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+def verify_signature(body: bytes, signature: str, secret: bytes) -> bool:
+    """
+    Check a hex HMAC-SHA256 signature against the raw request body.
+
+    Malformed signatures are rejected before hashing, so forged requests
+    cost a length check rather than an HMAC over the whole body.
+    """
+    if len(signature) != _SIGNATURE_LENGTH or not _HEX_DIGITS.issuperset(signature):
+        return False
+
+    expected = hmac.new(secret, body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature.lower(), expected)
+
+
+class WebhookQueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept another event"""
+
+
+class WebhookQueue:
+    """Bounded queue of terminal transitions, drained in micro-batches"""
+
+    def __init__(self, max_size: int = 1000, batch_size: int = 50, batch_wait: float = 0.05):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait
+        self._task: Optional[asyncio.Task] = None
+        # Events taken off the queue by the consumer but not yet applied
+        self._batch: List[Tuple[float, str, Dict[str, Any]]] = []
+        self._applying = False
+        self._stopping = False
+        self.rejected = 0
+        self.applied = 0
+        self.transitions = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def enqueue(self, dedup_key: str, transition: Dict[str, Any]) -> bool:
+        """Queue finalize_job arguments; False if the queue is full"""
+        try:
+            self._queue.put_nowait((time.monotonic(), dedup_key, transition))
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop the consumer, then apply whatever is still queued.
+
+        Every queued event was already acknowledged to RunPod, so a batch
+        being written is allowed to finish; only a consumer waiting for
+        events is cancelled.
+        """
+        self._stopping = True
+        if self._task is not None:
+            if not self._applying:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.drain()
+
+    async def drain(self) -> None:
+        """Apply every queued transition now"""
+        if self._batch:
+            batch, self._batch = self._batch, []
+            await self._apply(batch)
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._apply(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self._batch_wait
+
+            while len(self._batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            self._applying = True
+            try:
+                await self._apply(batch)
+            finally:
+                self._applying = False
+
+    async def _apply(self, batch: List[Tuple[float, str, Dict[str, Any]]]) -> None:
+        lag = time.monotonic() - batch[0][0]
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        transitions = [transition for _, _, transition in batch]
+
+        try:
+            jobs = await db_client.finalize_jobs(transitions)
+        except Exception as e:
+            # Retry one by one so a single bad row cannot sink the batch
+            logger.error(f"Webhook batch of {len(transitions)} failed, retrying individually: {str(e)}")
+            jobs = []
+            for _, dedup_key, transition in batch:
+                try:
+                    job = await db_client.finalize_job(**transition)
+                except Exception as e:
+                    self.failures += 1
+                    # Forget the delivery so a RunPod retry is processed again
+                    processed_webhooks.discard(dedup_key)
+                    logger.error(f"Failed to apply webhook for RunPod job {transition['runpod_job_id']}: {str(e)}")
+                    continue
+                if job is not None:
+                    jobs.append(job)
+
+        self.batches += 1
+        self.applied += len(transitions)
+        self.transitions += len(jobs)
+
+        for job in jobs:
+            logger.info(f"Job {job['_id']} is now {job['status']}")
+            admission.release(job["userId"])
+            scheduler.release(job["_id"])
+            await event_bus.publish_job_update(job)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queueDepth": self.depth(),
+            "rejected": self.rejected,
+            "applied": self.applied,
+            "transitions": self.transitions,
+            "batches": self.batches,
+            "failures": self.failures,
+            "lastLagSeconds": round(self.last_lag, 4),
+            "maxLagSeconds": round(self.max_lag, 4),
+        }
+
+
+processed_webhooks = RecentKeySet(max_size=settings.webhook_dedup_cache_size)
+
+webhook_queue = WebhookQueue(
+    max_size=settings.webhook_queue_size,
+    batch_size=settings.webhook_batch_size,
+    batch_wait=settings.webhook_batch_wait_seconds,
+)
+
+webhook_stats = {
+    "received": 0,
+    "duplicates": 0,
+}
+
+
+def build_transition(
+    runpod_job_id: str,
+    status: str,
+    output: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Map a RunPod status to finalize_job arguments; None if not terminal"""
+    if status == "COMPLETED" and output and "r2Url" in output:
+        transition = {"status": "done", "r2_url": output["r2Url"]}
+    elif status == "COMPLETED":
+        logger.error(f"No R2 URL in RunPod output for job {runpod_job_id}")
+        transition = {"status": "failed", "error_message": "Missing video output"}
+    elif status == "FAILED":
+        transition = {"status": "failed", "error_message": error or "Unknown error"}
+    else:
+        return None
+
+    transition["runpod_job_id"] = runpod_job_id
+    return transition
+
+
+def ingest_runpod_event(
+    runpod_job_id: str,
+    status: str,
+    output: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Accept a RunPod status update for asynchronous processing.
+
+    A delivery already seen by this process is dropped; terminal updates are
+    queued for WebhookQueue, where finalize_jobs' compare-and-set makes
+    retries that reach other processes harmless.
+
+    Raises:
+        WebhookQueueFullError: If the queue is at capacity (RunPod retries)
+    """
+    webhook_stats["received"] += 1
+
+    transition = build_transition(runpod_job_id, status, output, error)
+    if transition is None:
+        logger.info(f"RunPod job {runpod_job_id} status: {status}")
+        return {"status": "acknowledged"}
+
+    dedup_key = f"{runpod_job_id}:{status}"
+    if dedup_key in processed_webhooks:
+        webhook_stats["duplicates"] += 1
+        logger.info(f"Duplicate RunPod webhook for {runpod_job_id}: {status}")
+        return {"status": "duplicate"}
+
+    if not webhook_queue.enqueue(dedup_key, transition):
+        raise WebhookQueueFullError("Webhook queue is full")
+
+    processed_webhooks.add(dedup_key)
+    return {"status": "accepted"}
@@ -0,0 +1,81 @@
+"""
+Benchmark for converting generated frames to uint8.
+
+Compares the old path (frames.max(), then (frames * 255).astype(np.uint8)
+over the whole clip) with frames.iter_uint8_chunks on a synthetic clip in
+[-1, 1] or [0, 1]. Reports wall time and peak allocated memory beyond the
+input array (numpy allocations are visible to tracemalloc).
+
+The default clip is 15 s of 720p (360x720x1280x3); in float16 that is 2 GB
+of input, so use --frames on small machines.
+
+Usage:
+    python benchmarks/bench_frames.py [--frames 360] [--dtype float16] [--range signed] [--chunk 24]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+import _common  # noqa: F401  (sets import path)
+
+from frames import SIGNED, UNIT, iter_uint8_chunks
+
+
+def make_clip(frames: int, dtype: str, value_range: str) -> np.ndarray:
+    clip = np.empty((frames, 720, 1280, 3), dtype=dtype)
+    rng = np.random.default_rng(7)
+    for i in range(frames):
+        clip[i] = rng.random((720, 1280, 3), dtype=np.float32)
+    if value_range == SIGNED:
+        clip *= 2
+        clip -= 1
+    return clip
+
+
+def old_path(clip: np.ndarray) -> int:
+    if clip.max() <= 1.0:
+        frames = (clip * 255).astype(np.uint8)
+    else:
+        frames = clip.astype(np.uint8)
+    return len(frames)
+
+
+def chunked_path(clip: np.ndarray, chunk: int) -> int:
+    # Chunks are consumed as they come, like the encoder does
+    return sum(len(frames) for frames in iter_uint8_chunks(clip, chunk))
+
+
+def measure(fn, *args) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=360)
+    parser.add_argument("--dtype", default="float16", choices=("float16", "float32"))
+    parser.add_argument("--range", default=SIGNED, choices=(SIGNED, UNIT))
+    parser.add_argument("--chunk", type=int, default=24)
+    args = parser.parse_args()
+
+    clip = make_clip(args.frames, args.dtype, args.range)
+    mb = 1024 * 1024
+    print(f"clip {clip.shape} {clip.dtype} in {args.range} range, {clip.nbytes / mb:.0f} MB")
+    print(f"{'path':<10}{'seconds':>10}{'peak extra MB':>16}")
+
+    for name, fn, extra in (("old", old_path, ()), ("chunked", chunked_path, (args.chunk,))):
+        elapsed, peak = measure(fn, clip, *extra)
+        print(f"{name:<10}{elapsed:>10.2f}{peak / mb:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Cold-start bookkeeping for the worker.
+
+PhaseTimer records how long each startup phase takes (imports, weight
+load, device move, warm-up) and logs them as one JSON line. The readiness
+marker is a small JSON file on the network volume recording that a given
+image + weights combination already passed a warm-up inference, so later
+cold starts on the same combination can skip it.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ("none", "minimal", "full")
+
+
+class PhaseTimer:
+    """Wall-clock seconds per named startup phase"""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds, 3)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "event": "cold_start",
+            "phases": dict(self.phases),
+            "totalSeconds": round(time.perf_counter() - self.started_at, 3),
+            **extra,
+        }
+
+    def log(self, **extra: Any) -> Dict[str, Any]:
+        metrics = self.as_dict(**extra)
+        logger.info(json.dumps(metrics))
+        return metrics
+
+
+def process_age() -> float:
+    """
+    Seconds since this process started, read from /proc
+
+    Timing the cold start from here rather than from the first line of the
+    handler includes interpreter startup and every import. Returns 0.0
+    where /proc is not available.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; the fields after it do not
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        # starttime (field 22) in clock ticks since boot
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return max(uptime - started, 0.0)
+
+
+def weights_fingerprint(weights_dir: str, **environment: Any) -> str:
+    """
+    Hash of the weight files (path, size, mtime) and the runtime environment
+
+    Only file metadata is read, so this costs a directory walk, not a read
+    of the weights.
+    """
+    manifest = []
+    for root, _, files in os.walk(weights_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            manifest.append((os.path.relpath(path, weights_dir), stat.st_size, int(stat.st_mtime)))
+    manifest.sort()
+
+    canonical = json.dumps(
+        {"weights": manifest, "environment": environment},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def marker_is_valid(path: str, fingerprint: str, mode: str) -> bool:
+    """True if the marker at path was written for fingerprint by an equal or stronger warm-up"""
+    try:
+        with open(path) as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if marker.get("fingerprint") != fingerprint or marker.get("mode") not in WARMUP_MODES:
+        return False
+    return WARMUP_MODES.index(marker["mode"]) >= WARMUP_MODES.index(mode)
+
+
+def write_marker(path: str, fingerprint: str, mode: str) -> None:
+    """Atomically record a successful warm-up; a read-only volume only logs a warning"""
+    marker = {
+        "fingerprint": fingerprint,
+        "mode": mode,
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(marker, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write readiness marker {path}: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,233 @@
+"""
+Streaming H.264 encoder for generated frames.
+
+Frames are handed over as they are produced (one frame or a chunk at a time)
+and written to an ffmpeg subprocess by a background thread, so encoding runs
+while the next chunk is still being decoded/converted and only a bounded
+number of chunks is ever held in memory. Needs only numpy and an ffmpeg
+binary, so it runs on CPU with synthetic frames.
+
+Output goes to a file, or with a sink, ffmpeg writes fragmented MP4 to
+stdout and each block is passed to sink(bytes) as soon as ffmpeg flushes
+it (e.g. to upload parts while the rest of the clip is still encoding).
+"""
+import logging
+import queue
+import shutil
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EncoderError(RuntimeError):
+    """Raised when ffmpeg fails or the encoder is used after it stopped"""
+
+
+def ffmpeg_executable() -> str:
+    """ffmpeg bundled with imageio-ffmpeg, falling back to the one on PATH"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        path = shutil.which("ffmpeg")
+        if path is None:
+            raise EncoderError("ffmpeg executable not found")
+        return path
+
+
+class StreamingEncoder:
+    """
+    Pipes raw RGB frames into `ffmpeg -f rawvideo -i -` on a writer thread.
+
+    Usage:
+        with StreamingEncoder(path, width, height, fps) as encoder:
+            for chunk in chunks:
+                encoder.write(chunk)   # (H, W, 3) or (N, H, W, 3) uint8
+
+    Leaving the block normally waits for ffmpeg to finish; leaving it with an
+    exception kills ffmpeg instead.
+    """
+
+    def __init__(
+        self,
+        output_path: Optional[str],
+        width: int,
+        height: int,
+        fps: int,
+        crf: int = 10,
+        preset: str = "medium",
+        max_pending: int = 4,
+        sink: Optional[Callable[[bytes], None]] = None,
+        read_size: int = 1024 * 1024,
+    ):
+        if (output_path is None) == (sink is None):
+            raise ValueError("Pass exactly one of output_path or sink")
+        self.output_path = output_path
+        self.sink = sink
+        self.read_size = read_size
+        self.bytes_out = 0
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.crf = crf
+        self.preset = preset
+        self.frames_written = 0
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._stderr_tail: deque = deque(maxlen=20)
+        self._error: Optional[BaseException] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def _command(self) -> List[str]:
+        command = [
+            ffmpeg_executable(),
+            "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+            "-s", f"{self.width}x{self.height}",
+            "-r", str(self.fps),
+            "-i", "-",
+            "-an",
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+            "-pix_fmt", "yuv420p",
+        ]
+        if self.sink is not None:
+            # A pipe is not seekable, so write a fragmented MP4 (moov first)
+            return command + [
+                "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+                "-f", "mp4",
+                "pipe:1",
+            ]
+        return command + [self.output_path]
+
+    def start(self) -> "StreamingEncoder":
+        self._process = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE if self.sink is not None else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        self._threads = [
+            threading.Thread(target=self._write_loop, name="encoder-writer", daemon=True),
+            threading.Thread(target=self._stderr_loop, name="encoder-stderr", daemon=True),
+        ]
+        if self.sink is not None:
+            self._threads.append(
+                threading.Thread(target=self._read_loop, name="encoder-reader", daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def write(self, frames: np.ndarray) -> None:
+        """Queue one frame or a chunk of frames; blocks while max_pending chunks are waiting"""
+        if self._process is None or self._closed:
+            raise EncoderError("Encoder is not running")
+        if self._error is not None:
+            raise EncoderError(f"Encoder failed: {self._error}; {self.stderr()}")
+
+        frames = np.asarray(frames)
+        if frames.ndim == 3:
+            frames = frames[np.newaxis]
+        if frames.dtype != np.uint8 or frames.shape[1:] != (self.height, self.width, 3):
+            raise ValueError(
+                f"Expected uint8 frames of shape (N, {self.height}, {self.width}, 3), "
+                f"got {frames.dtype} {frames.shape}"
+            )
+
+        # ffmpeg reads the buffer directly; only non-contiguous input is copied
+        self._pending.put(np.ascontiguousarray(frames))
+        self.frames_written += len(frames)
+
+    def close(self) -> None:
+        """Flush queued frames and wait for ffmpeg to finish the file"""
+        if self._process is None or self._closed:
+            return
+        self._closed = True
+        self._pending.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        returncode = self._process.wait()
+
+        if self._error is not None or returncode != 0:
+            raise EncoderError(
+                f"ffmpeg exited with code {returncode}: {self._error or self.stderr()}"
+            )
+        logger.info(f"Encoded {self.frames_written} frames to {self.output_path or 'sink'}")
+
+    def abort(self) -> None:
+        """Stop ffmpeg without finishing the file"""
+        if self._process is None:
+            return
+        self._closed = True
+        self._process.kill()
+        # Unblock the writer if it is waiting on a full queue or a dead pipe
+        while True:
+            try:
+                self._pending.get_nowait()
+            except queue.Empty:
+                break
+        self._pending.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._process.wait()
+
+    def stderr(self) -> str:
+        return b"".join(self._stderr_tail).decode(errors="replace").strip()
+
+    def _write_loop(self) -> None:
+        stdin = self._process.stdin
+        while True:
+            chunk = self._pending.get()
+            if chunk is _STOP:
+                break
+            if self._error is not None:
+                continue
+            try:
+                stdin.write(memoryview(chunk).cast("B"))
+            except (BrokenPipeError, OSError) as e:
+                if self._error is None:
+                    self._error = e
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+    def _read_loop(self) -> None:
+        stdout = self._process.stdout
+        while True:
+            data = stdout.read1(self.read_size)
+            if not data:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self.sink(data)
+                self.bytes_out += len(data)
+            except Exception as e:
+                # Stop ffmpeg; the writer then sees a broken pipe and close() raises
+                self._error = e
+                self._process.kill()
+
+    def _stderr_loop(self) -> None:
+        for line in self._process.stderr:
+            self._stderr_tail.append(line)
+
+    def __enter__(self) -> "StreamingEncoder":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,150 @@
+"""
+Conversion of pipeline output frames to uint8 RGB for the encoder.
+
+Pipelines return float frames in [0, 1] or [-1, 1] (or already uint8),
+as torch tensors, numpy arrays or lists of PIL images. The value range is
+found in one pass (torch.aminmax, or a blocked min/max for numpy), then
+frames are scaled, clamped, rounded and cast chunk by chunk: on the device
+before the copy to host for tensors, and through a small reused scratch
+block for numpy, so no temporary the size of the whole video is created.
+"""
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:  # numpy-only use (benchmarks, CPU checks)
+    torch = None
+
+SIGNED = "signed"  # [-1, 1]
+UNIT = "unit"      # [0, 1]
+BYTE = "byte"      # [0, 255]
+
+# y = x * scale + offset maps a range onto [0, 255]; the extra 0.5 makes the
+# truncating cast to uint8 round to nearest
+_AFFINE = {
+    SIGNED: (127.5, 127.5 + 0.5),
+    UNIT: (255.0, 0.5),
+    BYTE: (1.0, 0.5),
+}
+
+# Elements per numpy work block (1 MB of float32, stays in L2)
+BLOCK_ELEMENTS = 1 << 18
+
+
+def _is_tensor(frames) -> bool:
+    return torch is not None and isinstance(frames, torch.Tensor)
+
+
+def _minmax_blocked(array: np.ndarray) -> Tuple[float, float]:
+    """min and max of an array, reading each block from memory once"""
+    flat = array.reshape(-1)
+    scratch = np.empty(min(flat.size, BLOCK_ELEMENTS), dtype=np.float32)
+    lo, hi = np.inf, -np.inf
+    for start in range(0, flat.size, BLOCK_ELEMENTS):
+        block = flat[start:start + BLOCK_ELEMENTS]
+        # float16 reductions are not vectorized; widen the block first
+        work = scratch[:block.size]
+        np.copyto(work, block, casting="unsafe")
+        lo = min(lo, work.min())
+        hi = max(hi, work.max())
+    return float(lo), float(hi)
+
+
+def detect_range(frames) -> str:
+    """Classify frames as SIGNED, UNIT or BYTE from their minimum and maximum"""
+    if _is_tensor(frames):
+        if frames.dtype == torch.uint8:
+            return BYTE
+        lo, hi = (value.item() for value in torch.aminmax(frames))
+    else:
+        frames = np.asarray(frames)
+        if frames.dtype == np.uint8:
+            return BYTE
+        lo, hi = _minmax_blocked(frames)
+
+    if lo < 0:
+        return SIGNED
+    if hi <= 1.0:
+        return UNIT
+    return BYTE
+
+
+def is_channels_first(shape) -> bool:
+    """(N, C, H, W) layout, as returned by diffusers with output_type="pt" """
+    return len(shape) == 4 and shape[1] in (1, 3) and shape[-1] not in (1, 3)
+
+
+def _tensor_chunks(frames, chunk_frames: int, value_range: str) -> Iterator[np.ndarray]:
+    scale, offset = _AFFINE[value_range]
+    channels_first = is_channels_first(frames.shape)
+    # bfloat16 cannot hold x.5 steps near 255
+    work_dtype = torch.float32 if frames.dtype == torch.bfloat16 else None
+
+    for start in range(0, len(frames), chunk_frames):
+        chunk = frames[start:start + chunk_frames]
+        if chunk.dtype != torch.uint8:
+            # One chunk-sized temporary on the device, then in-place ops
+            if work_dtype is not None:
+                work = chunk.to(work_dtype).mul_(scale)
+            else:
+                work = chunk.mul(scale)
+            chunk = work.add_(offset).clamp_(0, 255).to(torch.uint8)
+        if channels_first:
+            chunk = chunk.permute(0, 2, 3, 1)
+        # Only uint8 crosses to the host
+        yield chunk.contiguous().cpu().numpy()
+
+
+def _array_chunks(frames, chunk_frames: int, value_range: Optional[str]) -> Iterator[np.ndarray]:
+    scratch = np.empty(BLOCK_ELEMENTS, dtype=np.float32)
+
+    for start in range(0, len(frames), chunk_frames):
+        chunk = frames[start:start + chunk_frames]
+        if isinstance(chunk, list):
+            # PIL images or per-frame arrays
+            chunk = np.stack([np.asarray(frame) for frame in chunk])
+        if is_channels_first(chunk.shape):
+            chunk = chunk.transpose(0, 2, 3, 1)
+        if chunk.dtype == np.uint8:
+            yield chunk
+            continue
+
+        if value_range is None:
+            # Lists are only inspected chunk by chunk; decide on the first one
+            value_range = detect_range(chunk)
+        scale, offset = _AFFINE[value_range]
+
+        source = np.ascontiguousarray(chunk).reshape(-1)
+        out = np.empty(chunk.shape, dtype=np.uint8)
+        target = out.reshape(-1)
+        for block_start in range(0, source.size, BLOCK_ELEMENTS):
+            block = source[block_start:block_start + BLOCK_ELEMENTS]
+            work = scratch[:block.size]
+            np.copyto(work, block, casting="unsafe")
+            np.multiply(work, scale, out=work)
+            np.add(work, offset, out=work)
+            np.clip(work, 0, 255, out=work)
+            np.copyto(target[block_start:block_start + block.size], work, casting="unsafe")
+        yield out
+
+
+def iter_uint8_chunks(frames, chunk_frames: int, value_range: Optional[str] = None) -> Iterator[np.ndarray]:
+    """
+    Yield frames as host uint8 arrays of shape (N, H, W, 3), N <= chunk_frames.
+
+    Args:
+        frames: Tensor or array of shape (F, H, W, 3) or (F, 3, H, W), or a list of frames
+        chunk_frames: Frames per yielded chunk
+        value_range: SIGNED, UNIT or BYTE if known; detected otherwise
+    """
+    if _is_tensor(frames):
+        if value_range is None:
+            value_range = detect_range(frames)
+        yield from _tensor_chunks(frames, chunk_frames, value_range)
+        return
+
+    if isinstance(frames, np.ndarray) and value_range is None and frames.dtype != np.uint8:
+        value_range = detect_range(frames)
+    yield from _array_chunks(frames, chunk_frames, value_range)
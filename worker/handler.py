@@ -6,9 +6,11 @@ Replace handler.py with this file once you have the model set up.
 """
 
 import os
+import time
 import uuid
 import logging
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from typing import Optional, Dict, Any
 import torch
@@ -17,11 +19,16 @@ import random
 from PIL import Image
 import requests
 import io
-import imageio
+import tempfile
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import runpod
 
+from coldstart import WARMUP_MODES, PhaseTimer, marker_is_valid, process_age, weights_fingerprint, write_marker
+from encoder import StreamingEncoder
+from frames import iter_uint8_chunks
+from uploader import StreamingUpload
+
 # Logging
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
@@ -29,6 +36,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Timed from process start, so the "import" phase includes interpreter startup
+COLD_START = PhaseTimer(started_at=time.perf_counter() - process_age())
+COLD_START.record("import", time.perf_counter() - COLD_START.started_at)
+COLD_START_METRICS: Dict[str, Any] = {}
+
 # FastAPI app
 app = FastAPI()
 
@@ -44,6 +56,25 @@ r2_client = boto3.client(
 
 R2_BUCKET = os.getenv("R2_BUCKET")
 R2_PUBLIC_DOMAIN = os.getenv("R2_PUBLIC_DOMAIN", "")
+R2_OBJECT_ARGS = {
+    'ContentType': 'video/mp4',
+    'CacheControl': 'public, max-age=86400',  # 24 hours
+}
+
+# Part size and parallelism for uploads (both streaming and from file)
+MB = 1024 * 1024
+R2_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(os.getenv("R2_MULTIPART_THRESHOLD_MB", "8")) * MB,
+    multipart_chunksize=int(os.getenv("R2_MULTIPART_CHUNKSIZE_MB", "8")) * MB,
+    max_concurrency=int(os.getenv("R2_MAX_CONCURRENCY", "4")),
+)
+
+# "stream": upload parts while encoding; "buffer": encode to a spooled buffer,
+# then upload from it; "file": encode to disk, then upload
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "stream")
+OUTPUT_DIR = "/workspace/out"
+# Buffered output stays in memory up to this size, then spills to OUTPUT_DIR
+OUTPUT_SPOOL_MAX_MB = int(os.getenv("OUTPUT_SPOOL_MAX_MB", "256"))
 
 # Model configuration
 WAN_WEIGHTS_DIR = os.getenv("WAN_WEIGHTS_DIR", "/runpod-volume/wan22/weights")
@@ -51,6 +82,25 @@ WAN_RESOLUTION = os.getenv("WAN_RESOLUTION", "720p")
 WAN_FPS = int(os.getenv("WAN_FPS", "24"))
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
+# Test inference before accepting jobs: "none", "minimal" or "full"
+WARMUP_MODE = os.getenv("WARMUP_MODE", "minimal")
+WARMUP_SETTINGS = {
+    "minimal": {"num_frames": 5, "height": 256, "width": 256, "num_inference_steps": 1},
+    "full": {"num_frames": 24, "height": 480, "width": 848, "num_inference_steps": 10},
+}
+# Records that this image + weights passed warm-up, so later cold starts skip it
+WARMUP_MARKER_PATH = os.getenv(
+    "WARMUP_MARKER_PATH",
+    os.path.join(os.path.dirname(WAN_WEIGHTS_DIR.rstrip("/")), ".warmup-ready.json"),
+)
+WORKER_IMAGE_TAG = os.getenv("WORKER_IMAGE_TAG", "")
+
+# Video encoding
+ENCODER_CHUNK_FRAMES = int(os.getenv("ENCODER_CHUNK_FRAMES", "24"))
+ENCODER_MAX_PENDING_CHUNKS = int(os.getenv("ENCODER_MAX_PENDING_CHUNKS", "4"))
+ENCODER_CRF = int(os.getenv("ENCODER_CRF", "10"))  # imageio quality=8 maps to crf 10
+ENCODER_PRESET = os.getenv("ENCODER_PRESET", "medium")
+
 # Global model instance
 MODEL = None
 PIPE = None
@@ -84,21 +134,24 @@ def load_model():
         try:
             from diffusers import DiffusionPipeline
 
-            PIPE = DiffusionPipeline.from_pretrained(
-                WAN_WEIGHTS_DIR,
-                torch_dtype=torch.float16,
-                variant="fp16",
-                use_safetensors=True,
-            )
-            PIPE = PIPE.to(DEVICE)
+            with COLD_START.phase("weight_load"):
+                PIPE = DiffusionPipeline.from_pretrained(
+                    WAN_WEIGHTS_DIR,
+                    torch_dtype=torch.float16,
+                    variant="fp16",
+                    use_safetensors=True,
+                )
 
-            # Enable memory optimizations
-            if hasattr(PIPE, 'enable_model_cpu_offload'):
-                PIPE.enable_model_cpu_offload()
-            if hasattr(PIPE, 'enable_vae_slicing'):
-                PIPE.enable_vae_slicing()
-            if hasattr(PIPE, 'enable_attention_slicing'):
-                PIPE.enable_attention_slicing(1)
+            with COLD_START.phase("device_move"):
+                PIPE = PIPE.to(DEVICE)
+
+                # Enable memory optimizations
+                if hasattr(PIPE, 'enable_model_cpu_offload'):
+                    PIPE.enable_model_cpu_offload()
+                if hasattr(PIPE, 'enable_vae_slicing'):
+                    PIPE.enable_vae_slicing()
+                if hasattr(PIPE, 'enable_attention_slicing'):
+                    PIPE.enable_attention_slicing(1)
 
             logger.info("Loaded model using Diffusers pipeline")
 
@@ -122,21 +175,10 @@ def load_model():
                 "pip install diffusers transformers accelerate"
             )
 
-        # Test generation to ensure model works
-        logger.info("Model loaded successfully. Running test inference...")
-
-        # Small test to verify model works
-        with torch.inference_mode():
-            test_output = PIPE(
-                prompt="test",
-                num_frames=24,  # 1 second at 24fps
-                height=480,
-                width=848,
-                num_inference_steps=10,  # Low steps for quick test
-            )
-
-        logger.info(f"Test inference successful. Output shape: {test_output.frames[0].shape if hasattr(test_output, 'frames') else 'N/A'}")
+        logger.info("Model loaded successfully")
+        warmup = warm_up(PIPE)
 
+        COLD_START_METRICS.update(COLD_START.log(device=DEVICE, warmupMode=WARMUP_MODE, warmup=warmup))
         return PIPE
 
     except Exception as e:
@@ -144,6 +186,44 @@ def load_model():
         raise
 
 
+def warm_up(pipe) -> str:
+    """
+    Run the WARMUP_MODE test inference to ensure the model works
+
+    Skipped when the readiness marker shows this image and these weights
+    already passed an equal or stronger warm-up.
+
+    Returns:
+        "disabled", "skipped" or "ran"
+    """
+    if WARMUP_MODE not in WARMUP_MODES:
+        raise ValueError(f"WARMUP_MODE must be one of {', '.join(WARMUP_MODES)}")
+    if WARMUP_MODE == "none":
+        logger.info("Warm-up disabled")
+        return "disabled"
+
+    with COLD_START.phase("readiness_check"):
+        fingerprint = weights_fingerprint(
+            WAN_WEIGHTS_DIR,
+            image=WORKER_IMAGE_TAG,
+            torch=torch.__version__,
+            pipeline=type(pipe).__name__,
+            device=torch.cuda.get_device_name(0) if DEVICE == "cuda" else DEVICE,
+        )
+        ready = marker_is_valid(WARMUP_MARKER_PATH, fingerprint, WARMUP_MODE)
+    if ready:
+        logger.info(f"Readiness marker {WARMUP_MARKER_PATH} matches, skipping {WARMUP_MODE} warm-up")
+        return "skipped"
+
+    logger.info(f"Running {WARMUP_MODE} test inference...")
+    with COLD_START.phase("warmup"), torch.inference_mode():
+        test_output = pipe(prompt="test", **WARMUP_SETTINGS[WARMUP_MODE])
+
+    logger.info(f"Test inference successful. Output shape: {test_output.frames[0].shape if hasattr(test_output, 'frames') else 'N/A'}")
+    write_marker(WARMUP_MARKER_PATH, fingerprint, WARMUP_MODE)
+    return "ran"
+
+
 def download_image(image_url: str) -> Image.Image:
     """Download and preprocess image from URL"""
     logger.info(f"Downloading image from {image_url}")
@@ -176,15 +256,15 @@ def get_resolution_dimensions(resolution: str) -> tuple[int, int]:
     return resolutions.get(resolution, (1280, 720))
 
 
-def generate_video(
+def generate_frames(
     prompt: str,
     duration_sec: int,
     image_url: Optional[str] = None,
     seed: Optional[int] = None,
     cfg: float = 7.5,
-) -> str:
+):
     """
-    Generate video using Wan 2.2 model
+    Generate video frames using Wan 2.2 model
 
     Args:
         prompt: Text prompt for video generation
@@ -194,7 +274,7 @@ def generate_video(
         cfg: Classifier-free guidance scale
 
     Returns:
-        Path to generated video file
+        Frames as returned by the pipeline (tensor, array or list)
     """
     logger.info(f"Generating video: prompt='{prompt}', duration={duration_sec}s, image={'yes' if image_url else 'no'}")
 
@@ -234,6 +314,7 @@ def generate_video(
                     num_inference_steps=50,
                     guidance_scale=cfg,
                     generator=generator,
+                    output_type="pt",  # keep frames on the device for conversion
                 )
             else:
                 # Text-to-video generation
@@ -247,6 +328,7 @@ def generate_video(
                     num_inference_steps=50,
                     guidance_scale=cfg,
                     generator=generator,
+                    output_type="pt",  # keep frames on the device for conversion
                 )
 
         # Extract frames from output
@@ -259,32 +341,35 @@ def generate_video(
             # Fallback: assume output is tensor directly
             frames = output[0]
 
-        # Convert frames to numpy if they're tensors
-        if isinstance(frames, torch.Tensor):
-            frames = frames.cpu().numpy()
-            # Assuming shape is [num_frames, height, width, channels]
-            # Scale from [-1, 1] or [0, 1] to [0, 255]
-            if frames.max() <= 1.0:
-                frames = (frames * 255).astype(np.uint8)
-            else:
-                frames = frames.astype(np.uint8)
+        return frames
+
+    except Exception as e:
+        logger.error(f"Video generation failed: {str(e)}", exc_info=True)
+        raise
+
+
+def generate_video(
+    prompt: str,
+    duration_sec: int,
+    image_url: Optional[str] = None,
+    seed: Optional[int] = None,
+    cfg: float = 7.5,
+) -> str:
+    """
+    Generate video and encode it to a local MP4
+
+    Returns:
+        Path to generated video file
+    """
+    frames = generate_frames(prompt, duration_sec, image_url, seed, cfg)
 
+    try:
         # Save video
-        output_path = f"/workspace/out/{uuid.uuid4()}.mp4"
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        logger.info(f"Saving video with {len(frames)} frames at {WAN_FPS}fps")
-
-        # Save using imageio with H.264 codec
-        imageio.mimsave(
-            output_path,
-            frames,
-            fps=WAN_FPS,
-            codec='libx264',
-            quality=8,  # High quality (range 1-10, 10 is best)
-            pixelformat='yuv420p',  # Standard format for compatibility
-            macro_block_size=1,
-        )
+        output_path = f"{OUTPUT_DIR}/{uuid.uuid4()}.mp4"
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+        logger.info(f"Encoding video with {len(frames)} frames at {WAN_FPS}fps")
+        encode_frames(frames, output_path=output_path)
 
         # Verify file was created
         if not os.path.exists(output_path):
@@ -296,7 +381,43 @@ def generate_video(
         return output_path
 
     except Exception as e:
-        logger.error(f"Video generation failed: {str(e)}", exc_info=True)
+        logger.error(f"Video encoding failed: {str(e)}", exc_info=True)
+        # Do not leave a partial file behind
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+
+def encode_frames(frames, output_path: Optional[str] = None, sink=None) -> None:
+    """
+    Stream frames to an H.264 MP4, encoding while later chunks convert
+
+    Args:
+        frames: Pipeline output frames
+        output_path: Local file to write
+        sink: Instead of a file, callable receiving fragmented MP4 bytes as they are encoded
+    """
+    encoder = None
+    try:
+        for chunk in iter_uint8_chunks(frames, ENCODER_CHUNK_FRAMES):
+            if encoder is None:
+                encoder = StreamingEncoder(
+                    output_path,
+                    sink=sink,
+                    width=chunk.shape[2],
+                    height=chunk.shape[1],
+                    fps=WAN_FPS,
+                    crf=ENCODER_CRF,
+                    preset=ENCODER_PRESET,
+                    max_pending=ENCODER_MAX_PENDING_CHUNKS,
+                ).start()
+            encoder.write(chunk)
+        if encoder is None:
+            raise RuntimeError("Pipeline returned no frames")
+        encoder.close()
+    except BaseException:
+        if encoder is not None:
+            encoder.abort()
         raise
 
 
@@ -319,10 +440,8 @@ def upload_to_r2(file_path: str) -> str:
             file_path,
             R2_BUCKET,
             key,
-            ExtraArgs={
-                'ContentType': 'video/mp4',
-                'CacheControl': 'public, max-age=86400',  # 24 hours
-            }
+            ExtraArgs=R2_OBJECT_ARGS,
+            Config=R2_TRANSFER_CONFIG,
         )
 
         # Return public URL
@@ -335,6 +454,72 @@ def upload_to_r2(file_path: str) -> str:
         raise
 
 
+def stream_to_r2(frames) -> str:
+    """
+    Encode frames straight into a multipart upload to Cloudflare R2
+
+    Parts are uploaded while encoding continues, so the object is complete
+    right after the last frame is encoded; nothing is written to local disk.
+
+    Returns:
+        R2 URL of uploaded video
+    """
+    key = f"outputs/{uuid.uuid4()}.mp4"
+    logger.info(f"Streaming {len(frames)} frames at {WAN_FPS}fps to R2: {key}")
+
+    upload = StreamingUpload(r2_client, R2_BUCKET, key, R2_TRANSFER_CONFIG, extra_args=R2_OBJECT_ARGS)
+    try:
+        encode_frames(frames, sink=upload.write)
+        upload.complete()
+    except BaseException as e:
+        logger.error(f"Failed to stream video to R2: {str(e)}")
+        upload.abort()
+        raise
+
+    r2_url = f"{R2_PUBLIC_DOMAIN}/{key}"
+    logger.info(f"Uploaded successfully: {r2_url} ({upload.bytes_written / MB:.2f} MB)")
+    return r2_url
+
+
+def buffer_to_r2(frames) -> str:
+    """
+    Encode frames into a spooled buffer, then upload it to Cloudflare R2
+
+    The buffer spills to an unnamed file in OUTPUT_DIR only past
+    OUTPUT_SPOOL_MAX_MB and is released when the upload ends, whether or
+    not it succeeds.
+
+    Returns:
+        R2 URL of uploaded video
+    """
+    key = f"outputs/{uuid.uuid4()}.mp4"
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    logger.info(f"Encoding {len(frames)} frames at {WAN_FPS}fps to buffer for R2: {key}")
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_MAX_MB * MB, dir=OUTPUT_DIR) as buffer:
+            encode_frames(frames, sink=buffer.write)
+            size = buffer.tell()
+            if size > OUTPUT_SPOOL_MAX_MB * MB:
+                logger.info(f"Output of {size / MB:.2f} MB spilled to disk")
+
+            buffer.seek(0)
+            r2_client.upload_fileobj(
+                buffer,
+                R2_BUCKET,
+                key,
+                ExtraArgs=R2_OBJECT_ARGS,
+                Config=R2_TRANSFER_CONFIG,
+            )
+    except Exception as e:
+        logger.error(f"Failed to upload buffered video to R2: {str(e)}")
+        raise
+
+    r2_url = f"{R2_PUBLIC_DOMAIN}/{key}"
+    logger.info(f"Uploaded successfully: {r2_url} ({size / MB:.2f} MB)")
+    return r2_url
+
+
 def handler(job: Dict[str, Any]) -> Dict[str, Any]:
     """
     RunPod job handler
@@ -359,22 +544,38 @@ def handler(job: Dict[str, Any]) -> Dict[str, Any]:
 
         logger.info(f"Processing job: {prompt[:50]}... ({duration_sec}s)")
 
-        # Generate video
-        video_path = generate_video(
-            prompt=prompt,
-            duration_sec=duration_sec,
-            image_url=image_url,
-            seed=seed,
-            cfg=cfg,
-        )
-
-        # Upload to R2
-        r2_url = upload_to_r2(video_path)
+        if OUTPUT_MODE in ("stream", "buffer"):
+            # Generate video and upload it without a local file
+            frames = generate_frames(
+                prompt=prompt,
+                duration_sec=duration_sec,
+                image_url=image_url,
+                seed=seed,
+                cfg=cfg,
+            )
+            if OUTPUT_MODE == "stream":
+                r2_url = stream_to_r2(frames)
+            else:
+                r2_url = buffer_to_r2(frames)
+            del frames
+        else:
+            # Generate video
+            video_path = generate_video(
+                prompt=prompt,
+                duration_sec=duration_sec,
+                image_url=image_url,
+                seed=seed,
+                cfg=cfg,
+            )
 
-        # Clean up local file
-        if os.path.exists(video_path):
-            os.remove(video_path)
-            logger.info("Cleaned up local video file")
+            try:
+                # Upload to R2
+                r2_url = upload_to_r2(video_path)
+            finally:
+                # Clean up local file, also when the upload failed
+                if os.path.exists(video_path):
+                    os.remove(video_path)
+                    logger.info("Cleaned up local video file")
 
         # Return results
         result = {
@@ -425,6 +626,7 @@ async def health():
         "model_loaded": PIPE is not None,
         "device": DEVICE,
         "gpu_available": torch.cuda.is_available(),
+        "cold_start": COLD_START_METRICS,
     }
 
 
@@ -0,0 +1,23 @@
+import subprocess
+
+import numpy as np
+import pytest
+
+from encoder import EncoderError, ffmpeg_executable
+
+try:
+    FFMPEG = ffmpeg_executable()
+except EncoderError:
+    FFMPEG = None
+
+requires_ffmpeg = pytest.mark.skipif(FFMPEG is None, reason="ffmpeg not available")
+
+
+def decode(path: str, width: int, height: int) -> np.ndarray:
+    """Decode a video back to (N, H, W, 3) uint8 frames"""
+    raw = subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", path, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        check=True,
+        capture_output=True,
+    ).stdout
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, height, width, 3)
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+import pytest
+
+from coldstart import PhaseTimer, marker_is_valid, process_age, weights_fingerprint, write_marker
+
+
+@pytest.fixture
+def weights_dir(tmp_path):
+    """A small weights directory with a nested file"""
+    path = tmp_path / "weights"
+    (path / "transformer").mkdir(parents=True)
+    (path / "model_index.json").write_text("{}")
+    (path / "transformer" / "model.safetensors").write_bytes(b"\0" * 128)
+    return path
+
+
+def test_fingerprint_is_stable_for_unchanged_weights(weights_dir):
+    """Test the same files and environment always give the same fingerprint"""
+    first = weights_fingerprint(str(weights_dir), image="v1", device="cuda")
+    assert weights_fingerprint(str(weights_dir), device="cuda", image="v1") == first
+    assert len(first) == 64
+
+
+def test_fingerprint_changes_with_weights_and_environment(weights_dir):
+    """Test resized, touched or added files and a new environment each change the fingerprint"""
+    weights = weights_dir / "transformer" / "model.safetensors"
+    fingerprints = {weights_fingerprint(str(weights_dir), image="v1")}
+
+    fingerprints.add(weights_fingerprint(str(weights_dir), image="v2"))
+
+    weights.write_bytes(b"\0" * 256)
+    fingerprints.add(weights_fingerprint(str(weights_dir), image="v1"))
+
+    os.utime(weights, (time.time() + 60, time.time() + 60))
+    fingerprints.add(weights_fingerprint(str(weights_dir), image="v1"))
+
+    (weights_dir / "vae.safetensors").write_bytes(b"\0")
+    fingerprints.add(weights_fingerprint(str(weights_dir), image="v1"))
+
+    assert len(fingerprints) == 5
+
+
+def test_marker_accepts_equal_or_weaker_warmup(tmp_path):
+    """Test a marker is valid for its own fingerprint and for warm-ups no stronger than it"""
+    path = str(tmp_path / "ready.json")
+    write_marker(path, "abc", "minimal")
+
+    assert marker_is_valid(path, "abc", "minimal")
+    assert marker_is_valid(path, "abc", "none")
+    assert not marker_is_valid(path, "abc", "full")
+    assert not marker_is_valid(path, "other", "minimal")
+
+    write_marker(path, "abc", "full")
+    assert marker_is_valid(path, "abc", "full")
+    assert os.listdir(tmp_path) == ["ready.json"]
+
+
+@pytest.mark.parametrize("content", [None, "not json", json.dumps({"fingerprint": "abc", "mode": "turbo"})])
+def test_missing_or_malformed_marker_is_invalid(tmp_path, content):
+    """Test an absent, corrupt or unknown-mode marker never skips the warm-up"""
+    path = tmp_path / "ready.json"
+    if content is not None:
+        path.write_text(content)
+
+    assert not marker_is_valid(str(path), "abc", "minimal")
+
+
+def test_unwritable_marker_only_logs(tmp_path, caplog):
+    """Test a read-only volume does not fail the cold start or leave a temp file"""
+    blocker = tmp_path / "volume"
+    blocker.write_text("not a directory")
+
+    write_marker(str(blocker / "ready.json"), "abc", "minimal")
+
+    assert "Could not write readiness marker" in caplog.text
+    assert os.listdir(tmp_path) == ["volume"]
+
+
+def test_phase_timer_records_phases_from_process_start():
+    """Test phases are recorded by name and the total counts from the given start"""
+    age = process_age()
+    assert 0.0 <= age < 24 * 3600
+
+    timer = PhaseTimer(started_at=time.perf_counter() - 5.0)
+    timer.record("import", 5.0)
+    with timer.phase("weight_load"):
+        pass
+
+    metrics = timer.as_dict(device="cpu")
+    assert metrics["event"] == "cold_start"
+    assert metrics["phases"]["import"] == 5.0
+    assert set(metrics["phases"]) == {"import", "weight_load"}
+    assert metrics["totalSeconds"] >= 5.0
+    assert metrics["device"] == "cpu"
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+import pytest
+
+from encoder import EncoderError, StreamingEncoder
+from tests.conftest import decode, requires_ffmpeg
+
+pytestmark = requires_ffmpeg
+
+WIDTH, HEIGHT, FPS = 64, 48, 8
+
+
+def make_chunk(frames: int, value: int) -> np.ndarray:
+    return np.full((frames, HEIGHT, WIDTH, 3), value, dtype=np.uint8)
+
+
+def run_with_timeout(target, timeout: float = 30.0) -> None:
+    """Run target on a thread and fail the test if it hangs"""
+    errors = []
+
+    def run():
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "encoder hung"
+    if errors:
+        raise errors[0]
+
+
+def test_round_trip_to_file(tmp_path):
+    """Test chunks written to the encoder decode back with the same frame count and content"""
+    path = str(tmp_path / "out.mp4")
+    with StreamingEncoder(path, WIDTH, HEIGHT, FPS, max_pending=2) as encoder:
+        encoder.write(make_chunk(4, 40))
+        encoder.write(make_chunk(4, 120))
+        encoder.write(make_chunk(1, 200)[0])
+
+    frames = decode(path, WIDTH, HEIGHT)
+    assert encoder.frames_written == 9
+    assert len(frames) == 9
+    assert abs(int(frames[0].mean()) - 40) <= 3
+    assert abs(int(frames[-1].mean()) - 200) <= 3
+
+
+def test_round_trip_through_sink(tmp_path):
+    """Test fragmented MP4 handed to the sink is a complete, decodable video"""
+    blocks = []
+    with StreamingEncoder(None, WIDTH, HEIGHT, FPS, sink=blocks.append, read_size=4096) as encoder:
+        for value in (10, 90, 170):
+            encoder.write(make_chunk(4, value))
+
+    path = tmp_path / "out.mp4"
+    path.write_bytes(b"".join(blocks))
+    assert encoder.bytes_out == path.stat().st_size
+    assert len(decode(str(path), WIDTH, HEIGHT)) == 12
+
+
+def test_rejects_frames_of_the_wrong_shape(tmp_path):
+    """Test a frame that does not match the configured size is refused before reaching ffmpeg"""
+    with StreamingEncoder(str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS) as encoder:
+        with pytest.raises(ValueError):
+            encoder.write(np.zeros((1, HEIGHT, WIDTH + 2, 3), dtype=np.uint8))
+        encoder.write(make_chunk(1, 0))
+
+
+def test_ffmpeg_dying_mid_stream_raises(tmp_path):
+    """Test ffmpeg exiting mid-clip surfaces as EncoderError instead of blocking the writer"""
+    encoder = StreamingEncoder(str(tmp_path / "out.mp4"), WIDTH, HEIGHT, FPS, max_pending=1)
+
+    def encode():
+        encoder.start()
+        try:
+            with pytest.raises(EncoderError):
+                encoder.write(make_chunk(4, 0))
+                encoder._process.kill()
+                encoder._process.wait()
+                for _ in range(50):
+                    encoder.write(make_chunk(4, 0))
+                encoder.close()
+        finally:
+            encoder.abort()
+
+    run_with_timeout(encode)
+
+
+def test_sink_failure_aborts_encoding():
+    """Test an exception from the sink stops ffmpeg and is raised from close()"""
+    def failing_sink(data: bytes) -> None:
+        raise OSError("upload failed")
+
+    encoder = StreamingEncoder(None, WIDTH, HEIGHT, FPS, sink=failing_sink, max_pending=1)
+
+    def encode():
+        with pytest.raises(EncoderError, match="upload failed"):
+            with encoder:
+                for _ in range(50):
+                    encoder.write(make_chunk(4, 0))
+
+    run_with_timeout(encode)
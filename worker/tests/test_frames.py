@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import frames
+from frames import BYTE, SIGNED, UNIT, detect_range, is_channels_first, iter_uint8_chunks
+
+HEIGHT, WIDTH = 6, 10
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Shrink the numpy work block so small clips still span several blocks and a partial one"""
+    monkeypatch.setattr(frames, "BLOCK_ELEMENTS", 97)
+
+
+def make_clip(count: int, value_range: str, dtype=np.float32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    low = -1.0 if value_range == SIGNED else 0.0
+    clip = rng.uniform(low, 1.0, size=(count, HEIGHT, WIDTH, 3))
+    # Exact endpoints must map to 0 and 255
+    clip[0, 0, 0] = [low, 1.0, 0.5]
+    return clip.astype(dtype)
+
+
+def whole_clip_conversion(clip: np.ndarray) -> np.ndarray:
+    """The conversion done on the whole clip at once, with the same float32 arithmetic"""
+    if is_channels_first(clip.shape):
+        clip = clip.transpose(0, 2, 3, 1)
+    work = clip.astype(np.float32)
+    if work.min() < 0:
+        work = work * np.float32(127.5) + np.float32(128.0)
+    else:
+        work = work * np.float32(255.0) + np.float32(0.5)
+    return np.clip(work, 0, 255).astype(np.uint8)
+
+
+def old_conversion(clip: np.ndarray) -> np.ndarray:
+    """The handler's conversion before iter_uint8_chunks ([0, 1] input only, truncating)"""
+    if clip.max() <= 1.0:
+        return (clip * 255).astype(np.uint8)
+    return clip.astype(np.uint8)
+
+
+def convert(clip, chunk_frames: int = 3, **kwargs) -> np.ndarray:
+    chunks = list(iter_uint8_chunks(clip, chunk_frames, **kwargs))
+    assert all(len(chunk) <= chunk_frames for chunk in chunks)
+    assert all(chunk.dtype == np.uint8 for chunk in chunks)
+    return np.concatenate(chunks)
+
+
+def test_unit_range_matches_whole_clip_conversion():
+    """Test [0, 1] frames converted chunk by chunk equal the whole-clip result and round the old one"""
+    clip = make_clip(7, UNIT)
+
+    converted = convert(clip)
+
+    np.testing.assert_array_equal(converted, whole_clip_conversion(clip))
+    assert converted[0, 0, 0].tolist() == [0, 255, 128]
+    difference = converted.astype(int) - old_conversion(clip).astype(int)
+    assert set(np.unique(difference)) <= {0, 1}
+
+
+def test_signed_range_is_detected_and_mapped_to_full_scale():
+    """Test [-1, 1] frames use the signed mapping instead of being clipped at 0"""
+    clip = make_clip(5, SIGNED)
+
+    converted = convert(clip)
+
+    np.testing.assert_array_equal(converted, whole_clip_conversion(clip))
+    assert converted[0, 0, 0].tolist() == [0, 255, 191]
+
+
+def test_channels_first_half_precision_is_returned_channels_last():
+    """Test (F, 3, H, W) float16 output is transposed to (F, H, W, 3)"""
+    clip = make_clip(5, SIGNED, dtype=np.float16).transpose(0, 3, 1, 2)
+    assert is_channels_first(clip.shape)
+
+    converted = convert(clip, chunk_frames=2)
+
+    assert converted.shape == (5, HEIGHT, WIDTH, 3)
+    np.testing.assert_array_equal(converted, whole_clip_conversion(clip))
+
+
+def test_known_range_skips_detection(monkeypatch):
+    """Test a caller-supplied range is used as is"""
+    def fail_detect(clip):
+        raise AssertionError("range should not be detected")
+
+    monkeypatch.setattr(frames, "detect_range", fail_detect)
+    clip = make_clip(4, UNIT)
+
+    np.testing.assert_array_equal(convert(clip, value_range=UNIT), whole_clip_conversion(clip))
+
+
+def test_uint8_and_frame_lists_pass_through():
+    """Test uint8 clips are not rescaled and lists of frames are stacked per chunk"""
+    clip = np.random.default_rng(1).integers(0, 256, size=(5, HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    np.testing.assert_array_equal(convert(clip), clip)
+    np.testing.assert_array_equal(convert(list(clip)), clip)
+
+    float_frames = make_clip(4, SIGNED)
+    np.testing.assert_array_equal(convert(list(float_frames)), whole_clip_conversion(float_frames))
+
+
+def test_detect_range_reads_every_block():
+    """Test the blocked min/max sees values in the last, partial block"""
+    clip = np.full((3, HEIGHT, WIDTH, 3), 0.5, dtype=np.float16)
+    assert detect_range(clip) == UNIT
+
+    clip[-1, -1, -1, -1] = -0.25
+    assert detect_range(clip) == SIGNED
+
+    clip[-1, -1, -1, -1] = 3.0
+    assert detect_range(clip) == BYTE
+    assert detect_range(clip.astype(np.uint8)) == BYTE
+
+
+def test_tensor_conversion_matches_numpy():
+    """Test the on-device tensor path gives the same bytes as the numpy path"""
+    torch = pytest.importorskip("torch")
+    clip = make_clip(5, SIGNED).transpose(0, 3, 1, 2)
+
+    converted = convert(torch.from_numpy(np.ascontiguousarray(clip)), chunk_frames=2)
+
+    np.testing.assert_array_equal(converted, convert(clip, chunk_frames=2))
@@ -0,0 +1,110 @@
+import logging
+import os
+
+import numpy as np
+import pytest
+
+from encoder import EncoderError
+from tests.conftest import decode, requires_ffmpeg
+
+# Importing the handler needs the full worker image (torch, runpod, PIL); the model load fails and is logged
+handler = pytest.importorskip("handler")
+
+pytestmark = requires_ffmpeg
+
+WIDTH, HEIGHT = 256, 256
+
+
+class FakeR2Client:
+    """Stands in for the boto3 R2 client; raises instead of uploading when failing"""
+
+    def __init__(self, failing: bool = False):
+        self.failing = failing
+        self.uploads = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        if self.failing:
+            raise ConnectionError("R2 unavailable")
+        self.uploads[key] = fileobj.read()
+
+    def upload_file(self, path, bucket, key, ExtraArgs=None, Config=None):
+        assert os.path.exists(path)
+        if self.failing:
+            raise ConnectionError("R2 unavailable")
+        with open(path, "rb") as f:
+            self.uploads[key] = f.read()
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    """Point local output at an empty directory"""
+    path = tmp_path / "out"
+    monkeypatch.setattr(handler, "OUTPUT_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def noise_frames():
+    """A second of 256x256 noise, about 2 MB once encoded"""
+    return np.random.default_rng(0).integers(0, 256, size=(24, HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+def leftover_files(path) -> list:
+    return os.listdir(path) if os.path.exists(path) else []
+
+
+def test_buffered_output_is_uploaded_whole(output_dir, noise_frames, monkeypatch, tmp_path):
+    """Test the spooled buffer is rewound and uploaded in full after encoding"""
+    client = FakeR2Client()
+    monkeypatch.setattr(handler, "r2_client", client)
+
+    r2_url = handler.buffer_to_r2(noise_frames)
+
+    (key, body), = client.uploads.items()
+    assert r2_url.endswith(key)
+    video = tmp_path / "uploaded.mp4"
+    video.write_bytes(body)
+    assert len(decode(str(video), WIDTH, HEIGHT)) == len(noise_frames)
+
+
+def test_buffered_output_spilled_to_disk_is_removed_when_upload_fails(output_dir, noise_frames, monkeypatch, caplog):
+    """Test a failed upload of spilled output leaves nothing in OUTPUT_DIR"""
+    monkeypatch.setattr(handler, "r2_client", FakeR2Client(failing=True))
+    monkeypatch.setattr(handler, "OUTPUT_SPOOL_MAX_MB", 1)
+    caplog.set_level(logging.INFO, logger="handler")
+
+    with pytest.raises(ConnectionError):
+        handler.buffer_to_r2(noise_frames)
+
+    assert "spilled to disk" in caplog.text
+    assert leftover_files(output_dir) == []
+
+
+def test_file_mode_removes_the_video_when_upload_fails(output_dir, noise_frames, monkeypatch):
+    """Test the encoded file is deleted even though the R2 upload raised"""
+    monkeypatch.setattr(handler, "OUTPUT_MODE", "file")
+    monkeypatch.setattr(handler, "r2_client", FakeR2Client(failing=True))
+    monkeypatch.setattr(handler, "generate_frames", lambda *args, **kwargs: noise_frames)
+
+    result = handler.handler({"input": {"prompt": "a drone", "durationSec": 5}})
+
+    assert result == {"error": "R2 unavailable"}
+    assert leftover_files(output_dir) == []
+
+
+def test_file_mode_removes_a_partial_video_when_encoding_fails(output_dir, noise_frames, monkeypatch):
+    """Test an encoder failure does not leave a truncated MP4 behind"""
+    def failing_encode(frames, output_path=None, sink=None):
+        with open(output_path, "wb") as f:
+            f.write(b"partial")
+        raise EncoderError("ffmpeg exited with code 1")
+
+    monkeypatch.setattr(handler, "OUTPUT_MODE", "file")
+    monkeypatch.setattr(handler, "r2_client", FakeR2Client())
+    monkeypatch.setattr(handler, "generate_frames", lambda *args, **kwargs: noise_frames)
+    monkeypatch.setattr(handler, "encode_frames", failing_encode)
+
+    result = handler.handler({"input": {"prompt": "a drone", "durationSec": 5}})
+
+    assert result == {"error": "ffmpeg exited with code 1"}
+    assert leftover_files(output_dir) == []
@@ -0,0 +1,137 @@
+import os
+import threading
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+
+from uploader import StreamingUpload
+
+MB = 1024 * 1024
+# S3 and R2 reject parts other than the last below 5 MiB
+MIN_PART_SIZE = 5 * MB
+CONFIG = TransferConfig(multipart_threshold=MIN_PART_SIZE, multipart_chunksize=MIN_PART_SIZE, max_concurrency=2)
+
+
+class FakeR2Client:
+    """Records S3 calls; upload_part raises for the part numbers in fail_parts"""
+
+    def __init__(self, fail_parts=()):
+        self.fail_parts = set(fail_parts)
+        self.calls = []
+        self.parts = {}
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, **kwargs):
+        with self._lock:
+            self.calls.append((name, kwargs))
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._record("put_object", Key=Key, **kwargs)
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._record("create_multipart_upload", Key=Key, **kwargs)
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._record("upload_part", PartNumber=PartNumber, Size=len(Body))
+        if PartNumber in self.fail_parts:
+            raise ConnectionError(f"part {PartNumber} failed")
+        self.parts[PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._record("complete_multipart_upload", Parts=MultipartUpload["Parts"])
+        self.objects[Key] = b"".join(self.parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._record("abort_multipart_upload", UploadId=UploadId)
+
+
+def write_in_pieces(upload: StreamingUpload, data: bytes, piece: int = 700 * 1024) -> None:
+    for start in range(0, len(data), piece):
+        upload.write(data[start:start + piece])
+
+
+def test_parts_are_cut_at_the_minimum_part_size():
+    """Test every part but the last is exactly multipart_chunksize and parts complete in order"""
+    client = FakeR2Client()
+    data = os.urandom(2 * MIN_PART_SIZE + 123)
+
+    upload = StreamingUpload(client, "bucket", "outputs/clip.mp4", CONFIG, extra_args={"ContentType": "video/mp4"})
+    write_in_pieces(upload, data)
+    upload.complete()
+
+    sizes = [kwargs["Size"] for name, kwargs in client.calls if name == "upload_part"]
+    assert sizes == [MIN_PART_SIZE, MIN_PART_SIZE, 123]
+    assert client.calls[0] == ("create_multipart_upload", {"Key": "outputs/clip.mp4", "ContentType": "video/mp4"})
+    assert client.calls[-1] == (
+        "complete_multipart_upload",
+        {"Parts": [{"PartNumber": n, "ETag": f"etag-{n}"} for n in (1, 2, 3)]},
+    )
+    assert client.objects["outputs/clip.mp4"] == data
+    assert upload.bytes_written == len(data)
+
+
+def test_small_output_is_sent_with_one_put():
+    """Test output below the threshold skips the multipart API"""
+    client = FakeR2Client()
+    data = os.urandom(MIN_PART_SIZE - 1)
+
+    upload = StreamingUpload(client, "bucket", "outputs/small.mp4", CONFIG, extra_args={"ContentType": "video/mp4"})
+    write_in_pieces(upload, data)
+    upload.complete()
+
+    assert client.names() == ["put_object"]
+    assert client.calls[0][1]["ContentType"] == "video/mp4"
+    assert client.objects["outputs/small.mp4"] == data
+
+
+def test_failed_part_aborts_the_multipart_upload():
+    """Test a part that raises surfaces the error and the upload is aborted, never completed"""
+    client = FakeR2Client(fail_parts={2})
+    upload = StreamingUpload(client, "bucket", "outputs/clip.mp4", CONFIG)
+
+    with pytest.raises(ConnectionError, match="part 2 failed"):
+        try:
+            write_in_pieces(upload, os.urandom(3 * MIN_PART_SIZE))
+            upload.complete()
+        except Exception:
+            upload.abort()
+            raise
+
+    assert ("abort_multipart_upload", {"UploadId": "upload-1"}) in client.calls
+    assert "complete_multipart_upload" not in client.names()
+    with pytest.raises(RuntimeError):
+        upload.write(b"more")
+
+
+def test_abort_before_any_part_sends_nothing():
+    """Test aborting below the threshold makes no request at all"""
+    client = FakeR2Client()
+    upload = StreamingUpload(client, "bucket", "outputs/clip.mp4", CONFIG)
+    upload.write(b"x" * 1024)
+    upload.abort()
+
+    assert client.calls == []
+
+
+def test_parts_are_accepted_by_s3():
+    """Test the part layout against moto's S3, which enforces the minimum part size"""
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="bucket")
+        data = os.urandom(2 * MIN_PART_SIZE + 1)
+
+        upload = StreamingUpload(client, "bucket", "outputs/clip.mp4", CONFIG)
+        write_in_pieces(upload, data)
+        upload.complete()
+
+        assert client.get_object(Bucket="bucket", Key="outputs/clip.mp4")["Body"].read() == data
@@ -0,0 +1,127 @@
+"""
+Multipart upload to R2 from a stream of bytes.
+
+StreamingUpload collects incoming bytes into parts of
+TransferConfig.multipart_chunksize and uploads them on a pool of
+TransferConfig.max_concurrency threads while more bytes keep arriving, so
+an upload fed from the encoder finishes right after the last frame is
+encoded. All parts but the last have the same size, as R2 requires.
+Output smaller than TransferConfig.multipart_threshold is sent with a
+single put_object. At most max_concurrency parts are in flight; write()
+blocks beyond that, which back-pressures the encoder.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingUpload:
+    """Upload bytes written with write() to bucket/key; finish with complete() or abort()"""
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        config: TransferConfig,
+        extra_args: Optional[Dict[str, Any]] = None,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = config.multipart_chunksize
+        self.threshold = max(config.multipart_threshold, self.part_size)
+        self.max_concurrency = config.max_concurrency
+        self.extra_args = extra_args or {}
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Future] = []
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._finished = False
+
+    def write(self, data: bytes) -> None:
+        if self._finished:
+            raise RuntimeError("Upload already finished")
+        self._buffer += data
+        self.bytes_written += len(data)
+        if self._upload_id is None and len(self._buffer) < self.threshold:
+            return
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+
+    def complete(self) -> str:
+        """Upload what is left and finish the object; returns its key"""
+        self._finished = True
+        if self._upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.extra_args
+            )
+            self._buffer = bytearray()
+            logger.info(f"Uploaded {self.key} ({self.bytes_written} bytes) in one request")
+            return self.key
+
+        if self._buffer:
+            self._submit_part(bytes(self._buffer))
+            self._buffer = bytearray()
+        parts = [future.result() for future in self._parts]
+        self._pool.shutdown()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        logger.info(f"Uploaded {self.key} ({self.bytes_written} bytes) in {len(parts)} parts")
+        return self.key
+
+    def abort(self) -> None:
+        """Drop buffered data and abort the multipart upload, if one was started"""
+        self._finished = True
+        self._buffer = bytearray()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload of {self.key}: {str(e)}")
+
+    def _submit_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra_args
+            )
+            self._upload_id = response["UploadId"]
+            self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="r2-part")
+
+        # Surface a failed part now rather than after the whole clip is encoded
+        for future in self._parts:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        self._slots.acquire()
+        part_number = len(self._parts) + 1
+        future = self._pool.submit(self._upload_part, part_number, body)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._parts.append(future)
+
+    def _upload_part(self, part_number: int, body: bytes) -> Dict[str, Any]:
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}